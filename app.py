@@ -5,16 +5,21 @@ Provides a user-friendly interface for uploading genetic data files,
 selecting ancestry, and computing polygenic risk scores for multiple diseases.
 """
 
+import hashlib
+import os
 import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Any
 
 import gradio as gr
-import pandas as pd
+import numpy as np
 
-from src.dna_parser import parse_raw_dna, detect_format, detect_build
+from src.dna_parser import parse_raw_dna, detect_format_and_build
 from src.liftover import ensure_build
-from src.pgscatalog import load_scores_for_disease, DISEASE_CATALOG
+from src.pgscatalog import get_all_disease_scores, DISEASE_CATALOG
 from src.prs_calculator import compute_all_diseases
 from src.report_generator import (
     generate_html_report,
@@ -32,6 +37,65 @@ ANCESTRY_OPTIONS = [
     ("Latino/Admixed American (AMR)", "AMR"),
     ("South Asian (SAS)", "SAS"),
 ]
+ANCESTRY_NAME_TO_CODE = {name: code for name, code in ANCESTRY_OPTIONS}
+ANCESTRY_CODE_TO_NAME = {code: name for name, code in ANCESTRY_OPTIONS}
+
+# Diseases screened for every upload
+DISEASES: tuple[str, ...] = tuple(DISEASE_CATALOG.keys())
+TOTAL_DISEASES = len(DISEASES)
+
+# Summary thresholds on the 0-100 percentile scale used by normalize_prs
+ELEVATED_PERCENTILE = 75
+HIGH_RISK_PERCENTILE = 95
+
+# Per-process caches keyed by upload content hash, so re-running the same
+# file (e.g. with a different ancestry) skips parsing and/or scoring.
+# Cached values are shared between requests and must not be mutated.
+MAX_CACHED_UPLOADS = 16
+_genotype_cache: dict = {}
+_results_cache: dict = {}
+_cache_lock = threading.Lock()
+
+# Uploads processed in parallel; further requests wait in the Gradio queue
+MAX_CONCURRENT_JOBS = 4
+MAX_QUEUE_SIZE = 16
+
+
+def _file_digest(filepath: str) -> str:
+    """Hash file contents in 1 MiB chunks."""
+    digest = hashlib.blake2b()
+    with open(filepath, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _cache_put(cache: dict, key: tuple, value: Any) -> None:
+    """Insert into a bounded cache, evicting the oldest entry when full."""
+    with _cache_lock:
+        if len(cache) >= MAX_CACHED_UPLOADS:
+            cache.pop(next(iter(cache)), None)
+        cache[key] = value
+
+
+def _process_fast(genotypes_df: Any, progress: gr.Progress) -> Any:
+    """Fast mode: score the genotyped variants as-is."""
+    return genotypes_df
+
+
+def _process_full(genotypes_df: Any, progress: gr.Progress) -> Any:
+    """Full mode: impute missing variants before scoring."""
+    progress(0.4, desc="Note: Imputation requires external server...")
+    # In a real implementation, this would call the imputation module
+    # For now, we proceed with genotyped variants only
+    return genotypes_df
+
+
+# Mode-specific processing stage, resolved once per request
+PIPELINE = {
+    "fast": _process_fast,
+    "full": _process_full,
+}
 
 
 def process_dna_file(
@@ -56,96 +120,105 @@ def process_dna_file(
         return "Please upload a DNA file.", "", None
 
     try:
-        filepath = Path(file_obj.name)
-        filename = filepath.name
+        filepath = file_obj.name
+        filename = os.path.basename(filepath)
+
+        upload_digest = _file_digest(filepath)
+        handler = PIPELINE.get(processing_mode, _process_fast)
+
+        parsed = _genotype_cache.get((upload_digest, processing_mode))
+        if parsed is None:
+            # Step 1: Detect format and parse file
+            progress(0.1, desc="Detecting file format...")
+            file_format, detected_build = detect_format_and_build(filepath)
+
+            progress(0.2, desc=f"Parsing {file_format} file...")
+            genotypes_df = parse_raw_dna(filepath, file_format, detected_build)
 
-        # Step 1: Detect format and parse file
-        progress(0.1, desc="Detecting file format...")
-        file_format = detect_format(filepath)
-        detected_build = detect_build(filepath)
+            if genotypes_df.empty:
+                return "Error: Could not parse any variants from the file.", "", None
 
-        progress(0.2, desc=f"Parsing {file_format} file...")
-        genotypes_df = parse_raw_dna(filepath)
+            variant_count = len(genotypes_df)
 
-        if genotypes_df.empty:
-            return "Error: Could not parse any variants from the file.", "", None
+            # Step 2: Liftover to GRCh37 if needed
+            progress(0.3, desc="Standardizing genome coordinates...")
+            genotypes_df = ensure_build(genotypes_df, target_build="GRCh37")
 
-        variant_count = len(genotypes_df)
+            # Step 3: Mode-specific processing (imputation for full mode)
+            genotypes_df = handler(genotypes_df, progress)
 
-        # Step 2: Liftover to GRCh37 if needed
-        progress(0.3, desc="Standardizing genome coordinates...")
-        genotypes_df = ensure_build(genotypes_df, target_build="GRCh37")
+            parsed = (file_format, detected_build, variant_count, genotypes_df)
+            _cache_put(_genotype_cache, (upload_digest, processing_mode), parsed)
+        else:
+            progress(0.4, desc="Reusing previously parsed genotypes...")
 
-        # Step 3: Handle imputation for full mode
-        if processing_mode == "full":
-            progress(0.4, desc="Note: Imputation requires external server...")
-            # In a real implementation, this would call the imputation module
-            # For now, we proceed with genotyped variants only
-            pass
+        file_format, detected_build, variant_count, genotypes_df = parsed
 
         # Step 4: Load scoring files and compute PRS for each disease
-        progress(0.5, desc="Loading PGS Catalog scores...")
-        diseases = list(DISEASE_CATALOG.keys())
-        total_diseases = len(diseases)
-
-        prs_results = {}
-        for i, disease in enumerate(diseases):
-            progress_pct = 0.5 + (0.4 * (i / total_diseases))
-            progress(progress_pct, desc=f"Computing PRS for {DISEASE_DISPLAY_NAMES.get(disease, disease)}...")
-
-            try:
-                prs_results[disease] = compute_single_disease(
-                    genotypes_df, disease, ancestry
-                )
-            except Exception as e:
-                # Skip diseases that fail but continue with others
-                prs_results[disease] = {
-                    "raw_prs": 0.0,
-                    "zscore": 0.0,
-                    "percentile": 0.5,
-                    "risk_category": "Unknown",
-                    "matched_variants": 0,
-                    "total_variants": 0,
-                    "error": str(e)
-                }
+        prs_results = _results_cache.get((upload_digest, ancestry, processing_mode))
+        if prs_results is None:
+            progress(0.5, desc="Loading PGS Catalog scores...")
+
+            def on_disease_done(completed: int, total: int, disease: str) -> None:
+                progress_pct = 0.5 + (0.4 * (completed / total))
+                progress(progress_pct, desc=f"Computed PRS for {DISEASE_DISPLAY_NAMES.get(disease, disease)}...")
+
+            batch = compute_all_diseases(
+                genotypes_df,
+                DISEASES,
+                population=ancestry,
+                progress_callback=on_disease_done,
+            )
+            prs_results = {
+                disease: _display_result(result)
+                for disease, result in batch["results"].items()
+            }
+            _cache_put(_results_cache, (upload_digest, ancestry, processing_mode), prs_results)
 
         # Step 5: Generate reports
         progress(0.9, desc="Generating clinical report...")
 
         user_info = {
-            "patient_id": f"PRS-{hash(filename) % 100000:05d}",
-            "ancestry": dict(ANCESTRY_OPTIONS).get(ancestry, ancestry),
+            "patient_id": _patient_id(filename),
+            "ancestry": ANCESTRY_CODE_TO_NAME.get(ancestry, ancestry),
             "filename": filename,
         }
 
-        summary_text = generate_summary_text(prs_results)
-        html_report = generate_html_report(prs_results, user_info)
+        # Render the PDF in the background while the HTML report is built
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            pdf_future = executor.submit(_write_pdf_report, prs_results, user_info)
+            summary_text = generate_summary_text(prs_results)
+            html_report = generate_html_report(prs_results, user_info)
 
-        # Generate PDF in temp directory
-        progress(0.95, desc="Creating PDF report...")
-        with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as tmp:
-            pdf_path = generate_pdf_report(prs_results, user_info, Path(tmp.name))
+            progress(0.95, desc="Creating PDF report...")
+            pdf_path = pdf_future.result()
 
         progress(1.0, desc="Complete!")
 
         # Create summary with key statistics
-        elevated_count = sum(
-            1 for r in prs_results.values()
-            if r.get("percentile", 0) >= 0.75
+        percentiles = np.fromiter(
+            (r.get("percentile", 0.0) for r in prs_results.values()),
+            dtype=np.float32,
+            count=len(prs_results),
         )
-
-        header = f"""
-Analysis Complete!
-
-File: {filename}
-Format: {file_format.upper()}
-Build: {detected_build}
-Variants analyzed: {variant_count:,}
-Diseases screened: {total_diseases}
-Elevated risk findings: {elevated_count}
-
-{summary_text}
-"""
+        elevated_count = int((percentiles >= ELEVATED_PERCENTILE).sum())
+        high_risk_count = int((percentiles >= HIGH_RISK_PERCENTILE).sum())
+
+        header = "\n".join([
+            "",
+            "Analysis Complete!",
+            "",
+            f"File: {filename}",
+            f"Format: {file_format.upper()}",
+            f"Build: {detected_build}",
+            f"Variants analyzed: {variant_count:,}",
+            f"Diseases screened: {TOTAL_DISEASES}",
+            f"Elevated risk findings: {elevated_count}",
+            f"High risk findings: {high_risk_count}",
+            "",
+            summary_text,
+            "",
+        ])
         return header, html_report, str(pdf_path)
 
     except Exception as e:
@@ -153,43 +226,51 @@ Elevated risk findings: {elevated_count}
         return error_msg, "", None
 
 
-def compute_single_disease(
-    genotypes_df: pd.DataFrame,
-    disease: str,
-    ancestry: str
-) -> dict[str, Any]:
+def _write_pdf_report(prs_results: dict, user_info: dict) -> Path:
+    """Generate the PDF report into a new file in the temp directory."""
+    pdf_path = Path(tempfile.gettempdir()) / (
+        f"prs_{user_info['patient_id']}_{time.time_ns()}.pdf"
+    )
+    return generate_pdf_report(prs_results, user_info, pdf_path)
+
+
+def _patient_id(filename: str) -> str:
+    """Derive a patient ID from the filename that is stable across processes."""
+    digest = hashlib.blake2b(filename.encode(), digest_size=3).hexdigest()
+    return f"PRS-{int(digest, 16) % 100000:05d}"
+
+
+def _display_result(result: dict[str, Any]) -> dict[str, Any]:
     """
-    Compute PRS for a single disease.
+    Shape a compute_all_diseases result for the report generators.
+
+    Diseases without a percentile (failed download, no matched variants)
+    are shown at the population median with an "Unknown"-style category.
 
     Args:
-        genotypes_df: DataFrame with genotype data
-        disease: Disease identifier
-        ancestry: Ancestry code for population normalization
+        result: Per-disease result from compute_all_diseases
 
     Returns:
         Dictionary with PRS results
     """
-    from src.prs_calculator import calculate_prs, normalize_prs
-
-    # Load scoring file for this disease
-    scores_df = load_scores_for_disease(disease)
-
-    if scores_df.empty:
-        raise ValueError(f"No scoring data available for {disease}")
-
-    # Calculate raw PRS
-    prs_result = calculate_prs(genotypes_df, scores_df)
-
-    # Normalize based on ancestry
-    normalized = normalize_prs(prs_result["raw_prs"], population=ancestry)
+    if result.get("percentile") is None:
+        return {
+            "raw_prs": 0.0,
+            "zscore": 0.0,
+            "percentile": 0.5,
+            "risk_category": result.get("risk_category", "Unknown"),
+            "matched_variants": result.get("matched_variants", 0),
+            "total_variants": result.get("total_variants", 0),
+            "error": result.get("error", "Insufficient data"),
+        }
 
     return {
-        "raw_prs": prs_result["raw_prs"],
-        "zscore": normalized["zscore"],
-        "percentile": normalized["percentile"],
-        "risk_category": normalized["risk_category"],
-        "matched_variants": prs_result["matched_variants"],
-        "total_variants": prs_result["total_variants"],
+        "raw_prs": result["raw_prs"],
+        "zscore": result["zscore"],
+        "percentile": result["percentile"],
+        "risk_category": result["risk_category"],
+        "matched_variants": result["matched_variants"],
+        "total_variants": result["total_variants"],
     }
 
 
@@ -552,10 +633,7 @@ def create_interface() -> gr.Blocks:
         # Event handlers
         def get_ancestry_code(ancestry_name: str) -> str:
             """Convert ancestry display name to code."""
-            for name, code in ANCESTRY_OPTIONS:
-                if name == ancestry_name:
-                    return code
-            return "EUR"
+            return ANCESTRY_NAME_TO_CODE.get(ancestry_name, "EUR")
 
         def process_wrapper(file_obj, ancestry_name, mode, progress=gr.Progress()):
             ancestry_code = get_ancestry_code(ancestry_name)
@@ -566,6 +644,7 @@ def create_interface() -> gr.Blocks:
             inputs=[file_input, ancestry_dropdown, processing_mode],
             outputs=[output_summary, output_html, pdf_download],
             show_progress="full",
+            concurrency_limit=MAX_CONCURRENT_JOBS,
         )
 
     return demo
@@ -573,7 +652,16 @@ def create_interface() -> gr.Blocks:
 
 def main():
     """Launch the Gradio application."""
+    # Download and parse scoring files up front so the first upload doesn't
+    # pay for it; the first MAX_CACHED_SCORE_FILES stay in memory and the
+    # rest are reloaded from their parsed copies on disk
+    get_all_disease_scores()
+
     demo = create_interface()
+    demo.queue(
+        max_size=MAX_QUEUE_SIZE,
+        default_concurrency_limit=MAX_CONCURRENT_JOBS,
+    )
     demo.launch(
         server_name="0.0.0.0",
         server_port=7860,
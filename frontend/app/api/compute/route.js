@@ -1,5 +1,4 @@
 import { NextResponse } from 'next/server'
-import { gunzipSync } from 'node:zlib'
 
 const MODAL_ENDPOINT = process.env.MODAL_ENDPOINT || 'https://suislanchez--polygenic-risk-score-calc-compute-prs-web.modal.run'
 
@@ -10,7 +9,6 @@ export async function POST(request) {
     const formData = await request.formData()
     const file = formData.get('file')
     const ancestry = formData.get('ancestry') || 'EUR'
-    const compressed = formData.get('compressed') === 'true'
     const originalFilename = formData.get('original_filename') || file.name
 
     if (!file) {
@@ -27,27 +25,21 @@ export async function POST(request) {
       )
     }
 
-    // Read file and decompress if needed
+    // Forward the file bytes as-is; the backend detects gzip itself, so
+    // compressed uploads stay compressed on the wire
     const bytes = await file.arrayBuffer()
-    let buffer = Buffer.from(bytes)
 
-    if (compressed) {
-      buffer = gunzipSync(buffer)
-    }
-
-    const base64Content = buffer.toString('base64')
+    const url = new URL(MODAL_ENDPOINT)
+    url.searchParams.set('filename', originalFilename)
+    url.searchParams.set('ancestry', ancestry)
 
     // Call Modal endpoint
-    const response = await fetch(MODAL_ENDPOINT, {
+    const response = await fetch(url, {
       method: 'POST',
       headers: {
-        'Content-Type': 'application/json',
+        'Content-Type': 'application/octet-stream',
       },
-      body: JSON.stringify({
-        file_content: base64Content,
-        filename: originalFilename,
-        ancestry: ancestry,
-      }),
+      body: Buffer.from(bytes),
     })
 
     if (!response.ok) {
@@ -6,286 +6,243 @@ This document provides complete technical context for use in research papers
 and as input for AI assistants working on the project.
 """
 
+import argparse
+import cProfile
+import hashlib
+import io
+import os
+import pstats
+import re
+import shutil
+import tempfile
+from functools import lru_cache
 from pathlib import Path
 from datetime import datetime
-from weasyprint import HTML, CSS
+from string import Template
+from typing import TYPE_CHECKING, Optional
+
+if TYPE_CHECKING:
+    from weasyprint import CSS
+    from weasyprint.text.fonts import FontConfiguration
+
+try:
+    from PIL import Image, ImageDraw, ImageFont
+except ImportError:
+    Image = None
+
+try:
+    import pikepdf
+except ImportError:
+    pikepdf = None
+
+try:
+    from playwright.sync_api import sync_playwright
+except ImportError:
+    sync_playwright = None
 
 OUTPUT_PATH = Path(__file__).parent / "PRS_Calculator_Research_Context.pdf"
+CACHE_DIR = Path(__file__).parent / "data" / "cache"
+
+# Monospace font with box-drawing glyphs, used to rasterize the diagram
+DIAGRAM_FONT = "DejaVuSansMono.ttf"
+DIAGRAM_FONT_SIZE = 28
+DIAGRAM_PADDING = 40
+
+# Rendering backend: "weasyprint" (default) or "chromium" (requires playwright)
+PDF_BACKEND = os.environ.get("PRS_PDF_BACKEND", "weasyprint").lower()
+
+# Chromium does not support @page margin boxes, so the page counter is
+# drawn with its footer template instead
+CHROMIUM_FOOTER = (
+    '<div style="width: 100%; text-align: center; font-size: 10pt; color: #666;">'
+    'Page <span class="pageNumber"></span> of <span class="totalPages"></span></div>'
+)
+
+# Image handling passed to write_pdf (WeasyPrint >= 59)
+PDF_IMAGE_OPTIONS = {
+    "optimize_images": True,
+    "jpeg_quality": 85,
+    "dpi": 150,
+}
 
-HTML_CONTENT = """
-<!DOCTYPE html>
-<html lang="en">
-<head>
-    <meta charset="UTF-8">
-    <title>Polygenic Risk Score Calculator - Technical Documentation</title>
-    <style>
-        @page {
-            size: A4;
-            margin: 2cm 2.5cm;
-            @bottom-center {
-                content: "Page " counter(page) " of " counter(pages);
-                font-size: 10pt;
-                color: #666;
-            }
-        }
-
-        * {
-            margin: 0;
-            padding: 0;
-            box-sizing: border-box;
-        }
-
-        body {
-            font-family: 'Georgia', 'Times New Roman', serif;
-            font-size: 11pt;
-            line-height: 1.6;
-            color: #1a1a1a;
-        }
-
-        .cover {
-            height: 100vh;
-            display: flex;
-            flex-direction: column;
-            justify-content: center;
-            align-items: center;
-            text-align: center;
-            page-break-after: always;
-        }
-
-        .cover h1 {
-            font-size: 28pt;
-            color: #1e3a5f;
-            margin-bottom: 20px;
-            font-weight: 700;
-        }
-
-        .cover .subtitle {
-            font-size: 16pt;
-            color: #4a5568;
-            margin-bottom: 40px;
-        }
-
-        .cover .meta {
-            font-size: 12pt;
-            color: #666;
-            margin-top: 60px;
-        }
-
-        .toc {
-            page-break-after: always;
-        }
-
-        .toc h2 {
-            font-size: 18pt;
-            margin-bottom: 20px;
-            color: #1e3a5f;
-        }
-
-        .toc-item {
-            display: flex;
-            justify-content: space-between;
-            padding: 8px 0;
-            border-bottom: 1px dotted #ccc;
-        }
-
-        h1 {
-            font-size: 20pt;
-            color: #1e3a5f;
-            margin: 30px 0 15px 0;
-            padding-bottom: 8px;
-            border-bottom: 2px solid #1e3a5f;
-            page-break-after: avoid;
-        }
-
-        h2 {
-            font-size: 14pt;
-            color: #2d5a87;
-            margin: 25px 0 12px 0;
-            page-break-after: avoid;
-        }
-
-        h3 {
-            font-size: 12pt;
-            color: #3d7ab5;
-            margin: 18px 0 10px 0;
-            page-break-after: avoid;
-        }
-
-        p {
-            margin-bottom: 12px;
-            text-align: justify;
-        }
-
-        ul, ol {
-            margin: 12px 0 12px 25px;
-        }
-
-        li {
-            margin-bottom: 6px;
-        }
-
-        code {
-            font-family: 'Courier New', monospace;
-            font-size: 9.5pt;
-            background: #f4f4f4;
-            padding: 2px 5px;
-            border-radius: 3px;
-        }
-
-        pre {
-            font-family: 'Courier New', monospace;
-            font-size: 9pt;
-            background: #f8f8f8;
-            border: 1px solid #e0e0e0;
-            border-radius: 4px;
-            padding: 12px;
-            margin: 15px 0;
-            overflow-x: auto;
-            white-space: pre-wrap;
-            page-break-inside: avoid;
-        }
-
-        .formula {
-            background: #f0f4f8;
-            border-left: 4px solid #1e3a5f;
-            padding: 15px 20px;
-            margin: 20px 0;
-            font-family: 'Courier New', monospace;
-            page-break-inside: avoid;
-        }
-
-        table {
-            width: 100%;
-            border-collapse: collapse;
-            margin: 15px 0;
-            font-size: 10pt;
-            page-break-inside: avoid;
-        }
-
-        th {
-            background: #1e3a5f;
-            color: white;
-            padding: 10px 12px;
-            text-align: left;
-            font-weight: 600;
-        }
-
-        td {
-            padding: 8px 12px;
-            border-bottom: 1px solid #e0e0e0;
-        }
-
-        tr:nth-child(even) {
-            background: #f9fafb;
-        }
-
-        .note {
-            background: #fef3c7;
-            border-left: 4px solid #f59e0b;
-            padding: 12px 15px;
-            margin: 15px 0;
-            page-break-inside: avoid;
-        }
-
-        .important {
-            background: #fee2e2;
-            border-left: 4px solid #ef4444;
-            padding: 12px 15px;
-            margin: 15px 0;
-            page-break-inside: avoid;
-        }
-
-        .section {
-            page-break-inside: avoid;
-        }
-
-        .architecture-diagram {
-            background: #f8fafc;
-            border: 1px solid #e2e8f0;
-            padding: 20px;
-            margin: 20px 0;
-            font-family: 'Courier New', monospace;
-            font-size: 9pt;
-            white-space: pre;
-            line-height: 1.4;
-        }
-    </style>
-</head>
-<body>
+CSS_TEXT = """
+@page {
+    size: A4;
+    margin: 2cm 2.5cm;
+    @bottom-center {
+        content: "Page " counter(page) " of " counter(pages);
+        font-size: 10pt;
+        color: #666;
+    }
+}
 
-<!-- Cover Page -->
-<div class="cover">
-    <h1>Polygenic Risk Score Calculator</h1>
-    <div class="subtitle">Technical Documentation & Research Context</div>
-    <p style="font-size: 14pt; color: #4a5568;">
-        A clinical-grade tool for computing multi-disease genetic risk assessments<br>
-        using validated scores from the PGS Catalog
-    </p>
-    <div class="meta">
-        <p><strong>Version:</strong> 1.0.0</p>
-        <p><strong>Generated:</strong> """ + datetime.now().strftime("%B %d, %Y") + """</p>
-        <p><strong>Repository:</strong> polygenic-risk-score-calc</p>
-    </div>
-</div>
+* {
+    margin: 0;
+    padding: 0;
+    box-sizing: border-box;
+}
 
-<!-- Table of Contents -->
-<div class="toc">
-    <h2>Table of Contents</h2>
-    <div class="toc-item"><span>1. Executive Summary</span><span>3</span></div>
-    <div class="toc-item"><span>2. System Architecture</span><span>4</span></div>
-    <div class="toc-item"><span>3. Core Algorithm</span><span>6</span></div>
-    <div class="toc-item"><span>4. Data Sources & PGS Catalog Integration</span><span>8</span></div>
-    <div class="toc-item"><span>5. Module Documentation</span><span>10</span></div>
-    <div class="toc-item"><span>&nbsp;&nbsp;&nbsp;5.1 DNA Parser (dna_parser.py)</span><span>10</span></div>
-    <div class="toc-item"><span>&nbsp;&nbsp;&nbsp;5.2 Liftover (liftover.py)</span><span>11</span></div>
-    <div class="toc-item"><span>&nbsp;&nbsp;&nbsp;5.3 PGS Catalog Client (pgscatalog.py)</span><span>12</span></div>
-    <div class="toc-item"><span>&nbsp;&nbsp;&nbsp;5.4 Population Parameters (populations.py)</span><span>13</span></div>
-    <div class="toc-item"><span>&nbsp;&nbsp;&nbsp;5.5 PRS Calculator (prs_calculator.py)</span><span>14</span></div>
-    <div class="toc-item"><span>&nbsp;&nbsp;&nbsp;5.6 Imputation (imputation.py)</span><span>16</span></div>
-    <div class="toc-item"><span>&nbsp;&nbsp;&nbsp;5.7 Report Generator (report_generator.py)</span><span>17</span></div>
-    <div class="toc-item"><span>6. Deployment Architecture</span><span>18</span></div>
-    <div class="toc-item"><span>7. Disease Catalog</span><span>19</span></div>
-    <div class="toc-item"><span>8. Population Genetics & Normalization</span><span>20</span></div>
-    <div class="toc-item"><span>9. Technical Dependencies</span><span>21</span></div>
-    <div class="toc-item"><span>10. API Reference</span><span>22</span></div>
-    <div class="toc-item"><span>11. Clinical Considerations</span><span>24</span></div>
-    <div class="toc-item"><span>12. Future Enhancements</span><span>25</span></div>
-</div>
+body {
+    font-family: sans-serif;
+    font-kerning: none;
+    font-variant-ligatures: none;
+    font-size: 11pt;
+    line-height: 1.6;
+    color: #1a1a1a;
+}
 
-<!-- Section 1: Executive Summary -->
-<h1>1. Executive Summary</h1>
+.cover {
+    height: 100vh;
+    display: flex;
+    flex-direction: column;
+    justify-content: center;
+    align-items: center;
+    text-align: center;
+    page-break-after: always;
+    page-break-inside: avoid;
+}
 
-<p>The <strong>Polygenic Risk Score (PRS) Calculator</strong> is a comprehensive software system designed to compute genetic risk assessments for multiple diseases using consumer genetic testing data. The system processes raw DNA files from popular direct-to-consumer (DTC) testing services (23andMe, AncestryDNA) and standard VCF files, matching genetic variants against validated scoring files from the PGS Catalog to generate population-normalized risk percentiles.</p>
+.cover h1 {
+    font-size: 28pt;
+    color: #1e3a5f;
+    margin-bottom: 20px;
+    font-weight: 700;
+}
 
-<h2>Key Capabilities</h2>
-<ul>
-    <li><strong>Multi-format DNA parsing:</strong> 23andMe, AncestryDNA, and VCF file support with automatic format detection</li>
-    <li><strong>Genome build handling:</strong> Automatic detection and liftover between GRCh37 (hg19) and GRCh38 (hg38)</li>
-    <li><strong>10-disease risk panel:</strong> Validated PGS Catalog scores for cardiovascular, oncological, metabolic, and neurological conditions</li>
-    <li><strong>Ancestry-aware normalization:</strong> Population-specific z-score conversion for EUR, AFR, EAS, SAS, and AMR ancestries</li>
-    <li><strong>Optional genotype imputation:</strong> Michigan Imputation Server integration for enhanced variant coverage (2% → 98%)</li>
-    <li><strong>Clinical-grade reporting:</strong> NHS/AHA-compliant PDF reports with risk visualizations and actionable recommendations</li>
-    <li><strong>Serverless deployment:</strong> Modal.com integration for scalable, pay-per-use cloud execution</li>
-</ul>
+.cover .subtitle {
+    font-size: 16pt;
+    color: #4a5568;
+    margin-bottom: 40px;
+}
 
-<h2>Target Use Cases</h2>
-<ol>
-    <li><strong>Consumer genetic interpretation:</strong> Enabling individuals to understand disease risk from existing DTC genetic data</li>
-    <li><strong>Research applications:</strong> Batch processing for cohort studies and biobank analyses</li>
-    <li><strong>Clinical decision support:</strong> Providing risk stratification to inform preventive care discussions</li>
-    <li><strong>Educational tools:</strong> Demonstrating polygenic score methodology for genetics education</li>
-</ol>
+.cover .meta {
+    font-size: 12pt;
+    color: #666;
+    margin-top: 60px;
+}
 
-<div class="note">
-    <strong>Important:</strong> This tool provides genetic risk estimates for educational and research purposes only. Results should not be used for clinical diagnosis without consultation with qualified healthcare providers.
-</div>
+.toc {
+    page-break-after: always;
+}
 
-<!-- Section 2: System Architecture -->
-<h1>2. System Architecture</h1>
+.toc h2 {
+    font-size: 18pt;
+    margin-bottom: 20px;
+    color: #1e3a5f;
+}
 
-<p>The system follows a modular pipeline architecture with clear separation of concerns across six functional layers:</p>
+.toc-item {
+    display: flex;
+    justify-content: space-between;
+    padding: 8px 0;
+    border-bottom: 1px dotted #ccc;
+}
+
+h1 {
+    font-size: 20pt;
+    color: #1e3a5f;
+    margin: 30px 0 15px 0;
+    padding-bottom: 8px;
+    border-bottom: 2px solid #1e3a5f;
+    page-break-after: avoid;
+}
+
+h2 {
+    font-size: 14pt;
+    color: #2d5a87;
+    margin: 25px 0 12px 0;
+    page-break-after: avoid;
+}
+
+h3 {
+    font-size: 12pt;
+    color: #3d7ab5;
+    margin: 18px 0 10px 0;
+    page-break-after: avoid;
+}
+
+p {
+    margin-bottom: 12px;
+    text-align: justify;
+}
+
+ul, ol {
+    margin: 12px 0 12px 25px;
+}
+
+li {
+    margin-bottom: 6px;
+}
+
+code {
+    font-family: 'Courier New', monospace;
+    font-size: 9.5pt;
+    background: #f4f4f4;
+    padding: 2px 5px;
+    border-radius: 3px;
+}
+
+pre {
+    font-family: 'Courier New', monospace;
+    font-size: 9pt;
+    background: #f8f8f8;
+    border: 1px solid #e0e0e0;
+    border-radius: 4px;
+    padding: 12px;
+    margin: 15px 0;
+    overflow-x: auto;
+    white-space: pre-wrap;
+}
+
+.formula {
+    background: #f0f4f8;
+    border-left: 4px solid #1e3a5f;
+    padding: 15px 20px;
+    margin: 20px 0;
+    font-family: 'Courier New', monospace;
+}
+
+table {
+    width: 100%;
+    table-layout: fixed;
+    border-collapse: collapse;
+    margin: 15px 0;
+    font-size: 10pt;
+}
+
+.note {
+    background: #fef3c7;
+    border-left: 4px solid #f59e0b;
+    padding: 12px 15px;
+    margin: 15px 0;
+}
+
+.important {
+    background: #fee2e2;
+    border-left: 4px solid #ef4444;
+    padding: 12px 15px;
+    margin: 15px 0;
+}
 
-<div class="architecture-diagram">
+img.architecture-diagram {
+    width: 100%;
+    padding: 0;
+}
+
+.architecture-diagram {
+    page-break-inside: avoid;
+    background: #f8fafc;
+    border: 1px solid #e2e8f0;
+    padding: 20px;
+    margin: 20px 0;
+    font-family: 'Courier New', monospace;
+    font-size: 9pt;
+    white-space: pre;
+    line-height: 1.4;
+}
+"""
+
+ARCHITECTURE_DIAGRAM = """\
 ┌─────────────────────────────────────────────────────────────────────────────┐
 │                           USER INTERFACE LAYER                               │
 │  ┌──────────────────┐  ┌──────────────────┐  ┌──────────────────┐          │
@@ -360,8 +317,95 @@ HTML_CONTENT = """
 │  │  • AHA/NHS clinical recommendations                               │       │
 │  └──────────────────────────────────────────────────────────────────┘       │
 └─────────────────────────────────────────────────────────────────────────────┘
+"""
+
+ARCHITECTURE_DIAGRAM_HTML = (
+    '<div class="architecture-diagram">\n' + ARCHITECTURE_DIAGRAM + "</div>"
+)
+
+HTML_CONTENT = """
+<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <title>Polygenic Risk Score Calculator - Technical Documentation</title>
+</head>
+<body>
+
+<!-- Cover Page -->
+<div class="cover">
+    <h1>Polygenic Risk Score Calculator</h1>
+    <div class="subtitle">Technical Documentation & Research Context</div>
+    <p style="font-size: 14pt; color: #4a5568;">
+        A clinical-grade tool for computing multi-disease genetic risk assessments<br>
+        using validated scores from the PGS Catalog
+    </p>
+    <div class="meta">
+        <p><strong>Version:</strong> 1.0.0</p>
+        <p><strong>Generated:</strong> ${generated_date}</p>
+        <p><strong>Repository:</strong> polygenic-risk-score-calc</p>
+    </div>
+</div>
+
+<!-- Table of Contents -->
+<div class="toc">
+    <h2>Table of Contents</h2>
+    <div class="toc-item"><span>1. Executive Summary</span><span>3</span></div>
+    <div class="toc-item"><span>2. System Architecture</span><span>4</span></div>
+    <div class="toc-item"><span>3. Core Algorithm</span><span>6</span></div>
+    <div class="toc-item"><span>4. Data Sources & PGS Catalog Integration</span><span>8</span></div>
+    <div class="toc-item"><span>5. Module Documentation</span><span>10</span></div>
+    <div class="toc-item"><span>&nbsp;&nbsp;&nbsp;5.1 DNA Parser (dna_parser.py)</span><span>10</span></div>
+    <div class="toc-item"><span>&nbsp;&nbsp;&nbsp;5.2 Liftover (liftover.py)</span><span>11</span></div>
+    <div class="toc-item"><span>&nbsp;&nbsp;&nbsp;5.3 PGS Catalog Client (pgscatalog.py)</span><span>12</span></div>
+    <div class="toc-item"><span>&nbsp;&nbsp;&nbsp;5.4 Population Parameters (populations.py)</span><span>13</span></div>
+    <div class="toc-item"><span>&nbsp;&nbsp;&nbsp;5.5 PRS Calculator (prs_calculator.py)</span><span>14</span></div>
+    <div class="toc-item"><span>&nbsp;&nbsp;&nbsp;5.6 Imputation (imputation.py)</span><span>16</span></div>
+    <div class="toc-item"><span>&nbsp;&nbsp;&nbsp;5.7 Report Generator (report_generator.py)</span><span>17</span></div>
+    <div class="toc-item"><span>6. Deployment Architecture</span><span>18</span></div>
+    <div class="toc-item"><span>7. Disease Catalog</span><span>19</span></div>
+    <div class="toc-item"><span>8. Population Genetics & Normalization</span><span>20</span></div>
+    <div class="toc-item"><span>9. Technical Dependencies</span><span>21</span></div>
+    <div class="toc-item"><span>10. API Reference</span><span>22</span></div>
+    <div class="toc-item"><span>11. Clinical Considerations</span><span>24</span></div>
+    <div class="toc-item"><span>12. Future Enhancements</span><span>25</span></div>
 </div>
 
+<!-- Section 1: Executive Summary -->
+<h1>1. Executive Summary</h1>
+
+<p>The <strong>Polygenic Risk Score (PRS) Calculator</strong> is a comprehensive software system designed to compute genetic risk assessments for multiple diseases using consumer genetic testing data. The system processes raw DNA files from popular direct-to-consumer (DTC) testing services (23andMe, AncestryDNA) and standard VCF files, matching genetic variants against validated scoring files from the PGS Catalog to generate population-normalized risk percentiles.</p>
+
+<h2>Key Capabilities</h2>
+<ul>
+    <li><strong>Multi-format DNA parsing:</strong> 23andMe, AncestryDNA, and VCF file support with automatic format detection</li>
+    <li><strong>Genome build handling:</strong> Automatic detection and liftover between GRCh37 (hg19) and GRCh38 (hg38)</li>
+    <li><strong>10-disease risk panel:</strong> Validated PGS Catalog scores for cardiovascular, oncological, metabolic, and neurological conditions</li>
+    <li><strong>Ancestry-aware normalization:</strong> Population-specific z-score conversion for EUR, AFR, EAS, SAS, and AMR ancestries</li>
+    <li><strong>Optional genotype imputation:</strong> Michigan Imputation Server integration for enhanced variant coverage (2% → 98%)</li>
+    <li><strong>Clinical-grade reporting:</strong> NHS/AHA-compliant PDF reports with risk visualizations and actionable recommendations</li>
+    <li><strong>Serverless deployment:</strong> Modal.com integration for scalable, pay-per-use cloud execution</li>
+</ul>
+
+<h2>Target Use Cases</h2>
+<ol>
+    <li><strong>Consumer genetic interpretation:</strong> Enabling individuals to understand disease risk from existing DTC genetic data</li>
+    <li><strong>Research applications:</strong> Batch processing for cohort studies and biobank analyses</li>
+    <li><strong>Clinical decision support:</strong> Providing risk stratification to inform preventive care discussions</li>
+    <li><strong>Educational tools:</strong> Demonstrating polygenic score methodology for genetics education</li>
+</ol>
+
+<div class="note">
+    <strong>Important:</strong> This tool provides genetic risk estimates for educational and research purposes only. Results should not be used for clinical diagnosis without consultation with qualified healthcare providers.
+</div>
+
+<!-- Section 2: System Architecture -->
+<h1>2. System Architecture</h1>
+
+<p>The system follows a modular pipeline architecture with clear separation of concerns across six functional layers:</p>
+
+""" + ARCHITECTURE_DIAGRAM_HTML + """
+
 <h2>Data Flow</h2>
 <ol>
     <li><strong>Input:</strong> User uploads raw DNA file (23andMe/AncestryDNA/VCF)</li>
@@ -1043,53 +1087,304 @@ Output: Path to generated PDF
 
 <div style="margin-top: 60px; padding-top: 20px; border-top: 2px solid #e0e0e0; text-align: center; color: #666;">
     <p><strong>Polygenic Risk Score Calculator - Technical Documentation</strong></p>
-    <p>Generated: """ + datetime.now().strftime("%B %d, %Y at %H:%M") + """</p>
+    <p>Generated: ${generated_date}</p>
     <p>Version 1.0.0</p>
 </div>
 
 </body>
 </html>
 """
+_TABLE_RE = re.compile(r"<table>(.*?)</table>", re.S)
+_ROW_RE = re.compile(r"<tr>(.*?)</tr>", re.S)
+_CELL_RE = re.compile(r"<t[hd]>(.*?)</t[hd]>", re.S)
+_TAG_RE = re.compile(r"<[^>]+>")
 
-def generate_pdf():
-    """Generate the research context PDF."""
-    print("Generating PRS Calculator Research Context PDF...")
+# Table cell styling, inlined on each cell by _fix_table
+STRIPE_BACKGROUND = "#f9fafb"
+TH_STYLE = (
+    "background: #1e3a5f; color: white; padding: 10px 12px; "
+    "text-align: left; font-weight: 600;"
+)
+TD_STYLE = "padding: 8px 12px; border-bottom: 1px solid #e0e0e0;"
+
+
+def _fix_table(match: re.Match) -> str:
+    """Add explicit column widths and inline row and cell styling to one table."""
+    body = match.group(1)
+    rows = [_CELL_RE.findall(row) for row in _ROW_RE.findall(body)]
+
+    # Size columns by their longest cell text so fixed layout stays readable
+    n_cols = max(len(cells) for cells in rows)
+    lengths = [4] * n_cols
+    for cells in rows:
+        for i, cell in enumerate(cells):
+            lengths[i] = max(lengths[i], len(_TAG_RE.sub("", cell).strip()))
+    total = sum(lengths)
+    colgroup = "".join(
+        f'<col style="width: {100 * length / total:.1f}%">' for length in lengths
+    )
+
+    # Rows are numbered from the header row, like tr:nth-child(even)
+    row_number = 0
+
+    def stripe(row_match: re.Match) -> str:
+        nonlocal row_number
+        row_number += 1
+        if row_number % 2 == 0:
+            return f'<tr style="background: {STRIPE_BACKGROUND};">'
+        return row_match.group(0)
+
+    body = re.sub(r"<tr>", stripe, body)
+    body = body.replace("<th>", f'<th style="{TH_STYLE}">')
+    body = body.replace("<td>", f'<td style="{TD_STYLE}">')
+    return f"<table><colgroup>{colgroup}</colgroup>{body}</table>"
+
+
+def _fix_table_layout(html: str) -> str:
+    """Precompute table column widths and styling so layout needs no measuring pass."""
+    return _TABLE_RE.sub(_fix_table, html)
+
+
+# Compiled once; only the generation date varies between runs
+HTML_TEMPLATE = Template(_fix_table_layout(HTML_CONTENT))
+
+
+def render_html(now: Optional[datetime] = None) -> str:
+    """
+    Fill the generation date into the document HTML.
+
+    Only the day is stamped, so every run on the same day produces the
+    same document and a rendered PDF can be reused.
+    """
+    now = now or datetime.now()
+    return HTML_TEMPLATE.substitute(generated_date=now.strftime("%B %d, %Y"))
+
+
+@lru_cache(maxsize=None)
+def get_font_config() -> "FontConfiguration":
+    """Create the WeasyPrint font configuration once, so fonts are discovered once."""
+    # Imported lazily: WeasyPrint pulls in Pango/Cairo, which importing this
+    # module for its constants should not pay for
+    from weasyprint.text.fonts import FontConfiguration
+
+    return FontConfiguration()
+
+
+@lru_cache(maxsize=None)
+def get_stylesheet() -> "CSS":
+    """Parse the document stylesheet once and reuse it across generations."""
+    from weasyprint import CSS
+
+    return CSS(string=CSS_TEXT, font_config=get_font_config())
+
+
+def render_architecture_diagram() -> Optional[Path]:
+    """
+    Rasterize the ASCII architecture diagram to a PNG.
+
+    Laying out the ~80-line monospace block glyph by glyph is the slowest
+    part of rendering this document, so the diagram is drawn once with
+    Pillow and embedded as an image. The PNG is cached on disk keyed by
+    a hash of the diagram text.
+
+    Returns:
+        Path to the PNG, or None if Pillow or the font is unavailable
+        (the diagram is then rendered as text)
+    """
+    if Image is None:
+        return None
+
+    digest = hashlib.blake2b(ARCHITECTURE_DIAGRAM.encode(), digest_size=8).hexdigest()
+    png_path = CACHE_DIR / f"architecture_{digest}.png"
+    if png_path.exists():
+        return png_path
+
+    try:
+        font = ImageFont.truetype(DIAGRAM_FONT, DIAGRAM_FONT_SIZE)
+    except OSError:
+        return None
+
+    lines = ARCHITECTURE_DIAGRAM.splitlines()
+    char_width = font.getlength("M")
+    line_height = int(DIAGRAM_FONT_SIZE * 1.4)
+    width = int(char_width * max(len(line) for line in lines)) + 2 * DIAGRAM_PADDING
+    height = line_height * len(lines) + 2 * DIAGRAM_PADDING
+
+    image = Image.new("RGB", (width, height), "#f8fafc")
+    draw = ImageDraw.Draw(image)
+    draw.rectangle([(0, 0), (width - 1, height - 1)], outline="#e2e8f0", width=2)
+    for i, line in enumerate(lines):
+        draw.text(
+            (DIAGRAM_PADDING, DIAGRAM_PADDING + i * line_height),
+            line,
+            font=font,
+            fill="#1a1a1a",
+        )
+
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    image.save(png_path, optimize=True)
+    return png_path
+
+
+def compress_pdf(pdf_bytes: bytes) -> bytes:
+    """
+    Recompress and linearize a PDF.
+
+    WeasyPrint already subsets embedded fonts, but it writes a plain
+    cross-reference table and leaves some streams uncompressed. The output
+    is also linearized ("fast web view") so viewers can show the cover
+    page before the whole file has downloaded. This is skipped if pikepdf
+    is not installed.
+
+    Args:
+        pdf_bytes: PDF document as produced by WeasyPrint
+
+    Returns:
+        Compressed, linearized PDF bytes, or the input unchanged without pikepdf
+    """
+    if pikepdf is None:
+        return pdf_bytes
+
+    with pikepdf.Pdf.open(io.BytesIO(pdf_bytes)) as pdf:
+        out = io.BytesIO()
+        pdf.save(
+            out,
+            compress_streams=True,
+            stream_decode_level=pikepdf.StreamDecodeLevel.generalized,
+            object_stream_mode=pikepdf.ObjectStreamMode.generate,
+            linearize=True,
+        )
+    return out.getvalue()
+
+
+def _render_weasyprint(html_content: str) -> bytes:
+    """Render HTML to PDF bytes with WeasyPrint and the cached stylesheet and fonts."""
+    from weasyprint import HTML
+
+    buffer = io.BytesIO()
+    HTML(string=html_content).write_pdf(
+        buffer,
+        stylesheets=[get_stylesheet()],
+        font_config=get_font_config(),
+        **PDF_IMAGE_OPTIONS,
+    )
+    return buffer.getvalue()
+
+
+def _render_chromium(html_content: str) -> bytes:
+    """Render HTML to PDF bytes with headless Chromium via playwright."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # Load from disk so file:// images (the diagram PNG) are allowed
+        html_path = Path(tmp_dir) / "document.html"
+        html_path.write_text(html_content, encoding="utf-8")
+
+        with sync_playwright() as playwright:
+            browser = playwright.chromium.launch()
+            try:
+                page = browser.new_page()
+                page.goto(html_path.as_uri())
+                page.add_style_tag(content=CSS_TEXT)
+                return page.pdf(
+                    format="A4",
+                    prefer_css_page_size=True,
+                    print_background=True,
+                    display_header_footer=True,
+                    header_template="<span></span>",
+                    footer_template=CHROMIUM_FOOTER,
+                )
+            finally:
+                browser.close()
+
+
+def build_pdf(html_content: str, output_path: Path) -> Path:
+    """
+    Render HTML to a PDF file with the document stylesheet.
+
+    Uses WeasyPrint unless PRS_PDF_BACKEND=chromium is set and playwright
+    is installed. The PDF is rendered in memory, post-processed, then
+    swapped into place in one write so readers never see a partial file.
+
+    Args:
+        html_content: Complete HTML document
+        output_path: Destination PDF path
+
+    Returns:
+        Path to the written PDF
+    """
+    if PDF_BACKEND == "chromium" and sync_playwright is not None:
+        pdf_bytes = _render_chromium(html_content)
+    else:
+        if PDF_BACKEND == "chromium":
+            print("playwright is not installed, falling back to WeasyPrint")
+        pdf_bytes = _render_weasyprint(html_content)
 
-    # PDF-specific CSS optimizations
-    pdf_css = CSS(string="""
-        @page {
-            size: A4;
-            margin: 2cm 2.5cm;
-        }
+    tmp_path = output_path.with_suffix(".pdf.tmp")
+    tmp_path.write_bytes(compress_pdf(pdf_bytes))
+    os.replace(tmp_path, output_path)
+    return output_path
 
-        h1 {
-            page-break-after: avoid;
-        }
 
-        h2, h3 {
-            page-break-after: avoid;
-        }
+def _document_digest(html_content: str) -> str:
+    """Hash everything that determines the rendered PDF."""
+    digest = hashlib.blake2b(digest_size=16)
+    for part in (html_content, CSS_TEXT, PDF_BACKEND):
+        digest.update(part.encode())
+    return digest.hexdigest()
 
-        table, pre, .formula, .note, .important {
-            page-break-inside: avoid;
-        }
 
-        .cover {
-            page-break-after: always;
-        }
+def generate_pdf(use_cache: bool = True):
+    """
+    Generate the research context PDF.
 
-        .toc {
-            page-break-after: always;
-        }
-    """)
+    Args:
+        use_cache: Reuse a cached render of identical content if available
+    """
+    print("Generating PRS Calculator Research Context PDF...")
 
-    html = HTML(string=HTML_CONTENT)
-    html.write_pdf(OUTPUT_PATH, stylesheets=[pdf_css])
+    html_content = render_html()
+    diagram_png = render_architecture_diagram()
+    if diagram_png is not None:
+        html_content = html_content.replace(
+            ARCHITECTURE_DIAGRAM_HTML,
+            f'<img class="architecture-diagram" src="{diagram_png.resolve().as_uri()}" '
+            f'alt="System architecture diagram">',
+        )
+
+    # Reuse a previous render of identical content (same day, same source)
+    cached_pdf = CACHE_DIR / f"research_context_{_document_digest(html_content)}.pdf"
+    if use_cache and cached_pdf.exists():
+        tmp_path = OUTPUT_PATH.with_suffix(".pdf.tmp")
+        shutil.copyfile(cached_pdf, tmp_path)
+        os.replace(tmp_path, OUTPUT_PATH)
+        print("Document unchanged, reused cached render")
+    else:
+        build_pdf(html_content, OUTPUT_PATH)
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(OUTPUT_PATH, cached_pdf)
 
     print(f"PDF generated successfully: {OUTPUT_PATH}")
     print(f"File size: {OUTPUT_PATH.stat().st_size / 1024:.1f} KB")
     return OUTPUT_PATH
 
 
+def main():
+    """Command-line entry point."""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Render without the cache under cProfile and print the hottest calls",
+    )
+    args = parser.parse_args()
+
+    if not args.profile:
+        generate_pdf()
+        return
+
+    profiler = cProfile.Profile()
+    profiler.runcall(generate_pdf, use_cache=False)
+    pstats.Stats(profiler).sort_stats(pstats.SortKey.CUMULATIVE).print_stats(30)
+
+
 if __name__ == "__main__":
-    generate_pdf()
+    main()
@@ -4,14 +4,19 @@ Modal serverless deployment for Polygenic Risk Score Calculator.
 Provides a scalable, pay-per-use deployment for PRS computation.
 """
 
+import hashlib
+import os
 import tempfile
+import time
 from pathlib import Path
 from typing import Any
 
 import modal
 
-# Create Modal app
-app = modal.App("polygenic-risk-score-calc")
+try:
+    from fastapi import Request
+except ImportError:  # only installed in the container image
+    Request = None
 
 # Define container image with dependencies and copy local code
 image = (
@@ -20,26 +25,116 @@ image = (
         "pandas>=2.0",
         "numpy>=1.24",
         "scipy>=1.11",
+        "pyarrow>=14.0",
+        "isal>=1.0",
+        "rapidgzip>=0.10",
         "requests>=2.31",
         "weasyprint>=60.0",
-        "pyliftover>=0.4",
         "fastapi>=0.100.0",
+        "orjson>=3.9",
     )
     .add_local_dir(
         local_path=Path(__file__).parent / "src",
         remote_path="/root/src",
     )
-    .add_local_dir(
-        local_path=Path(__file__).parent / "data",
-        remote_path="/root/data",
-    )
 )
 
+# Downloaded PGS scoring files (and their parsed caches) persist across
+# containers, so only the first cold start ever fetches them from the
+# PGS Catalog. Mounted where src/pgscatalog.py keeps its CACHE_DIR.
+PGS_CACHE_PATH = "/root/data/cache"
+pgs_cache = modal.Volume.from_name("pgs-catalog-cache", create_if_missing=True)
+
+# Memory for PRS functions. Parsed scoring files stay resident between
+# requests on a warm container (up to pgscatalog.MAX_CACHED_SCORE_FILES of
+# them, ~85 bytes per variant), so single uploads need the same headroom
+# as batches.
+PRS_MEMORY_MB = 8192
+
+# Create Modal app; every function runs on the shared image above
+app = modal.App("polygenic-risk-score-calc", image=image)
+
+# Full-workflow results keyed by upload content, shared across containers.
+# PRS results are deterministic in (file, ancestry), so re-submitting the
+# same file skips the PRS computation. Only PRS results are stored: the PDF
+# is rendered again per request, since Modal keeps spawned call outputs for
+# a limited time. Entries record when they were stored; expired ones are
+# ignored on read and removed by evict_expired_results.
+results_cache = modal.Dict.from_name("prs-results", create_if_missing=True)
+RESULTS_TTL_SECONDS = 24 * 60 * 60
+
+
+def _cached_files() -> set[str]:
+    """List the files currently in the scoring-file cache volume."""
+    cache_dir = Path(PGS_CACHE_PATH)
+    return set(os.listdir(cache_dir)) if cache_dir.exists() else set()
+
+
+def _content_digest(file_content: bytes) -> str:
+    """Hash the upload bytes; stable across containers, unlike hash()."""
+    return hashlib.blake2b(file_content).hexdigest()
+
+
+def _compute_prs(
+    file_content: bytes,
+    filename: str,
+    ancestry: str,
+) -> dict[str, Any]:
+    """Parse one upload and score it against every catalog disease."""
+    import sys
+    sys.path.insert(0, "/root")
+
+    # Import modules (inside function for Modal)
+    from src.dna_parser import parse_raw_dna_bytes
+    from src.liftover import ensure_build
+    from src.prs_calculator import compute_all_diseases
+
+    # Parse DNA file straight from the uploaded bytes; an unreadable upload
+    # fails before any scoring file is loaded
+    genotypes_df, file_format, detected_build = parse_raw_dna_bytes(file_content, filename)
+
+    if genotypes_df.empty:
+        raise ValueError("Could not parse any variants from file")
+
+    # Ensure correct build
+    genotypes_df = ensure_build(genotypes_df, target_build="GRCh37")
+
+    # Compute PRS for all diseases concurrently; scoring files are loaded
+    # (and downloaded on a cold volume) by the same worker threads
+    batch = compute_all_diseases(genotypes_df, population=ancestry)
+
+    # Diseases that failed or matched no variants are left out
+    prs_results = {
+        disease: {
+            "raw_prs": result["raw_prs"],
+            "zscore": result["zscore"],
+            "percentile": result["percentile"],
+            "risk_category": result["risk_category"],
+            "matched_variants": result["matched_variants"],
+            "total_variants": result["total_variants"],
+        }
+        for disease, result in batch["results"].items()
+        if result.get("percentile") is not None
+    }
+
+    return {
+        "status": "success",
+        "prs_results": prs_results,
+        "metadata": {
+            "filename": filename,
+            "format": file_format,
+            "build": detected_build,
+            "ancestry": ancestry,
+            "variant_count": len(genotypes_df),
+            "diseases_computed": len(prs_results),
+        }
+    }
+
 
 @app.function(
-    image=image,
     timeout=600,  # 10 minute timeout for processing
-    memory=2048,  # 2GB memory
+    memory=PRS_MEMORY_MB,
+    volumes={PGS_CACHE_PATH: pgs_cache},
 )
 def compute_prs(
     file_content: bytes,
@@ -57,79 +152,71 @@ def compute_prs(
     Returns:
         Dictionary with PRS results and metadata
     """
+    cached_files = _cached_files()
+
+    result = _compute_prs(file_content, filename, ancestry)
+
+    # Publish any newly downloaded scoring files to other containers
+    if _cached_files() != cached_files:
+        pgs_cache.commit()
+
+    return result
+
+
+@app.function(
+    timeout=3600,  # 1 hour for large research batches
+    memory=PRS_MEMORY_MB,
+    volumes={PGS_CACHE_PATH: pgs_cache},
+)
+def compute_prs_batch(
+    files: list[bytes],
+    filenames: list[str],
+    ancestries: list[str],
+) -> list[dict[str, Any]]:
+    """
+    Compute Polygenic Risk Scores for many DNA files in one container.
+
+    Scoring files are downloaded and parsed once up front and the in-memory
+    cache is shared by every upload, so container start-up, imports and
+    score loading are paid once per batch instead of once per file. A file that fails to parse gets an error
+    entry; it does not abort the rest of the batch.
+
+    Args:
+        files: Raw bytes of each DNA file
+        filenames: Original filename of each file
+        ancestries: Ancestry code for each file (EUR, AFR, EAS, AMR, SAS)
+
+    Returns:
+        List of compute_prs results, in input order
+    """
     import sys
     sys.path.insert(0, "/root")
+    from src.pgscatalog import get_all_disease_scores
 
-    # Write file content to temp file
-    with tempfile.NamedTemporaryFile(
-        suffix=Path(filename).suffix,
-        delete=False
-    ) as tmp:
-        tmp.write(file_content)
-        filepath = Path(tmp.name)
+    if not len(files) == len(filenames) == len(ancestries):
+        raise ValueError("files, filenames and ancestries must have the same length")
 
-    try:
-        # Import modules (inside function for Modal)
-        from src.dna_parser import parse_raw_dna, detect_format, detect_build
-        from src.liftover import ensure_build
-        from src.pgscatalog import load_scores_for_disease, DISEASE_CATALOG
-        from src.prs_calculator import calculate_prs, normalize_prs
-
-        # Parse DNA file
-        file_format = detect_format(filepath)
-        detected_build = detect_build(filepath)
-        genotypes_df = parse_raw_dna(filepath)
-
-        if genotypes_df.empty:
-            raise ValueError("Could not parse any variants from file")
-
-        # Ensure correct build
-        genotypes_df = ensure_build(genotypes_df, target_build="GRCh37")
-
-        # Compute PRS for all diseases
-        prs_results = {}
-        for disease in DISEASE_CATALOG.keys():
-            try:
-                scores_df = load_scores_for_disease(disease)
-                if scores_df.empty:
-                    continue
-
-                prs_result = calculate_prs(genotypes_df, scores_df)
-                normalized = normalize_prs(prs_result["raw_prs"], population=ancestry)
-
-                prs_results[disease] = {
-                    "raw_prs": prs_result["raw_prs"],
-                    "zscore": normalized["zscore"],
-                    "percentile": normalized["percentile"],
-                    "risk_category": normalized["risk_category"],
-                    "matched_variants": prs_result["matched_variants"],
-                    "total_variants": prs_result["total_variants"],
-                }
-            except Exception:
-                continue
-
-        return {
-            "status": "success",
-            "prs_results": prs_results,
-            "metadata": {
-                "filename": filename,
-                "format": file_format,
-                "build": detected_build,
-                "ancestry": ancestry,
-                "variant_count": len(genotypes_df),
-                "diseases_computed": len(prs_results),
-            }
-        }
+    cached_files = _cached_files()
 
-    finally:
-        # Cleanup temp file
-        filepath.unlink(missing_ok=True)
+    # Download and parse every scoring file; the first
+    # MAX_CACHED_SCORE_FILES stay in memory, the rest reload from disk
+    get_all_disease_scores()
+
+    results = []
+    for file_content, filename, ancestry in zip(files, filenames, ancestries):
+        try:
+            results.append(_compute_prs(file_content, filename, ancestry))
+        except Exception as e:
+            results.append({"status": "error", "filename": filename, "message": str(e)})
+
+    if _cached_files() != cached_files:
+        pgs_cache.commit()
+
+    return results
 
 
 @app.function(
-    image=image,
     timeout=120,
-    
 )
 def generate_report_pdf(
     prs_results: dict[str, Any],
@@ -162,9 +249,7 @@ def generate_report_pdf(
 
 
 @app.function(
-    image=image,
     timeout=900,  # 15 minutes for full workflow
-    
 )
 def process_full(
     file_content: bytes,
@@ -172,7 +257,12 @@ def process_full(
     ancestry: str,
 ) -> dict[str, Any]:
     """
-    Full workflow: compute PRS and generate PDF.
+    Full workflow: compute PRS and start PDF generation.
+
+    The PDF is rendered in the background so the PRS results are returned
+    as soon as they are ready; fetch the report from get_pdf with the
+    returned job_id. Cached PRS results are reused for repeated uploads,
+    but every call starts a new PDF job.
 
     Args:
         file_content: Raw DNA file bytes
@@ -180,72 +270,156 @@ def process_full(
         ancestry: Ancestry code
 
     Returns:
-        Dictionary with PDF bytes if successful, error otherwise
+        Dictionary with PRS results and the PDF job_id if successful,
+        error otherwise
     """
-    # Compute PRS
-    prs_result = compute_prs.remote(
-        file_content=file_content,
-        filename=filename,
-        ancestry=ancestry,
-    )
+    digest = _content_digest(file_content)
+    cache_key = f"{digest}:{ancestry}:{filename}"
+    cached = results_cache.get(cache_key)
+    if cached is not None and not _is_expired(cached):
+        prs_result = cached["result"]
+    else:
+        # Compute PRS
+        prs_result = compute_prs.remote(
+            file_content=file_content,
+            filename=filename,
+            ancestry=ancestry,
+        )
 
-    if prs_result["status"] != "success":
-        return {
-            "status": "error",
-            "message": "PRS computation failed",
-        }
+        if prs_result["status"] != "success":
+            return {
+                "status": "error",
+                "message": "PRS computation failed",
+            }
 
-    # Generate PDF report
+        results_cache[cache_key] = {"cached_at": time.time(), "result": prs_result}
+
+    # Generate PDF report in the background
     user_info = {
-        "patient_id": f"PRS-{hash(filename) % 100000:05d}",
+        "patient_id": f"PRS-{digest[:16]}",
         "ancestry": ancestry,
         "filename": filename,
     }
 
-    pdf_bytes = generate_report_pdf.remote(
+    pdf_call = generate_report_pdf.spawn(
         prs_results=prs_result["prs_results"],
         user_info=user_info,
     )
 
     return {
-        "status": "success",
-        "pdf_content": pdf_bytes,
+        "status": "pending",
+        "job_id": pdf_call.object_id,
+        "prs_results": prs_result["prs_results"],
         "metadata": prs_result["metadata"],
     }
 
 
+def _is_expired(entry: dict[str, Any]) -> bool:
+    """Whether a results_cache entry is older than RESULTS_TTL_SECONDS."""
+    return time.time() - entry.get("cached_at", 0) >= RESULTS_TTL_SECONDS
+
+
+@app.function(
+    schedule=modal.Period(hours=1),
+    timeout=300,
+)
+def evict_expired_results() -> int:
+    """
+    Remove expired entries from the shared results cache.
+
+    Returns:
+        Number of entries removed
+    """
+    expired = [key for key, entry in results_cache.items() if _is_expired(entry)]
+    for key in expired:
+        try:
+            results_cache.pop(key)
+        except KeyError:
+            pass  # Removed concurrently
+
+    return len(expired)
+
+
 # Web endpoint for HTTP access from Vercel/frontend
 @app.function(
-    image=image,
     timeout=600,
-    memory=2048,
-    
+    memory=PRS_MEMORY_MB,
+    volumes={PGS_CACHE_PATH: pgs_cache},
 )
 @modal.fastapi_endpoint(method="POST")
-def compute_prs_web(request: dict) -> dict:
+async def compute_prs_web(request: Request):
     """
     HTTP endpoint for PRS computation.
 
-    Expects JSON body with:
+    Accepts either the raw file (optionally gzip-compressed) as the request
+    body, with filename and ancestry as query parameters, or the legacy
+    JSON body with:
     - file_content: base64 encoded file content
     - filename: original filename
     - ancestry: ancestry code (EUR, AFR, EAS, AMR, SAS)
     """
     import base64
 
-    try:
-        file_content = base64.b64decode(request.get("file_content", ""))
-        filename = request.get("filename", "upload.txt")
-        ancestry = request.get("ancestry", "EUR")
+    import orjson
+    from fastapi import Response
+    from fastapi.concurrency import run_in_threadpool
 
-        result = compute_prs.local(
+    try:
+        body = await request.body()
+
+        if request.headers.get("content-type", "").startswith("application/json"):
+            payload = orjson.loads(body)
+            file_content = base64.b64decode(payload.get("file_content", ""))
+            filename = payload.get("filename", "upload.txt")
+            ancestry = payload.get("ancestry", "EUR")
+        else:
+            file_content = body
+            filename = request.query_params.get("filename", "upload.txt")
+            ancestry = request.query_params.get("ancestry", "EUR")
+
+        result = await run_in_threadpool(
+            compute_prs.local,
             file_content=file_content,
             filename=filename,
             ancestry=ancestry,
         )
-        return result
     except Exception as e:
-        return {"status": "error", "message": str(e)}
+        result = {"status": "error", "message": str(e)}
+
+    return Response(
+        content=orjson.dumps(result, option=orjson.OPT_SERIALIZE_NUMPY),
+        media_type="application/json",
+    )
+
+
+@app.function(timeout=60)
+@modal.fastapi_endpoint(method="GET")
+def get_pdf(job_id: str):
+    """
+    HTTP endpoint for PDF reports started by process_full.
+
+    Returns 202 while the report is still rendering, the PDF once it is
+    done, 410 if Modal no longer holds the job's output (submit the file
+    to process_full again for a new job), and 500 with an error message
+    if rendering failed.
+    """
+    import orjson
+    from fastapi import Response
+
+    try:
+        pdf_bytes = modal.FunctionCall.from_id(job_id).get(timeout=0)
+    except TimeoutError:
+        return Response(status_code=202)
+    except modal.exception.OutputExpiredError:
+        return Response(status_code=410)
+    except Exception as e:
+        return Response(
+            content=orjson.dumps({"status": "error", "message": f"PDF generation failed: {e}"}),
+            status_code=500,
+            media_type="application/json",
+        )
+
+    return Response(content=pdf_bytes, media_type="application/pdf")
 
 
 # Local entrypoint for testing
@@ -257,9 +431,12 @@ def main():
     print()
     print("Available functions:")
     print("  - compute_prs: Compute PRS from DNA file")
+    print("  - compute_prs_batch: Compute PRS for many files in one container")
     print("  - generate_report_pdf: Generate PDF report")
-    print("  - process_full: Full workflow (PRS + PDF)")
+    print("  - process_full: Full workflow (PRS + background PDF)")
+    print("  - evict_expired_results: Hourly cleanup of cached results")
     print("  - compute_prs_web: HTTP endpoint for web access")
+    print("  - get_pdf: HTTP endpoint for finished PDF reports")
     print()
     print("Deploy with: modal deploy modal_app.py")
     print("Serve locally with: modal serve modal_app.py")
@@ -7,13 +7,41 @@ Supports:
 - VCF (Variant Call Format) files
 """
 
+import csv
+import hashlib
+import io
+import logging
+import os
 import re
 import gzip
+import tempfile
+from contextlib import contextmanager
+from itertools import chain, islice
 from pathlib import Path
 from typing import Optional
 
+import numpy as np
 import pandas as pd
 
+try:
+    import pyarrow as pa
+    from pyarrow import csv as pa_csv
+except ImportError:
+    pa = None
+    pa_csv = None
+
+try:
+    from isal import igzip  # ISA-L accelerated inflate, same API as gzip
+except ImportError:
+    igzip = gzip
+
+try:
+    import rapidgzip  # multi-threaded inflate for very large archives
+except ImportError:
+    rapidgzip = None
+
+logger = logging.getLogger(__name__)
+
 
 # Known SNP positions for build detection heuristics
 # These are well-characterized SNPs with known positions in each build
@@ -27,51 +55,169 @@ BUILD_DETECTION_SNPS = {
 }
 
 
+# Read size for decompressed streams; large reads amortize per-call overhead
+GZIP_READ_BUFFER = 128 * 1024
+
+
+def _text_stream(stream):
+    """Wrap a binary (decompressing) stream as buffered UTF-8 text."""
+    return io.TextIOWrapper(
+        io.BufferedReader(stream, buffer_size=GZIP_READ_BUFFER),
+        encoding="utf-8",
+        errors="replace",
+    )
+
+
 def _open_file(filepath: Path):
     """Open a file, handling gzip compression if present."""
     filepath = Path(filepath)
     if filepath.suffix == ".gz" or str(filepath).endswith(".gz"):
-        return gzip.open(filepath, "rt", encoding="utf-8", errors="replace")
+        return _text_stream(igzip.open(filepath, "rb"))
     return open(filepath, "r", encoding="utf-8", errors="replace")
 
 
-def detect_format(filepath: Path) -> str:
-    """
-    Detect the format of a genetic data file.
+# Compressed size above which whole-file parses inflate on several threads
+PARALLEL_GZIP_MIN_BYTES = 200_000_000
 
-    Args:
-        filepath: Path to the genetic data file
 
-    Returns:
-        One of: "23andme", "ancestrydna", "vcf"
+def _open_file_parallel(filepath: Path):
+    """
+    Open a file for a full parse, inflating large gzip files in parallel.
 
-    Raises:
-        ValueError: If format cannot be determined
+    Falls back to _open_file() for small files, single-CPU hosts or when
+    rapidgzip is not installed.
     """
     filepath = Path(filepath)
+    threads = os.cpu_count() or 1
+    if (
+        rapidgzip is not None
+        and threads > 1
+        and str(filepath).endswith(".gz")
+        and filepath.stat().st_size > PARALLEL_GZIP_MIN_BYTES
+    ):
+        return _text_stream(rapidgzip.open(str(filepath), parallelization=threads))
+    return _open_file(filepath)
+
+
+@contextmanager
+def _table_source(filepath: Path):
+    """
+    Yield the source a full parse should hand to the pandas reader.
 
-    # Check file extension first
-    name_lower = filepath.name.lower()
+    Plain files are passed by path, so the C parser reads and tokenizes the
+    raw bytes without a Python-level text stream in between; gzip files are
+    passed as a decompressing stream from _open_file_parallel().
+    """
+    filepath = Path(filepath)
+    if str(filepath).endswith(".gz"):
+        with _open_file_parallel(filepath) as f:
+            yield f
+    else:
+        yield str(filepath)
+
+
+# Number of leading lines inspected when sniffing the build, and of leading
+# characters inspected when sniffing the format
+PREVIEW_LINES = 5000
+FORMAT_PREVIEW_BYTES = 4096
+
+# (rsid, chrom, pos) -> build, so matching a data line is one dict lookup
+BUILD_BY_SNP_POSITION = {
+    (rsid, chrom, pos): build
+    for rsid, positions in BUILD_DETECTION_SNPS.items()
+    for build, (chrom, pos) in positions.items()
+}
+
+# Position matches for one build that settle detection: a majority of the
+# detection SNPs, so the other build can no longer overtake it
+DECISIVE_BUILD_MATCHES = len(BUILD_DETECTION_SNPS) // 2 + 1
+
+# Detected builds, keyed by (path, mtime_ns, size) so edited files are re-scanned
+_BUILD_CACHE: dict[tuple, str] = {}
+
+# 23andMe data columns and genotype calls that mean "no call"
+TWENTYTHREEANDME_COLUMNS = ["rsid", "chrom", "pos", "genotype"]
+NO_CALL_GENOTYPES = ("--", "-", "00", "NN", "")
+
+# AncestryDNA data columns, header-row names and per-allele no-calls
+ANCESTRYDNA_COLUMNS = ["rsid", "chrom", "pos", "allele1", "allele2"]
+ANCESTRYDNA_HEADER_NAMES = ("rsid", "rs", "snp", "marker")
+NO_CALL_ALLELES = ("-", "0", "N", "")
+
+# Suggested parse_raw_dna(cache_dir=...) location; bump the version whenever
+# parser output changes so stale entries are no longer hit
+PARSED_CACHE_DIR = Path("~/.cache/prs-calc/parsed").expanduser()
+PARSED_CACHE_VERSION = 2
+
+# Chromosomes kept after parsing (non-standard contigs are dropped). Every
+# parser emits chrom with this one ordered dtype, so frames from different
+# files concatenate without re-coding and sort in karyotype order.
+CHROM_DTYPE = pd.CategoricalDtype(
+    [str(i) for i in range(1, 23)] + ["X", "Y", "MT"], ordered=True
+)
+VALID_CHROMOSOMES = frozenset(CHROM_DTYPE.categories)
+
+# Compact allele codes for allele_codes(); anything else (indels, I/D calls,
+# multi-base VCF alleles, missing values) packs as OTHER_ALLELE_CODE
+NUCLEOTIDE_CODES = {"A": 0, "C": 1, "G": 2, "T": 3, "N": 4}
+OTHER_ALLELE_CODE = 5
+
+# Leading VCF columns, through the first sample
+VCF_COLUMNS = ["chrom", "pos", "rsid", "ref", "alt", "qual", "filter", "info", "format", "sample"]
+VCF_USED_COLUMNS = ["chrom", "pos", "rsid", "ref", "alt", "format", "sample"]
+
+# Leading sample characters that hold any resolvable GT ("0/1") plus its
+# ":" terminator
+GT_HEAD_CHARS = 4
+
+
+def _open_bytes(content: bytes):
+    """Open in-memory file content as text, handling gzip compression if present."""
+    stream = io.BytesIO(content)
+    if content[:2] == b"\x1f\x8b":
+        return _text_stream(igzip.GzipFile(fileobj=stream))
+    return io.TextIOWrapper(stream, encoding="utf-8", errors="replace")
+
+
+def _head_lines(f) -> list:
+    """
+    Read the leading lines of an open text stream for format sniffing, stripped.
+
+    One block of FORMAT_PREVIEW_BYTES characters is read; a line cut off at
+    the end of the block is completed so the stream is left at a line start.
+    """
+    block = f.read(FORMAT_PREVIEW_BYTES)
+    lines = block.split("\n")
+    if len(block) == FORMAT_PREVIEW_BYTES:
+        lines[-1] += f.readline()
+    return [line.strip() for line in lines]
+
+
+def _build_cache_key(filepath: Path) -> tuple:
+    """Key a file's detected build by path, modification time and size."""
+    stat = filepath.stat()
+    return (str(filepath), stat.st_mtime_ns, stat.st_size)
+
+
+def _format_from_lines(name: str, lines: list) -> str:
+    """Detect file format from the file name and its leading lines."""
+    name_lower = name.lower()
     if name_lower.endswith(".vcf") or name_lower.endswith(".vcf.gz"):
         return "vcf"
 
-    with _open_file(filepath) as f:
-        # Read first 50 lines to detect format
-        header_lines = []
-        data_lines = []
+    # At most 10 data lines are considered
+    header_lines = []
+    data_lines = []
 
-        for i, line in enumerate(f):
-            if i >= 100:
+    for line in lines:
+        if not line:
+            continue
+        if line.startswith("#"):
+            header_lines.append(line)
+        else:
+            data_lines.append(line)
+            if len(data_lines) >= 10:
                 break
-            line = line.strip()
-            if not line:
-                continue
-            if line.startswith("#"):
-                header_lines.append(line)
-            else:
-                data_lines.append(line)
-                if len(data_lines) >= 10:
-                    break
 
     # Check for VCF format
     for line in header_lines:
@@ -109,74 +255,58 @@ def detect_format(filepath: Path) -> str:
     return "23andme"
 
 
-def detect_build(filepath: Path) -> str:
+def _build_from_lines(lines) -> str:
     """
-    Detect the genome build (GRCh37/GRCh38) of a genetic data file.
+    Detect genome build from the leading lines of a file.
 
-    Uses header hints if available, otherwise uses position heuristics
-    based on well-known SNPs.
-
-    Args:
-        filepath: Path to the genetic data file
-
-    Returns:
-        Either "GRCh37" or "GRCh38"
+    ``lines`` may be a lazy iterable of raw (unstripped) lines; it is consumed
+    only until a header hint or a decisive number of position matches is
+    found. Only the leading characters of each line are inspected before
+    deciding whether it is a header or a data line, so no per-line copies
+    are made.
     """
-    filepath = Path(filepath)
-
-    with _open_file(filepath) as f:
-        header_lines = []
-        data_lines = []
-
-        for i, line in enumerate(f):
-            if i >= 5000:  # Read enough to find detection SNPs
-                break
-            line = line.strip()
-            if not line:
-                continue
-            if line.startswith("#"):
-                header_lines.append(line)
-            else:
-                data_lines.append(line)
+    grch37_matches = 0
+    grch38_matches = 0
 
-    # Check headers for build information
-    for line in header_lines:
-        line_lower = line.lower()
-        if "grch38" in line_lower or "hg38" in line_lower or "build 38" in line_lower:
-            return "GRCh38"
-        if "grch37" in line_lower or "hg19" in line_lower or "build 37" in line_lower:
-            return "GRCh37"
-        # VCF reference genome header
-        if "##reference" in line_lower:
-            if "38" in line:
+    for line in lines:
+        # Check headers for build information
+        if line.startswith("#"):
+            line_lower = line.lower()
+            if "grch38" in line_lower or "hg38" in line_lower or "build 38" in line_lower:
                 return "GRCh38"
-            if "37" in line or "19" in line:
+            if "grch37" in line_lower or "hg19" in line_lower or "build 37" in line_lower:
                 return "GRCh37"
+            # VCF reference genome header
+            if "##reference" in line_lower:
+                if "38" in line:
+                    return "GRCh38"
+                if "37" in line or "19" in line:
+                    return "GRCh37"
+            continue
 
-    # Use position heuristics
-    grch37_matches = 0
-    grch38_matches = 0
-
-    for line in data_lines:
-        parts = line.split("\t")
+        # Use position heuristics (only the first three fields are needed)
+        parts = line.split("\t", 3)
         if len(parts) < 3:
-            parts = line.split(",")
+            parts = line.split(",", 3)
         if len(parts) < 3:
             continue
 
         rsid = parts[0].strip()
         if rsid in BUILD_DETECTION_SNPS:
             try:
-                chrom = str(parts[1]).strip().replace("chr", "")
                 pos = int(parts[2])
-
-                expected = BUILD_DETECTION_SNPS[rsid]
-                if expected["GRCh37"][0] == chrom and expected["GRCh37"][1] == pos:
-                    grch37_matches += 1
-                elif expected["GRCh38"][0] == chrom and expected["GRCh38"][1] == pos:
-                    grch38_matches += 1
-            except (ValueError, IndexError):
+            except ValueError:
                 continue
+            chrom = parts[1].strip().replace("chr", "")
+
+            matched_build = BUILD_BY_SNP_POSITION.get((rsid, chrom, pos))
+            if matched_build == "GRCh37":
+                grch37_matches += 1
+            elif matched_build == "GRCh38":
+                grch38_matches += 1
+
+            if max(grch37_matches, grch38_matches) >= DECISIVE_BUILD_MATCHES:
+                break
 
     if grch38_matches > grch37_matches:
         return "GRCh38"
@@ -185,7 +315,77 @@ def detect_build(filepath: Path) -> str:
     return "GRCh37"
 
 
-def parse_23andme(filepath: Path) -> pd.DataFrame:
+def detect_format(filepath: Path) -> str:
+    """
+    Detect the format of a genetic data file.
+
+    Args:
+        filepath: Path to the genetic data file
+
+    Returns:
+        One of: "23andme", "ancestrydna", "vcf"
+
+    Raises:
+        ValueError: If format cannot be determined
+    """
+    filepath = Path(filepath)
+
+    # Check file extension first
+    name_lower = filepath.name.lower()
+    if name_lower.endswith(".vcf") or name_lower.endswith(".vcf.gz"):
+        return "vcf"
+
+    with _open_file(filepath) as f:
+        return _format_from_lines(filepath.name, _head_lines(f))
+
+
+def detect_build(filepath: Path) -> str:
+    """
+    Detect the genome build (GRCh37/GRCh38) of a genetic data file.
+
+    Uses header hints if available, otherwise uses position heuristics
+    based on well-known SNPs.
+
+    Args:
+        filepath: Path to the genetic data file
+
+    Returns:
+        Either "GRCh37" or "GRCh38"
+    """
+    filepath = Path(filepath)
+    key = _build_cache_key(filepath)
+    if key not in _BUILD_CACHE:
+        with _open_file(filepath) as f:
+            _BUILD_CACHE[key] = _build_from_lines(islice(f, PREVIEW_LINES))
+    return _BUILD_CACHE[key]
+
+
+def detect_format_and_build(filepath: Path) -> tuple[str, str]:
+    """
+    Detect file format and genome build from a single read of the file header.
+
+    Equivalent to calling detect_format() and detect_build(), but the
+    leading lines are read (and decompressed) only once.
+
+    Args:
+        filepath: Path to the genetic data file
+
+    Returns:
+        Tuple of (file_format, build)
+    """
+    filepath = Path(filepath)
+    key = _build_cache_key(filepath)
+    with _open_file(filepath) as f:
+        lines = _head_lines(f)
+        file_format = _format_from_lines(filepath.name, lines)
+        if key not in _BUILD_CACHE:
+            # Continue from where the format preview stopped
+            rest = islice(f, PREVIEW_LINES - len(lines))
+            _BUILD_CACHE[key] = _build_from_lines(chain(lines, rest))
+    return file_format, _BUILD_CACHE[key]
+
+
+def parse_23andme(filepath: Path, build: Optional[str] = None) -> pd.DataFrame:
     """
     Parse a 23andMe raw data file.
 
@@ -194,67 +394,194 @@ def parse_23andme(filepath: Path) -> pd.DataFrame:
 
     Args:
         filepath: Path to the 23andMe file
+        build: Genome build, if already known (detected from the file otherwise)
 
     Returns:
         DataFrame with columns: rsid, chrom, pos, allele1, allele2, genotype, build
     """
     filepath = Path(filepath)
-    build = detect_build(filepath)
+    if build is None:
+        build = detect_build(filepath)
 
-    rows = []
-    with _open_file(filepath) as f:
-        for line in f:
-            line = line.strip()
-            if not line or line.startswith("#"):
-                continue
+    if pa_csv is not None:
+        df = _parse_23andme_arrow(str(filepath), build)
+        if df is not None:
+            return df
 
-            parts = line.split("\t")
-            if len(parts) < 4:
-                continue
+    with _table_source(filepath) as source:
+        return _parse_23andme_csv(source, build)
 
-            rsid = parts[0].strip()
-            chrom = parts[1].strip().replace("chr", "")
-            try:
-                pos = int(parts[2])
-            except ValueError:
-                continue
-            genotype = parts[3].strip().upper()
 
-            # Handle missing/no-call data
-            if genotype in ("--", "-", "00", "NN", ""):
-                continue
+def _read_genotype_table(
+    source,
+    columns: list,
+    sep: str = "\t",
+    usecols: Optional[list] = None,
+) -> pd.DataFrame:
+    """
+    Read a headerless delimited genotype table as strings with pandas' C parser.
 
-            # Parse genotype into alleles
-            if len(genotype) == 1:
-                # Haploid (MT, Y, or X in males)
-                allele1 = genotype
-                allele2 = genotype
-            elif len(genotype) == 2:
-                allele1 = genotype[0]
-                allele2 = genotype[1]
-            else:
-                # Indels or complex variants
-                allele1 = genotype
-                allele2 = genotype
-
-            rows.append({
-                "rsid": rsid,
-                "chrom": chrom,
-                "pos": pos,
-                "allele1": allele1,
-                "allele2": allele2,
-                "genotype": genotype,
-                "build": build
-            })
-
-    df = pd.DataFrame(rows)
-    if len(df) == 0:
-        return pd.DataFrame(columns=["rsid", "chrom", "pos", "allele1", "allele2", "genotype", "build"])
+    Comment lines and blank lines are skipped, missing trailing fields come
+    back as empty strings, and rows with too many fields are dropped unless
+    ``usecols`` is given, in which case extra trailing fields are ignored.
 
-    return df
+    Args:
+        source: File path (compression inferred from the extension) or text stream
+        columns: Names for the leading columns
+        sep: Field delimiter
+        usecols: Subset of ``columns`` to load (all of them by default)
+
+    Returns:
+        DataFrame of str columns
+    """
+    options = dict(
+        sep=sep,
+        header=None,
+        comment="#",
+        dtype=str,
+        quoting=csv.QUOTE_NONE,
+        keep_default_na=False,
+        on_bad_lines="skip",
+        encoding_errors="replace",
+        engine="c",
+    )
+    if usecols is not None:
+        # Positional selection never materializes the skipped columns (e.g.
+        # VCF INFO), but pandas sizes the table from the first record and
+        # rejects it when that record is too short to hold every position.
+        try:
+            df = pd.read_csv(
+                source,
+                usecols=[columns.index(col) for col in usecols],
+                index_col=False,
+                **options,
+            )
+            df.columns = usecols
+            return df
+        except ValueError:
+            if hasattr(source, "seek"):
+                source.seek(0)
+    if usecols is None:
+        return pd.read_csv(source, names=columns, **options)
+    df = pd.read_csv(source, names=columns, usecols=range(len(columns)), **options)
+    return df[usecols]
+
+
+def _parse_23andme_csv(source, build: str) -> pd.DataFrame:
+    """Parse 23andMe records from a file path or text stream with pandas."""
+    return _parse_23andme_table(
+        _read_genotype_table(source, TWENTYTHREEANDME_COLUMNS, usecols=TWENTYTHREEANDME_COLUMNS), build
+    )
+
+
+def _parse_23andme_arrow(source, build: str) -> Optional[pd.DataFrame]:
+    """
+    Parse 23andMe records with pyarrow's multithreaded CSV reader.
+
+    Faster than the pandas reader for large files; comment lines are
+    dropped either by the reader (wrong column count) or by the rsid
+    filter in _parse_23andme_table. Short records are skipped, as by the
+    pandas reader.
+
+    Args:
+        source: File path (compression detected from the extension) or
+                pyarrow input stream
+        build: Genome build
 
+    Returns:
+        Parsed DataFrame, or None if pyarrow could not read the content
+        (e.g. invalid UTF-8) or a record has extra fields, in which case
+        callers use the pandas reader
+    """
+    extra_fields = []
+
+    def skip_row(row):
+        # pandas keeps the leading fields of a long record; fall back to it
+        if not row.text.startswith("#") and row.actual_columns > len(TWENTYTHREEANDME_COLUMNS):
+            extra_fields.append(row.number)
+        return "skip"
+
+    try:
+        table = pa_csv.read_csv(
+            source,
+            read_options=pa_csv.ReadOptions(
+                column_names=TWENTYTHREEANDME_COLUMNS,
+                block_size=8 << 20,
+            ),
+            parse_options=pa_csv.ParseOptions(
+                delimiter="\t",
+                quote_char=False,
+                invalid_row_handler=skip_row,
+            ),
+            convert_options=pa_csv.ConvertOptions(
+                column_types={col: pa.string() for col in TWENTYTHREEANDME_COLUMNS},
+                strings_can_be_null=False,
+            ),
+        )
+    except pa.ArrowInvalid:
+        return None
+    if extra_fields:
+        return None
+
+    return _parse_23andme_table(table.to_pandas(), build)
+
+
+def _parse_positions(values: pd.Series) -> pd.Series:
+    """
+    Parse base-pair position strings, NaN where a value is not an integer.
 
-def parse_ancestrydna(filepath: Path) -> pd.DataFrame:
+    Plain digit strings (virtually every row) are converted in one bulk
+    cast; only the remaining values go through the slower pd.to_numeric.
+    """
+    # At most 18 digits, so the cast cannot overflow int64
+    digits = values.str.fullmatch(r"[0-9]{1,18}").to_numpy(dtype=bool)
+    pos = pd.Series(
+        values.where(digits, "0").astype("int64").to_numpy(dtype="float64"),
+        index=values.index,
+    )
+    if not digits.all():
+        other = pd.to_numeric(values[~digits], errors="coerce")
+        pos[~digits] = other.where(other == other.round())
+    return pos
+
+
+def _parse_23andme_table(df: pd.DataFrame, build: str) -> pd.DataFrame:
+    """Turn raw 23andMe string columns into genotype records, dropping no-calls."""
+    rsid = df["rsid"].str.strip()
+    pos = _parse_positions(df["pos"])
+    genotype = df["genotype"].str.strip().str.upper()
+
+    keep = (
+        ~rsid.str.startswith("#")
+        & pos.notna()
+        & ~genotype.isin(NO_CALL_GENOTYPES)
+    )
+    genotype = genotype[keep]
+
+    # Haploid calls (MT, Y, or X in males) and indels use the whole
+    # genotype for both alleles
+    diploid = genotype.str.len() == 2
+
+    return pd.DataFrame({
+        "rsid": rsid[keep],
+        "chrom": df.loc[keep, "chrom"].str.strip().str.replace("chr", "", regex=False),
+        "pos": pos[keep].astype("int64"),
+        "allele1": genotype.str[0].where(diploid, genotype),
+        "allele2": genotype.str[1].where(diploid, genotype),
+        "genotype": genotype,
+        "build": build,
+    }).reset_index(drop=True)
+
+
+def _arrow_input(content: bytes):
+    """Wrap in-memory file content as a pyarrow stream, handling gzip if present."""
+    stream = pa.BufferReader(content)
+    if content[:2] == b"\x1f\x8b":
+        stream = pa.CompressedInputStream(stream, "gzip")
+    return stream
+
+
+def parse_ancestrydna(filepath: Path, build: Optional[str] = None) -> pd.DataFrame:
     """
     Parse an AncestryDNA raw data file.
 
@@ -263,79 +590,72 @@ def parse_ancestrydna(filepath: Path) -> pd.DataFrame:
 
     Args:
         filepath: Path to the AncestryDNA file
+        build: Genome build, if already known (detected from the file otherwise)
 
     Returns:
         DataFrame with columns: rsid, chrom, pos, allele1, allele2, genotype, build
     """
     filepath = Path(filepath)
-    build = detect_build(filepath)
-
-    rows = []
-    header_found = False
+    if build is None:
+        build = detect_build(filepath)
 
     with _open_file(filepath) as f:
-        for line in f:
-            line = line.strip()
-            if not line or line.startswith("#"):
-                continue
-
-            parts = line.split("\t")
-            if len(parts) < 4:
-                parts = line.split(",")
-            if len(parts) < 4:
-                continue
-
-            # Skip header row
-            if parts[0].lower() in ("rsid", "rs", "snp", "marker"):
-                header_found = True
-                continue
-
-            rsid = parts[0].strip()
-            chrom = parts[1].strip().replace("chr", "")
-
-            try:
-                pos = int(parts[2])
-            except ValueError:
-                continue
-
-            # AncestryDNA has separate allele columns
-            if len(parts) >= 5:
-                allele1 = parts[3].strip().upper()
-                allele2 = parts[4].strip().upper()
-            else:
-                # Fallback: treat as genotype
-                genotype = parts[3].strip().upper()
-                if len(genotype) >= 2:
-                    allele1 = genotype[0]
-                    allele2 = genotype[1]
-                else:
-                    allele1 = genotype
-                    allele2 = genotype
-
-            # Handle missing/no-call data
-            if allele1 in ("-", "0", "N", "") or allele2 in ("-", "0", "N", ""):
-                continue
-
-            genotype = allele1 + allele2
+        sep = _ancestrydna_separator(f)
 
-            rows.append({
-                "rsid": rsid,
-                "chrom": chrom,
-                "pos": pos,
-                "allele1": allele1,
-                "allele2": allele2,
-                "genotype": genotype,
-                "build": build
-            })
+    with _table_source(filepath) as source:
+        return _parse_ancestrydna_csv(source, build, sep)
 
-    df = pd.DataFrame(rows)
-    if len(df) == 0:
-        return pd.DataFrame(columns=["rsid", "chrom", "pos", "allele1", "allele2", "genotype", "build"])
-
-    return df
 
+def _ancestrydna_separator(f) -> str:
+    """
+    Pick the AncestryDNA field separator from the first record of an open text stream.
 
-def parse_vcf(filepath: Path) -> pd.DataFrame:
+    Some exports are comma-separated. Deciding from the first record means
+    those are read once rather than first being parsed as tab-separated,
+    and the table stream never has to be rewound.
+    """
+    for line in f:
+        if line.strip() and not line.startswith("#"):
+            return "\t" if "\t" in line else ","
+    return "\t"
+
+
+def _parse_ancestrydna_csv(source, build: str, sep: str = "\t") -> pd.DataFrame:
+    """Parse AncestryDNA records from a file path or text stream with pandas."""
+    df = _read_genotype_table(source, ANCESTRYDNA_COLUMNS, sep=sep)
+
+    rsid = df["rsid"].str.strip()
+    pos = _parse_positions(df["pos"])
+    allele1 = df["allele1"].str.strip().str.upper()
+    allele2 = df["allele2"].str.strip().str.upper()
+
+    # Rows without a second allele column carry a combined genotype
+    combined = df["allele2"] == ""
+    allele2 = allele2.mask(combined, allele1.str[1].where(allele1.str.len() >= 2, allele1))
+    allele1 = allele1.mask(combined, allele1.str[0]).fillna("")
+    allele2 = allele2.fillna("")
+
+    keep = (
+        ~rsid.str.lower().isin(ANCESTRYDNA_HEADER_NAMES)
+        & pos.notna()
+        & ~allele1.isin(NO_CALL_ALLELES)
+        & ~allele2.isin(NO_CALL_ALLELES)
+    )
+    allele1 = allele1[keep]
+    allele2 = allele2[keep]
+
+    return pd.DataFrame({
+        "rsid": rsid[keep],
+        "chrom": df.loc[keep, "chrom"].str.strip().str.replace("chr", "", regex=False),
+        "pos": pos[keep].astype("int64"),
+        "allele1": allele1,
+        "allele2": allele2,
+        "genotype": allele1 + allele2,
+        "build": build,
+    }).reset_index(drop=True)
+
+
+def parse_vcf(filepath: Path, build: Optional[str] = None) -> pd.DataFrame:
     """
     Parse a VCF (Variant Call Format) file.
 
@@ -343,99 +663,246 @@ def parse_vcf(filepath: Path) -> pd.DataFrame:
 
     Args:
         filepath: Path to the VCF file
+        build: Genome build, if already known (detected from the file otherwise)
 
     Returns:
         DataFrame with columns: rsid, chrom, pos, allele1, allele2, genotype, build
     """
     filepath = Path(filepath)
-    build = detect_build(filepath)
-
-    rows = []
-
-    with _open_file(filepath) as f:
-        for line in f:
-            line = line.strip()
-            if not line or line.startswith("##"):
-                continue
-            if line.startswith("#CHROM"):
-                # Header line - skip
-                continue
+    column_names = None
+    if build is None or pa_csv is not None:
+        # Column names and build both come from the head of the file, so
+        # read (and decompress) it once for the two
+        with _open_file(filepath) as f:
+            header, column_names = _vcf_head(f)
+            if build is None:
+                key = _build_cache_key(filepath)
+                if key not in _BUILD_CACHE:
+                    lines = islice(chain(header, f), PREVIEW_LINES)
+                    _BUILD_CACHE[key] = _build_from_lines(lines)
+                build = _BUILD_CACHE[key]
+
+    if pa_csv is not None and column_names is not None:
+        df = _parse_vcf_arrow(str(filepath), build, column_names)
+        if df is not None:
+            return df
+
+    with _table_source(filepath) as source:
+        return _parse_vcf_csv(source, build)
+
+
+def _map_distinct(values: pd.Series, func) -> np.ndarray:
+    """Apply ``func`` once per distinct value and broadcast the results."""
+    codes, uniques = pd.factorize(values)
+    mapped = np.array([func(value) for value in uniques] + [None], dtype=object)
+    return mapped[codes]
+
+
+def _decode_gt(gt: str) -> tuple:
+    """
+    Decode one GT string into (first, second) allele indexes.
 
-            parts = line.split("\t")
-            if len(parts) < 10:
-                continue
+    Returns (-1, -1) for missing ("."), malformed or unresolvable genotypes;
+    only ref (0) and the first alt allele (1) can be resolved.
+    """
+    alleles = gt.replace("|", "/").split("/")
+    if len(alleles) < 2:
+        # Haploid
+        alleles = [alleles[0], alleles[0]]
+    if "." in alleles or alleles[0] not in ("0", "1") or alleles[1] not in ("0", "1"):
+        return -1, -1
+    return int(alleles[0]), int(alleles[1])
 
-            chrom = parts[0].replace("chr", "")
-            try:
-                pos = int(parts[1])
-            except ValueError:
-                continue
 
-            rsid = parts[2]
-            if rsid == ".":
-                # Generate a pseudo-ID for variants without rsID
-                rsid = f"chr{chrom}:{pos}"
+def _split_gt_head(head: str) -> Optional[str]:
+    """Return the GT from the start of a sample, or None if it may be cut off."""
+    gt, sep, _ = head.partition(":")
+    if sep or len(head) < GT_HEAD_CHARS:
+        return gt
+    return None
 
-            ref = parts[3].upper()
-            alt = parts[4].upper()
 
-            # Handle multi-allelic sites (take first alt allele)
-            if "," in alt:
-                alt = alt.split(",")[0]
+def _extract_gt(samples: pd.Series, gt_idx: int) -> np.ndarray:
+    """
+    Extract the GT field (at position ``gt_idx`` of FORMAT) from sample strings.
 
-            # Get FORMAT field and first sample
-            format_field = parts[8]
-            sample_data = parts[9]
+    Samples with fewer fields than FORMAT have no GT value ("").
+    """
+    gt = np.full(len(samples), None, dtype=object)
+    if gt_idx == 0:
+        # Fast path for the usual leading GT: every genotype _decode_gt can
+        # resolve fits in the first few characters, and those short heads
+        # repeat heavily, so each distinct head is split only once
+        gt = _map_distinct(samples.str.slice(0, GT_HEAD_CHARS), _split_gt_head)
 
-            format_keys = format_field.split(":")
-            sample_values = sample_data.split(":")
+    unresolved = pd.isna(gt)
+    if unresolved.any():
+        pattern = r"^(?:[^:]*:){%d}([^:]*)" % gt_idx
+        gt[unresolved] = samples[unresolved].str.extract(pattern, expand=False).fillna("")
+    return gt
 
-            # Find GT (genotype) index
-            try:
-                gt_idx = format_keys.index("GT")
-                gt = sample_values[gt_idx]
-            except (ValueError, IndexError):
-                continue
 
-            # Parse genotype (0/0, 0/1, 1/1, 0|1, etc.)
-            gt_clean = gt.replace("|", "/")
-            alleles = gt_clean.split("/")
+def _parse_vcf_csv(source, build: str) -> pd.DataFrame:
+    """Parse first-sample VCF genotypes from a file path or text stream with pandas."""
+    # QUAL/FILTER/INFO are never used and INFO is by far the widest column
+    return _parse_vcf_table(
+        _read_genotype_table(source, VCF_COLUMNS, usecols=VCF_USED_COLUMNS), build
+    )
 
-            if len(alleles) < 2:
-                # Haploid
-                alleles = [alleles[0], alleles[0]]
 
-            # Handle missing genotype
-            if "." in alleles:
-                continue
+def _vcf_column_names(f) -> Optional[list]:
+    """
+    Name every column of a VCF from its #CHROM header line.
 
-            try:
-                allele_options = [ref] + alt.split(",")
-                allele1 = allele_options[int(alleles[0])]
-                allele2 = allele_options[int(alleles[1])]
-            except (ValueError, IndexError):
-                continue
+    Reads the meta-information lines of an open text stream (or a list of
+    lines); returns None if the data starts without a #CHROM line or it has
+    too few columns.
+    """
+    for line in f:
+        if not line.startswith("#"):
+            return None
+        if line.startswith("#CHROM"):
+            n_columns = len(line.rstrip("\r\n").split("\t"))
+            if n_columns < len(VCF_COLUMNS):
+                return None
+            extra = [f"sample{i}" for i in range(1, n_columns - len(VCF_COLUMNS) + 1)]
+            return VCF_COLUMNS + extra
+    return None
+
+
+def _vcf_head(f) -> tuple[list, Optional[list]]:
+    """
+    Read the meta-information lines of a VCF, through #CHROM.
 
-            genotype = allele1 + allele2
+    Returns the lines consumed from the open text stream (ending early at the
+    first data line if there is no #CHROM line) and the column names from
+    _vcf_column_names().
+    """
+    lines = []
+    for line in f:
+        lines.append(line)
+        if line.startswith("#CHROM") or not line.startswith("#"):
+            break
+    return lines, _vcf_column_names(lines)
 
-            rows.append({
-                "rsid": rsid,
-                "chrom": chrom,
-                "pos": pos,
-                "allele1": allele1,
-                "allele2": allele2,
-                "genotype": genotype,
-                "build": build
-            })
 
-    df = pd.DataFrame(rows)
-    if len(df) == 0:
-        return pd.DataFrame(columns=["rsid", "chrom", "pos", "allele1", "allele2", "genotype", "build"])
+def _parse_vcf_arrow(source, build: str, column_names: list) -> Optional[pd.DataFrame]:
+    """
+    Parse first-sample VCF genotypes with pyarrow's multithreaded CSV reader.
 
-    return df
+    Meta-information lines and records with fewer than ten fields are
+    skipped by the reader (the #CHROM line is dropped by the position check).
 
+    Args:
+        source: File path (compression detected from the extension) or
+                pyarrow input stream
+        build: Genome build
+        column_names: Names for every column, from _vcf_column_names()
 
-def parse_raw_dna(filepath: Path) -> pd.DataFrame:
+    Returns:
+        Parsed DataFrame, or None if pyarrow could not read the content or a
+        record's field count differs from the header's, in which case
+        callers use the pandas reader
+    """
+    irregular_rows = []
+
+    def skip_row(row):
+        if not row.text.startswith("#") and row.actual_columns >= len(VCF_COLUMNS):
+            irregular_rows.append(row.number)
+        return "skip"
+
+    try:
+        table = pa_csv.read_csv(
+            source,
+            read_options=pa_csv.ReadOptions(column_names=column_names, block_size=8 << 20),
+            parse_options=pa_csv.ParseOptions(
+                delimiter="\t",
+                quote_char=False,
+                invalid_row_handler=skip_row,
+            ),
+            convert_options=pa_csv.ConvertOptions(
+                include_columns=VCF_USED_COLUMNS,
+                column_types={col: pa.string() for col in VCF_USED_COLUMNS},
+                strings_can_be_null=False,
+            ),
+        )
+    except pa.ArrowInvalid:
+        return None
+    if irregular_rows:
+        return None
+
+    return _parse_vcf_table(table.to_pandas(), build)
+
+
+def _parse_vcf_table(df: pd.DataFrame, build: str) -> pd.DataFrame:
+    """Turn raw VCF string columns into first-sample genotype records."""
+    # Extract the GT value, locating GT once per distinct FORMAT string
+    # (nearly always "GT:...")
+    gt = pd.Series("", index=df.index, dtype=object)
+    for format_field, rows in df.groupby("format", sort=False).groups.items():
+        format_keys = format_field.split(":")
+        if "GT" in format_keys:
+            gt[rows] = _extract_gt(df.loc[rows, "sample"], format_keys.index("GT"))
+
+    # Genotype strings repeat heavily (0/0, 0|1, ...), so decode each
+    # distinct one once and broadcast the allele indexes
+    codes, uniques = pd.factorize(gt)
+    decoded = np.array([_decode_gt(value) for value in uniques], dtype=np.int8).reshape(-1, 2)
+    first, second = decoded[codes].T
+
+    pos = _parse_positions(df["pos"])
+    keep = (first >= 0) & pos.notna().to_numpy()
+
+    df = df[keep]
+    first = first[keep]
+    second = second[keep]
+    pos = pos[keep].astype("int64")
+    chrom = df["chrom"].str.replace("chr", "", regex=False)
+
+    # Generate a pseudo-ID for variants without rsID
+    rsid = df["rsid"].copy()
+    missing_id = rsid == "."
+    rsid[missing_id] = "chr" + chrom[missing_id] + ":" + pos[missing_id].astype(str)
+
+    ref = _map_distinct(df["ref"], str.upper)
+    # Handle multi-allelic sites (take first alt allele)
+    alt = _map_distinct(df["alt"], lambda a: a.upper().split(",")[0])
+
+    allele1 = np.where(first == 0, ref, alt)
+    allele2 = np.where(second == 0, ref, alt)
+
+    return pd.DataFrame({
+        "rsid": rsid,
+        "chrom": chrom,
+        "pos": pos,
+        "allele1": allele1,
+        "allele2": allele2,
+        "genotype": allele1 + allele2,
+        "build": build,
+    }).reset_index(drop=True)
+
+
+def _parsed_cache_path(
+    filepath: Path,
+    cache_dir: Path,
+    file_format: Optional[str],
+    build: Optional[str],
+) -> Path:
+    """Locate the parquet cache entry for a file's content and parse options."""
+    digest = hashlib.blake2b(digest_size=20)
+    with open(filepath, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    digest.update(f"v{PARSED_CACHE_VERSION}:{file_format}:{build}".encode())
+    return Path(cache_dir) / f"{digest.hexdigest()}.parquet"
+
+
+def parse_raw_dna(
+    filepath: Path,
+    file_format: Optional[str] = None,
+    build: Optional[str] = None,
+    cache_dir: Optional[Path] = None,
+) -> pd.DataFrame:
     """
     Parse a raw DNA file, automatically detecting format.
 
@@ -446,6 +913,11 @@ def parse_raw_dna(filepath: Path) -> pd.DataFrame:
 
     Args:
         filepath: Path to the genetic data file
+        file_format: Format from detect_format_and_build(), to skip re-detection
+        build: Genome build from detect_format_and_build(), to skip re-detection
+        cache_dir: Directory for a parquet cache of parsed results keyed by
+                   file content (e.g. PARSED_CACHE_DIR). Disabled by default,
+                   since it writes genotype data to disk; needs pyarrow.
 
     Returns:
         DataFrame with columns: rsid, chrom, pos, allele1, allele2, genotype, build
@@ -459,34 +931,176 @@ def parse_raw_dna(filepath: Path) -> pd.DataFrame:
     if not filepath.exists():
         raise FileNotFoundError(f"File not found: {filepath}")
 
-    file_format = detect_format(filepath)
+    cache_path = None
+    if cache_dir is not None and pa is not None:
+        cache_path = _parsed_cache_path(filepath, cache_dir, file_format, build)
+        cached = _read_parsed_cache(cache_path)
+        if cached is not None:
+            return cached
+
+    if file_format is None and build is None:
+        file_format, build = detect_format_and_build(filepath)
+    elif file_format is None:
+        file_format = detect_format(filepath)
 
     if file_format == "23andme":
-        df = parse_23andme(filepath)
+        df = parse_23andme(filepath, build)
     elif file_format == "ancestrydna":
-        df = parse_ancestrydna(filepath)
+        df = parse_ancestrydna(filepath, build)
     elif file_format == "vcf":
-        df = parse_vcf(filepath)
+        df = parse_vcf(filepath, build)
     else:
         raise ValueError(f"Unknown file format: {file_format}")
 
-    # Clean up chromosome names
-    df["chrom"] = df["chrom"].astype(str).str.replace("chr", "", regex=False)
+    df = _clean_genotypes(df)
 
-    # Filter out non-standard chromosomes if needed (keep MT, X, Y)
-    valid_chroms = [str(i) for i in range(1, 23)] + ["X", "Y", "MT", "M"]
-    df = df[df["chrom"].isin(valid_chroms)]
+    if cache_path is not None:
+        _write_parsed_cache(cache_path, df)
 
-    # Normalize mitochondrial chromosome name
-    df.loc[df["chrom"] == "M", "chrom"] = "MT"
+    return df
 
-    # Deduplicate by rsid (keep first occurrence)
-    df = df.drop_duplicates(subset=["rsid"], keep="first")
 
-    # Reset index
-    df = df.reset_index(drop=True)
+def _read_parsed_cache(cache_path: Path) -> Optional[pd.DataFrame]:
+    """Load a cached parse, or None if it is missing or unreadable."""
+    try:
+        return pd.read_parquet(cache_path)
+    except FileNotFoundError:
+        return None
+    except (OSError, pa.ArrowException) as e:
+        logger.warning(f"Ignoring unreadable parsed cache {cache_path}: {e}")
+        return None
+
+
+def _write_parsed_cache(cache_path: Path, df: pd.DataFrame) -> None:
+    """Save a parse to the cache; failures are logged, since the parse succeeded."""
+    tmp_path = None
+    try:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        # Write a unique file then rename, so concurrent writers never share
+        # a temporary file and readers never see a partial one
+        fd, name = tempfile.mkstemp(
+            prefix=f"{cache_path.name}.", suffix=".partial", dir=cache_path.parent
+        )
+        os.close(fd)
+        tmp_path = Path(name)
+        df.to_parquet(tmp_path, compression="zstd")
+        os.replace(tmp_path, cache_path)
+    except (OSError, pa.ArrowException) as e:
+        logger.warning(f"Could not write parsed cache {cache_path}: {e}")
+    finally:
+        if tmp_path is not None:
+            tmp_path.unlink(missing_ok=True)
+
+
+def parse_raw_dna_bytes(content: bytes, filename: str) -> tuple[pd.DataFrame, str, str]:
+    """
+    Parse raw DNA file content held in memory.
 
-    return df
+    Equivalent to parse_raw_dna() for uploads that arrive as bytes (e.g. an
+    HTTP request body), without writing them to a temporary file first.
+    Gzip-compressed content is detected from its magic bytes.
+
+    Args:
+        content: Raw file content
+        filename: Original filename, used for extension-based format detection
+
+    Returns:
+        Tuple of (genotypes DataFrame, file_format, build)
+
+    Raises:
+        ValueError: If file format cannot be detected or parsed
+    """
+    with _open_bytes(content) as f:
+        lines = _head_lines(f)
+        file_format = _format_from_lines(Path(filename).name, lines)
+        build = _build_from_lines(chain(lines, islice(f, PREVIEW_LINES - len(lines))))
+
+    parsers = {
+        "23andme": _parse_23andme_csv,
+        "ancestrydna": _parse_ancestrydna_csv,
+        "vcf": _parse_vcf_csv,
+    }
+    if file_format not in parsers:
+        raise ValueError(f"Unknown file format: {file_format}")
+
+    df = None
+    if file_format == "23andme" and pa_csv is not None:
+        df = _parse_23andme_arrow(_arrow_input(content), build)
+    elif file_format == "vcf" and pa_csv is not None:
+        with _open_bytes(content) as f:
+            column_names = _vcf_column_names(f)
+        if column_names is not None:
+            df = _parse_vcf_arrow(_arrow_input(content), build, column_names)
+    if df is None:
+        options = {}
+        if file_format == "ancestrydna":
+            with _open_bytes(content) as f:
+                options["sep"] = _ancestrydna_separator(f)
+        with _open_bytes(content) as f:
+            df = parsers[file_format](f, build, **options)
+
+    return _clean_genotypes(df), file_format, build
+
+
+def _clean_genotypes(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Normalize chromosomes, drop non-standard contigs and deduplicate by rsid.
+
+    ``chrom`` comes back as CHROM_DTYPE, ``allele1`` and ``allele2`` as
+    categoricals and ``pos`` as int32.
+    """
+    # The format parsers already strip "chr" prefixes, so only "M" -> "MT"
+    # is left; do it once per distinct label and filter out non-standard
+    # contigs in the same pass
+    codes, labels = pd.factorize(df["chrom"])
+    labels = pd.Index(labels)
+    labels = labels.where(labels != "M", "MT")
+    # Trailing False is picked up by the -1 code pandas uses for missing labels
+    keep = np.append(labels.isin(VALID_CHROMOSOMES), False)[codes]
+
+    df = (
+        df[keep]
+        .assign(chrom=labels.take(codes[keep]))
+        .drop_duplicates(subset=["rsid"], keep="first")
+        .reset_index(drop=True)
+    )
+
+    # Compact dtypes: a few dozen distinct chromosome/allele labels and
+    # positions that fit comfortably in 32 bits. Both allele columns share
+    # one dtype so they stay comparable with each other.
+    allele_dtype = pd.CategoricalDtype(
+        pd.concat([df["allele1"], df["allele2"]]).astype("category").cat.categories
+    )
+    return df.astype({
+        "chrom": CHROM_DTYPE,
+        "pos": "int32",
+        "allele1": allele_dtype,
+        "allele2": allele_dtype,
+    })
+
+
+def allele_codes(alleles: pd.Series) -> np.ndarray:
+    """
+    Pack alleles as uint8 nucleotide codes.
+
+    A/C/G/T/N map to 0-4 (see NUCLEOTIDE_CODES) and every other allele to
+    OTHER_ALLELE_CODE. Each distinct allele is looked up once, so this is
+    cheap on the categorical allele columns from parse_raw_dna().
+
+    Args:
+        alleles: Allele column, e.g. df["allele1"] from parse_raw_dna()
+
+    Returns:
+        uint8 array of allele codes, one per row
+    """
+    codes, uniques = pd.factorize(alleles)
+    # Trailing entry is picked up by the -1 code pandas uses for missing values
+    lookup = np.array(
+        [NUCLEOTIDE_CODES.get(allele, OTHER_ALLELE_CODE) for allele in uniques]
+        + [OTHER_ALLELE_CODE],
+        dtype=np.uint8,
+    )
+    return lookup[codes]
 
 
 def get_genotype_summary(df: pd.DataFrame) -> dict:
@@ -511,14 +1125,15 @@ def get_genotype_summary(df: pd.DataFrame) -> dict:
 
     # Count variants per chromosome
     if len(df) > 0:
-        chrom_counts = df["chrom"].value_counts().to_dict()
+        chrom_counts = df["chrom"].value_counts()
+        # Categorical chrom lists every CHROM_DTYPE category, present or not
+        chrom_counts = chrom_counts[chrom_counts > 0]
         summary["chromosomes"] = {str(k): int(v) for k, v in chrom_counts.items()}
 
         # Count SNPs vs indels
-        for _, row in df.iterrows():
-            if len(row["allele1"]) == 1 and len(row["allele2"]) == 1:
-                summary["variant_types"]["snps"] += 1
-            else:
-                summary["variant_types"]["indels"] += 1
+        is_snp = (df["allele1"].str.len() == 1) & (df["allele2"].str.len() == 1)
+        snps = int(is_snp.sum())
+        summary["variant_types"]["snps"] = snps
+        summary["variant_types"]["indels"] = len(df) - snps
 
     return summary
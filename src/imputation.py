@@ -7,26 +7,116 @@ dramatically improving PRS accuracy from ~2% to ~98% of scoring file variants.
 API Documentation: https://imputationserver.sph.umich.edu/api/v2
 """
 
+import csv
 import os
 import gzip
 import time
-import json
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from itertools import repeat
 from pathlib import Path
-from typing import Optional
+from typing import Iterator, Optional
 
 import pandas as pd
 import numpy as np
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from .prs_calculator import variant_keys
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    from pyarrow import csv as pa_csv
+except ImportError:
+    pa = None
+    pc = None
+    pa_csv = None
+
+try:
+    from isal import igzip  # ISA-L accelerated deflate, same API as gzip
+except ImportError:
+    igzip = gzip
+
+try:
+    # Decodes API responses several times faster than the stdlib json module
+    from orjson import loads as json_loads
+except ImportError:
+    from json import loads as json_loads
+
+try:
+    # Streams multipart bodies from disk; requests builds them in memory
+    from requests_toolbelt import MultipartEncoder
+except ImportError:
+    MultipartEncoder = None
 
 MICHIGAN_API_BASE = "https://imputationserver.sph.umich.edu/api/v2"
 CACHE_DIR = Path("data/cache/imputation")
 
+# Compression level for VCFs sent to the imputation server. Level 1 is
+# several times faster than the default 9 and barely larger on VCF text;
+# valid for both isal (0-3) and stdlib gzip (0-9)
+VCF_COMPRESS_LEVEL = 1
+
+# Upper bound on chromosome VCFs compressed concurrently. Compression
+# releases the GIL, so threads scale with cores without pickling records.
+MAX_VCF_WRITE_WORKERS = 8
+
+# Leading imputed VCF fields, through the first sample, and the ones
+# parse_imputed_vcf reads (QUAL and FILTER are never used)
+IMPUTED_VCF_FIELDS = ["chrom", "pos", "rsid", "ref", "alt", "qual", "filter", "info", "format", "sample"]
+IMPUTED_VCF_COLUMNS = ["chrom", "pos", "rsid", "ref", "alt", "info", "format", "sample"]
+
+# Records parsed per chunk, so whole-genome imputed VCFs are never held as
+# one raw table of strings
+IMPUTED_VCF_CHUNK_ROWS = 1_000_000
+
+# Result downloads: files are fetched concurrently, and files of at least
+# RANGE_DOWNLOAD_MIN_BYTES are split into byte ranges fetched in parallel
+# when the server accepts Range requests
+MAX_DOWNLOAD_WORKERS = 8
+RANGE_DOWNLOAD_PARTS = 4
+RANGE_DOWNLOAD_MIN_BYTES = 64 << 20
+DOWNLOAD_CHUNK_SIZE = 1 << 20
+
+# Shared session for Michigan API calls, so polls and downloads reuse
+# keep-alive connections instead of a new TLS handshake per request. The
+# pool covers every concurrent range download; idempotent requests are
+# retried on connection errors and 429/5xx responses, honouring
+# Retry-After (job submission POSTs are never retried)
+_SESSION = requests.Session()
+_SESSION.mount("https://", HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=MAX_DOWNLOAD_WORKERS * RANGE_DOWNLOAD_PARTS,
+    max_retries=Retry(
+        total=5,
+        backoff_factor=0.5,
+        status_forcelist=[429, 502, 503, 504],
+        raise_on_status=False,
+    ),
+))
+
+# wait_for_job polling: the first check follows quickly, then the interval
+# grows by POLL_BACKOFF up to poll_interval, starting over whenever the
+# job's progress changes
+POLL_INITIAL_INTERVAL = 2.0
+POLL_BACKOFF = 1.5
+
 
 def ensure_cache_dir():
     """Ensure imputation cache directory exists."""
     CACHE_DIR.mkdir(parents=True, exist_ok=True)
 
 
+def _write_chrom_vcf(vcf_path: Path, header: str, records: list) -> Path:
+    """Write one chromosome's VCF header and records, gzip-compressed."""
+    data = (header + "".join(records)).encode()
+    with igzip.open(vcf_path, "wb", compresslevel=VCF_COMPRESS_LEVEL) as f:
+        f.write(data)
+    return vcf_path
+
+
 def prepare_vcf_for_imputation(
     genotypes_df: pd.DataFrame,
     output_dir: Path,
@@ -70,8 +160,6 @@ def prepare_vcf_for_imputation(
     # Sort by chromosome and position
     df = df.sort_values(["chrom_num", "pos"])
 
-    vcf_files = []
-
     # VCF header template
     header = """##fileformat=VCFv4.2
 ##source=PRSCalculator
@@ -80,35 +168,32 @@ def prepare_vcf_for_imputation(
 #CHROM\tPOS\tID\tREF\tALT\tQUAL\tFILTER\tINFO\tFORMAT\t{sample}
 """.format(sample=sample_id)
 
-    # Write VCF per chromosome
-    for chrom in sorted(df["chrom_num"].unique()):
-        chrom_df = df[df["chrom_num"] == chrom].copy()
-
-        if len(chrom_df) == 0:
-            continue
-
-        vcf_path = output_dir / f"chr{int(chrom)}.vcf.gz"
-
-        with gzip.open(vcf_path, "wt") as f:
-            f.write(header)
-
-            for _, row in chrom_df.iterrows():
-                # Determine REF/ALT and genotype
-                # Assume first allele is reference for simplicity
-                # In production, would look up from reference genome
-                ref = row["allele1"]
-                alt = row["allele2"] if row["allele2"] != row["allele1"] else "."
-
-                # Convert to VCF genotype format
-                if row["allele1"] == row["allele2"]:
-                    gt = "0/0" if alt == "." else "1/1"
-                else:
-                    gt = "0/1"
+    # Assemble every record as whole-column string operations. Assume the
+    # first allele is the reference for simplicity; in production it would
+    # be looked up from the reference genome.
+    ref = df["allele1"].astype(str)
+    alt = df["allele2"].astype(str)
+    het = ref != alt
+    records = (
+        df["chrom_num"].astype(int).astype(str) + "\t"
+        + df["pos"].astype(int).astype(str) + "\t"
+        + df["rsid"].astype(str) + "\t"
+        + ref + "\t"
+        + alt.where(het, ".")
+        + het.map({True: "\t.\tPASS\t.\tGT\t0/1\n", False: "\t.\tPASS\t.\tGT\t0/0\n"})
+    )
 
-                line = f"{int(row['chrom_num'])}\t{int(row['pos'])}\t{row['rsid']}\t{ref}\t{alt}\t.\tPASS\t.\tGT\t{gt}\n"
-                f.write(line)
+    # Write VCF per chromosome; each is an independent gzip stream, so
+    # chromosomes compress in parallel
+    paths = []
+    chrom_records = []
+    for chrom, group in records.groupby(df["chrom_num"], sort=True):
+        paths.append(output_dir / f"chr{int(chrom)}.vcf.gz")
+        chrom_records.append(group.tolist())
 
-        vcf_files.append(vcf_path)
+    workers = max(1, min(MAX_VCF_WRITE_WORKERS, os.cpu_count() or 1, len(paths)))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        vcf_files = list(executor.map(_write_chrom_vcf, paths, repeat(header), chrom_records))
 
     return vcf_files
 
@@ -167,34 +252,37 @@ def submit_imputation_job(
     }
 
     # Upload files
-    files = []
-    for vcf_path in vcf_files:
-        files.append(
-            ("files", (vcf_path.name, open(vcf_path, "rb"), "application/gzip"))
-        )
-
-    try:
-        response = requests.post(
-            f"{MICHIGAN_API_BASE}/jobs/submit/minimac4",
-            headers=headers,
-            data=data,
-            files=files,
-            timeout=300
-        )
+    with ExitStack() as stack:
+        files = [
+            ("files", (vcf_path.name, stack.enter_context(open(vcf_path, "rb")), "application/gzip"))
+            for vcf_path in vcf_files
+        ]
+
+        if MultipartEncoder is not None:
+            body = MultipartEncoder(fields=list(data.items()) + files)
+            response = _SESSION.post(
+                f"{MICHIGAN_API_BASE}/jobs/submit/minimac4",
+                headers={**headers, "Content-Type": body.content_type},
+                data=body,
+                timeout=300
+            )
+        else:
+            response = _SESSION.post(
+                f"{MICHIGAN_API_BASE}/jobs/submit/minimac4",
+                headers=headers,
+                data=data,
+                files=files,
+                timeout=300
+            )
         response.raise_for_status()
 
-        result = response.json()
-
-        if result.get("success"):
-            job_id = result.get("id")
-            return job_id
-        else:
-            raise RuntimeError(f"Job submission failed: {result.get('message')}")
+    result = json_loads(response.content)
 
-    finally:
-        # Close file handles
-        for _, (_, fh, _) in files:
-            fh.close()
+    if result.get("success"):
+        job_id = result.get("id")
+        return job_id
+    else:
+        raise RuntimeError(f"Job submission failed: {result.get('message')}")
 
 
 def check_job_status(job_id: str, api_token: Optional[str] = None) -> dict:
@@ -221,14 +309,14 @@ def check_job_status(job_id: str, api_token: Optional[str] = None) -> dict:
         "X-Auth-Token": api_token
     }
 
-    response = requests.get(
+    response = _SESSION.get(
         f"{MICHIGAN_API_BASE}/jobs/{job_id}/status",
         headers=headers,
         timeout=30
     )
     response.raise_for_status()
 
-    return response.json()
+    return json_loads(response.content)
 
 
 def wait_for_job(
@@ -243,13 +331,15 @@ def wait_for_job(
     Args:
         job_id: Job ID from submit_imputation_job
         api_token: Michigan Imputation Server API token
-        poll_interval: Seconds between status checks
+        poll_interval: Maximum seconds between status checks
         max_wait: Maximum seconds to wait
 
     Returns:
         Final job status dict
     """
     start_time = time.time()
+    interval = min(POLL_INITIAL_INTERVAL, poll_interval)
+    progress = None
 
     while True:
         status = check_job_status(job_id, api_token)
@@ -262,7 +352,13 @@ def wait_for_job(
         if elapsed > max_wait:
             raise TimeoutError(f"Job {job_id} did not complete within {max_wait} seconds")
 
-        time.sleep(poll_interval)
+        # Poll quickly while the job is moving, back off while it waits
+        if status.get("progress") != progress:
+            progress = status.get("progress")
+            interval = min(POLL_INITIAL_INTERVAL, poll_interval)
+
+        time.sleep(interval)
+        interval = min(poll_interval, interval * POLL_BACKOFF)
 
 
 def download_imputed_results(
@@ -295,39 +391,81 @@ def download_imputed_results(
     }
 
     # Get job details to find output files
-    response = requests.get(
+    response = _SESSION.get(
         f"{MICHIGAN_API_BASE}/jobs/{job_id}",
         headers=headers,
         timeout=30
     )
     response.raise_for_status()
-    job_info = response.json()
-
-    downloaded_files = []
+    job_info = json_loads(response.content)
 
-    # Download each output file
+    # Download the output files concurrently
+    downloads = []
     for output_file in job_info.get("outputParams", []):
         if output_file.get("type") == "local-folder":
             file_id = output_file.get("id")
             filename = output_file.get("name", f"{file_id}.vcf.gz")
+            downloads.append((f"{MICHIGAN_API_BASE}/jobs/{job_id}/results/{file_id}", output_dir / filename))
 
-            # Download file
-            file_response = requests.get(
-                f"{MICHIGAN_API_BASE}/jobs/{job_id}/results/{file_id}",
-                headers=headers,
-                stream=True,
-                timeout=600
-            )
-            file_response.raise_for_status()
+    if not downloads:
+        return []
 
-            output_path = output_dir / filename
-            with open(output_path, "wb") as f:
-                for chunk in file_response.iter_content(chunk_size=8192):
+    workers = min(MAX_DOWNLOAD_WORKERS, len(downloads))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(
+            lambda download: _download_result(*download, headers), downloads
+        ))
+
+
+def _download_result(url: str, output_path: Path, headers: dict) -> Path:
+    """
+    Download one result file, in parallel byte ranges when the server allows.
+
+    The file is written under a temporary name and moved into place once
+    complete, so an interrupted download never looks finished.
+    """
+    tmp_path = output_path.with_name(output_path.name + ".part")
+    try:
+        head = _SESSION.head(url, headers=headers, allow_redirects=True, timeout=30)
+        size = int(head.headers.get("Content-Length", 0)) if head.ok else 0
+        if head.ok and head.headers.get("Accept-Ranges") == "bytes" and size >= RANGE_DOWNLOAD_MIN_BYTES:
+            # Preallocate, then let each range write its own slice
+            with open(tmp_path, "wb") as f:
+                f.truncate(size)
+            part_size = -(-size // RANGE_DOWNLOAD_PARTS)
+            ranges = [(start, min(start + part_size, size) - 1) for start in range(0, size, part_size)]
+            with ThreadPoolExecutor(max_workers=len(ranges)) as executor:
+                list(executor.map(lambda r: _download_range(url, tmp_path, headers, *r), ranges))
+        else:
+            response = _SESSION.get(url, headers=headers, stream=True, timeout=600)
+            response.raise_for_status()
+            with open(tmp_path, "wb") as f:
+                for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
                     f.write(chunk)
+        os.replace(tmp_path, output_path)
+    finally:
+        if tmp_path.exists():
+            tmp_path.unlink()
+
+    return output_path
+
 
-            downloaded_files.append(output_path)
+def _download_range(url: str, path: Path, headers: dict, start: int, end: int) -> None:
+    """Download bytes start..end (inclusive) of url into the same offsets of path."""
+    response = _SESSION.get(
+        url,
+        headers={**headers, "Range": f"bytes={start}-{end}"},
+        stream=True,
+        timeout=600
+    )
+    response.raise_for_status()
+    if response.status_code != 206:
+        raise RuntimeError(f"Server ignored range request for {url}")
 
-    return downloaded_files
+    with open(path, "r+b") as f:
+        f.seek(start)
+        for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+            f.write(chunk)
 
 
 def parse_imputed_vcf(vcf_path: Path) -> pd.DataFrame:
@@ -353,83 +491,228 @@ def parse_imputed_vcf(vcf_path: Path) -> pd.DataFrame:
             - r2: Imputation quality score
             - imputed: Boolean, True if variant was imputed
     """
-    variants = []
-
-    open_func = gzip.open if str(vcf_path).endswith(".gz") else open
+    chunks = None
+    if pa_csv is not None:
+        try:
+            with _open_imputed(vcf_path) as f:
+                chunks = [_parse_imputed_chunk(df) for df in _iter_imputed_records_arrow(f)]
+        except pa.ArrowInvalid:
+            chunks = None
+    if chunks is None:
+        chunks = [_parse_imputed_chunk(df) for df in _iter_imputed_records(vcf_path)]
+    if not chunks:
+        chunks = [_parse_imputed_chunk(_empty_imputed_records())]
+
+    return pd.concat(chunks, ignore_index=True)
+
+
+def _parse_imputed_chunk(df: pd.DataFrame) -> pd.DataFrame:
+    """Extract dosage, R2 and the imputed flag from a chunk of VCF records."""
+    # Keyed INFO values; R2 falls back to INFO, then 1.0
+    info = df["info"]
+    r2 = _info_value(info, "R2")
+    missing_r2 = r2.isna()
+    if missing_r2.any():
+        r2[missing_r2] = _info_value(info[missing_r2], "INFO")
+    r2 = r2.fillna("1.0")
+    imputed = (
+        info.str.contains("(?:^|;)IMPUTED=[Tt][Rr][Uu][Ee](?:;|$)", regex=True)
+        & ~info.str.contains("TYPED", regex=False)
+    )
 
-    with open_func(vcf_path, "rt") as f:
-        for line in f:
-            # Skip header lines
-            if line.startswith("#"):
+    # Dosage from DS, or from GT where DS is missing or unparseable. FORMAT
+    # layouts repeat on every record, so look up field indexes per layout.
+    dosage = np.full(len(df), np.nan)
+    found = np.zeros(len(df), dtype=bool)
+    for format_field, rows in df.groupby("format", sort=False).indices.items():
+        format_keys = format_field.split(":")
+        samples = df["sample"].iloc[rows]
+        for key, parse in (("DS", _ds_dosage), ("GT", _gt_dosage)):
+            if key not in format_keys:
                 continue
+            pending = ~found[rows]
+            values, parsed = _parse_distinct(
+                _sample_field(samples[pending], format_keys.index(key)), parse
+            )
+            targets = rows[pending][parsed]
+            dosage[targets] = values[parsed]
+            found[targets] = True
 
-            fields = line.strip().split("\t")
-            if len(fields) < 10:
-                continue
+    return pd.DataFrame({
+        "rsid": df["rsid"],
+        "chrom": df["chrom"],
+        "pos": df["pos"].astype("int64"),
+        "ref": df["ref"],
+        "alt": df["alt"],
+        "dosage": dosage,
+        "r2": _parse_distinct(r2, float)[0],
+        "imputed": imputed,
+    })[found]
+
+
+def _open_imputed(vcf_path: Path):
+    """Open an imputed VCF as bytes, inflating .gz files with isal when installed."""
+    if str(vcf_path).endswith(".gz"):
+        return igzip.open(vcf_path, "rb")
+    return open(vcf_path, "rb")
+
+
+def _empty_imputed_records() -> pd.DataFrame:
+    """Records DataFrame for a VCF without data lines."""
+    return pd.DataFrame({col: pd.Series(dtype=str) for col in IMPUTED_VCF_COLUMNS})
+
+
+def _iter_imputed_records(vcf_path: Path) -> Iterator[pd.DataFrame]:
+    """
+    Read the used columns of imputed VCF records as strings, in chunks.
+
+    Meta-information lines and records without a sample column are dropped.
+    """
+    positions = [IMPUTED_VCF_FIELDS.index(col) for col in IMPUTED_VCF_COLUMNS]
+    options = dict(
+        sep="\t",
+        header=None,
+        comment="#",
+        dtype=str,
+        quoting=csv.QUOTE_NONE,
+        keep_default_na=False,
+        engine="c",
+        chunksize=IMPUTED_VCF_CHUNK_ROWS,
+    )
+    with ExitStack() as stack:
+        try:
+            reader = pd.read_csv(
+                stack.enter_context(_open_imputed(vcf_path)),
+                usecols=positions,
+                index_col=False,
+                **options,
+            )
+        except pd.errors.EmptyDataError:
+            return
+        except ValueError:
+            # pandas sizes the table from the first record; a short one needs
+            # explicit names for every leading field
+            reader = pd.read_csv(
+                stack.enter_context(_open_imputed(vcf_path)),
+                names=range(len(IMPUTED_VCF_FIELDS)),
+                usecols=positions,
+                **options,
+            )
+        for df in stack.enter_context(reader):
+            df.columns = IMPUTED_VCF_COLUMNS
+            yield df[df["sample"] != ""]
+
+
+def _iter_imputed_records_arrow(source) -> Iterator[pd.DataFrame]:
+    """
+    Stream imputed VCF records with pyarrow's CSV reader, in chunks.
+
+    Lines with fewer fields than a single-sample record (meta-information,
+    truncated records) are skipped by the reader and the #CHROM line is
+    dropped afterwards.
+
+    Raises:
+        pa.ArrowInvalid: If pyarrow could not read the file or a record has
+            extra (e.g. further sample) fields, in which case the pandas
+            reader is used
+    """
+    irregular_rows = []
+
+    def skip_row(row):
+        if not row.text.startswith("#") and row.actual_columns > len(IMPUTED_VCF_FIELDS):
+            irregular_rows.append(row.number)
+        return "skip"
+
+    reader = pa_csv.open_csv(
+        source,
+        read_options=pa_csv.ReadOptions(column_names=IMPUTED_VCF_FIELDS, block_size=8 << 20),
+        parse_options=pa_csv.ParseOptions(
+            delimiter="\t",
+            quote_char=False,
+            invalid_row_handler=skip_row,
+        ),
+        convert_options=pa_csv.ConvertOptions(
+            include_columns=IMPUTED_VCF_COLUMNS,
+            column_types={col: pa.string() for col in IMPUTED_VCF_COLUMNS},
+            strings_can_be_null=False,
+        ),
+    )
+
+    def records(batches):
+        df = pa.Table.from_batches(batches, schema=reader.schema).to_pandas()
+        return df[~df["chrom"].str.startswith("#") & (df["sample"] != "")]
+
+    batches, rows = [], 0
+    for batch in reader:
+        if irregular_rows:
+            raise pa.ArrowInvalid(f"Record {irregular_rows[0]} has extra fields")
+        batches.append(batch)
+        rows += batch.num_rows
+        if rows >= IMPUTED_VCF_CHUNK_ROWS:
+            yield records(batches)
+            batches, rows = [], 0
+    if irregular_rows:
+        raise pa.ArrowInvalid(f"Record {irregular_rows[0]} has extra fields")
+    if batches:
+        yield records(batches)
+
+
+def _extract(values: pd.Series, pattern: str) -> pd.Series:
+    """
+    Extract the ``value`` group of ``pattern`` from each string; None where it does not match.
+
+    pyarrow's regex kernel runs over the whole column at once when installed;
+    pandas' str.extract calls the regex once per value.
+    """
+    if pc is None:
+        return values.str.extract(pattern, expand=False).astype(object)
+    matches = pc.extract_regex(pa.array(values, type=pa.string()), pattern)
+    return pd.Series(
+        pc.struct_field(matches, "value").to_numpy(zero_copy_only=False),
+        index=values.index,
+        dtype=object,
+    )
+
+
+def _info_value(info: pd.Series, key: str) -> pd.Series:
+    """Extract one keyed INFO value (e.g. ``R2=0.91``); None for missing keys."""
+    return _extract(info, f"(?:^|;){key}=(?P<value>[^;]*)")
+
+
+def _sample_field(samples: pd.Series, index: int) -> pd.Series:
+    """Extract the ``index``-th colon-separated sample field; None when absent."""
+    return _extract(samples, f"^(?:[^:]*:){{{index}}}(?P<value>[^:]*)")
+
+
+def _parse_distinct(values: pd.Series, func) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Apply ``func`` once per distinct value and broadcast the results.
+
+    Returns the results as floats and a mask of the values ``func`` could
+    parse (it returns None otherwise); missing values never parse.
+    """
+    codes, uniques = pd.factorize(values)
+    results = [func(value) for value in uniques]
+    parsed = np.array([result is not None for result in results] + [False])
+    floats = np.array([np.nan if result is None else result for result in results] + [np.nan])
+    return floats[codes], parsed[codes]
+
+
+def _ds_dosage(ds: str) -> Optional[float]:
+    """Parse a DS sample field."""
+    try:
+        return float(ds)
+    except ValueError:
+        return None
 
-            chrom = fields[0]
-            pos = int(fields[1])
-            rsid = fields[2]
-            ref = fields[3]
-            alt = fields[4]
-            info = fields[7]
-            format_field = fields[8]
-            sample_data = fields[9]
-
-            # Parse INFO field for R2
-            info_dict = {}
-            for item in info.split(";"):
-                if "=" in item:
-                    key, value = item.split("=", 1)
-                    info_dict[key] = value
-
-            r2 = float(info_dict.get("R2", info_dict.get("INFO", "1.0")))
-
-            # Determine if variant was imputed or genotyped
-            imputed = info_dict.get("IMPUTED", "FALSE").upper() == "TRUE"
-            if "TYPED" in info:
-                imputed = False
-
-            # Parse FORMAT field to find DS index
-            format_keys = format_field.split(":")
-            sample_values = sample_data.split(":")
-
-            # Get dosage (DS field) or calculate from GT
-            dosage = None
-            if "DS" in format_keys:
-                ds_idx = format_keys.index("DS")
-                if ds_idx < len(sample_values):
-                    try:
-                        dosage = float(sample_values[ds_idx])
-                    except ValueError:
-                        pass
-
-            # Fallback to GT if DS not available
-            if dosage is None and "GT" in format_keys:
-                gt_idx = format_keys.index("GT")
-                if gt_idx < len(sample_values):
-                    gt = sample_values[gt_idx]
-                    # Convert GT to dosage
-                    gt = gt.replace("|", "/")
-                    alleles = gt.split("/")
-                    try:
-                        dosage = sum(int(a) for a in alleles if a != ".")
-                    except ValueError:
-                        dosage = None
-
-            if dosage is not None:
-                variants.append({
-                    "rsid": rsid,
-                    "chrom": chrom,
-                    "pos": pos,
-                    "ref": ref,
-                    "alt": alt,
-                    "dosage": dosage,
-                    "r2": r2,
-                    "imputed": imputed
-                })
-
-    return pd.DataFrame(variants)
+
+def _gt_dosage(gt: str) -> Optional[int]:
+    """Count alternate alleles in a GT sample field ("0|1" -> 1)."""
+    alleles = gt.replace("|", "/").split("/")
+    try:
+        return sum(int(a) for a in alleles if a != ".")
+    except ValueError:
+        return None
 
 
 def merge_with_genotyped(
@@ -467,11 +750,12 @@ def merge_with_genotyped(
     # Filter imputed variants by quality
     imp = imputed_df[imputed_df["r2"] >= r2_threshold].copy()
 
-    # Remove imputed variants that overlap with genotyped
-    geno_positions = set(zip(geno["chrom"].astype(str), geno["pos"].astype(int)))
-    imp["chr_pos"] = list(zip(imp["chrom"].astype(str), imp["pos"].astype(int)))
-    imp = imp[~imp["chr_pos"].isin(geno_positions)]
-    imp = imp.drop(columns=["chr_pos"])
+    # Remove imputed variants that overlap with genotyped, matching packed
+    # (chromosome, position) keys; labels are normalized, so "chr20" from an
+    # hg38 panel matches "20"
+    imp_keys = variant_keys(imp["chrom"], imp["pos"])
+    overlap = np.isin(imp_keys, variant_keys(geno["chrom"], geno["pos"])) & (imp_keys >= 0)
+    imp = imp[~overlap]
 
     # Standardize column names
     geno_cols = {"rsid", "chrom", "pos", "allele1", "allele2", "dosage", "r2", "imputed"}
@@ -501,12 +785,21 @@ def estimate_imputation_benefit(genotypes_df: pd.DataFrame, scores_df: pd.DataFr
     Returns:
         dict with coverage statistics and recommendations
     """
-    # Current overlap
-    geno_rsids = set(genotypes_df["rsid"].str.lower())
-    score_rsids = set(scores_df["rsid"].str.lower())
-
-    current_overlap = len(geno_rsids & score_rsids)
-    total_score_variants = len(score_rsids)
+    # Current overlap: factorize both rsid columns together so each distinct
+    # rsid gets one code, then intersect by code instead of building Python
+    # sets of millions of strings
+    rsids = pd.concat([genotypes_df["rsid"], scores_df["rsid"]], ignore_index=True)
+    codes, uniques = pd.factorize(rsids.str.lower())
+    geno_codes = codes[:len(genotypes_df)]
+    score_codes = codes[len(genotypes_df):]
+
+    in_geno = np.zeros(len(uniques), dtype=bool)
+    in_geno[geno_codes[geno_codes >= 0]] = True
+    in_score = np.zeros(len(uniques), dtype=bool)
+    in_score[score_codes[score_codes >= 0]] = True
+
+    current_overlap = int((in_geno & in_score).sum())
+    total_score_variants = int(in_score.sum())
     current_coverage = current_overlap / total_score_variants * 100 if total_score_variants > 0 else 0
 
     # Estimate post-imputation coverage
@@ -515,7 +808,7 @@ def estimate_imputation_benefit(genotypes_df: pd.DataFrame, scores_df: pd.DataFr
     estimated_post_imputation = min(95, current_coverage * 3)  # Rough estimate
 
     return {
-        "current_genotyped_variants": len(geno_rsids),
+        "current_genotyped_variants": int(in_geno.sum()),
         "scoring_file_variants": total_score_variants,
         "current_matched_variants": current_overlap,
         "current_coverage_percent": current_coverage,
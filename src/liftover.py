@@ -1,19 +1,21 @@
 """
-Coordinate conversion between genome builds using pyliftover.
+Coordinate conversion between genome builds using UCSC chain files.
 
 Supports conversion between GRCh37 (hg19) and GRCh38 (hg38).
 """
 
+import gzip
 import os
+import pickle
+import tempfile
+import threading
+from email.utils import formatdate
 from pathlib import Path
 from typing import Optional, Tuple
 
+import numpy as np
 import pandas as pd
-
-try:
-    from pyliftover import LiftOver
-except ImportError:
-    LiftOver = None
+import requests
 
 # Cache directory for chain files
 CACHE_DIR = Path(__file__).parent.parent / "data" / "cache"
@@ -32,9 +34,20 @@ BUILD_ALIASES = {
     "hg38": "GRCh38",
 }
 
-# Cache for LiftOver objects
+# Cache for ChainIndex objects
 _liftover_cache: dict = {}
 
+# Layout version of pickled ChainIndex objects, stored in the pickle and its
+# filename. Pickles persist in the shared cache across deploys, so bump this
+# whenever ChainIndex attributes change and stale pickles are rebuilt.
+CHAIN_INDEX_VERSION = 1
+
+# Per-conversion locks, so concurrent uploads download the chain file and
+# build its index once instead of racing on the same files. Reentrant, since
+# _get_liftover holds the lock while get_chain_file takes it again.
+_liftover_locks: dict = {}
+_liftover_locks_lock = threading.Lock()
+
 
 def _normalize_build(build: str) -> str:
     """Normalize build name to GRCh format."""
@@ -46,13 +59,184 @@ def _normalize_build(build: str) -> str:
     return build
 
 
-def get_chain_file(from_build: str, to_build: str) -> Path:
+class ChainIndex:
+    """
+    Aligned blocks of a UCSC chain file as sorted NumPy arrays.
+
+    Blocks are grouped by source chromosome and sorted by start, so a batch
+    of positions is mapped with np.searchsorted instead of one interval tree
+    query per position. Where chains overlap, the blocks are split into
+    non-overlapping layers and the highest-scoring chain wins.
+    """
+
+    def __init__(self, chain_path: Path):
+        opener = gzip.open if str(chain_path).endswith(".gz") else open
+
+        block_src, block_start, block_size, block_dst_start, block_chain = [], [], [], [], []
+        chain_dst, chain_dst_size, chain_reverse, chain_score = [], [], [], []
+
+        with opener(chain_path, "rt") as f:
+            for line in f:
+                fields = line.split()
+                if not fields:
+                    continue
+                if fields[0] == "chain":
+                    # chain score tName tSize tStrand tStart tEnd qName qSize qStrand qStart qEnd id
+                    src = fields[2]
+                    src_pos = int(fields[5])
+                    dst_pos = int(fields[10])
+                    chain_id = len(chain_dst)
+                    chain_dst.append(fields[7])
+                    chain_dst_size.append(int(fields[8]))
+                    chain_reverse.append(fields[9] == "-")
+                    chain_score.append(int(fields[1]))
+                    continue
+
+                # size [dt dq]: an aligned block, then the gaps before the next
+                size = int(fields[0])
+                block_src.append(src)
+                block_start.append(src_pos)
+                block_size.append(size)
+                block_dst_start.append(dst_pos)
+                block_chain.append(chain_id)
+                if len(fields) == 3:
+                    src_pos += size + int(fields[1])
+                    dst_pos += size + int(fields[2])
+
+        dst_codes, self.dst_chroms = pd.factorize(np.array(chain_dst, dtype=object))
+        self._chain_dst = dst_codes.astype(np.int32)
+        self._chain_dst_size = np.array(chain_dst_size, dtype=np.int64)
+        self._chain_reverse = np.array(chain_reverse, dtype=bool)
+        self._chain_score = np.array(chain_score, dtype=np.int64)
+        # Lower rank wins: higher score first, then earlier in the file
+        order = np.lexsort((np.arange(len(chain_score)), -self._chain_score))
+        self._chain_rank = np.empty(len(order), dtype=np.int64)
+        self._chain_rank[order] = np.arange(len(order))
+
+        starts = np.array(block_start, dtype=np.int64)
+        ends = starts + np.array(block_size, dtype=np.int64)
+        offsets = np.array(block_dst_start, dtype=np.int64) - starts
+        chains = np.array(block_chain, dtype=np.int32)
+
+        self._blocks = {}
+        src_codes, src_chroms = pd.factorize(np.array(block_src, dtype=object))
+        for code, src in enumerate(src_chroms):
+            rows = np.flatnonzero(src_codes == code)
+            rows = rows[np.argsort(starts[rows], kind="stable")]
+            layers = _interval_layers(starts[rows], ends[rows])
+            order = np.lexsort((starts[rows], layers))
+            rows = rows[order]
+            bounds = np.searchsorted(layers[order], np.arange(layers.max() + 2))
+            self._blocks[src] = (
+                starts[rows],
+                ends[rows],
+                offsets[rows],
+                chains[rows],
+                list(zip(bounds[:-1].tolist(), bounds[1:].tolist())),
+            )
+
+    def lift(self, chrom: str, positions: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Map 0-based positions on one source chromosome.
+
+        Args:
+            chrom: Source chromosome in UCSC naming (e.g. "chr1")
+            positions: 0-based positions
+
+        Returns:
+            Tuple of (codes into dst_chroms, 0-based target positions); the
+            code is -1 for positions that cannot be mapped
+        """
+        positions = np.asarray(positions, dtype=np.int64)
+        dst_codes = np.full(len(positions), -1, dtype=np.int32)
+        dst_positions = np.zeros(len(positions), dtype=np.int64)
+        blocks = self._blocks.get(chrom)
+        if blocks is None or len(positions) == 0:
+            return dst_codes, dst_positions
+
+        starts, ends, offsets, chains, layers = blocks
+        best = np.full(len(positions), -1, dtype=np.int64)
+        best_rank = np.full(len(positions), np.iinfo(np.int64).max, dtype=np.int64)
+        for lo, hi in layers:
+            idx = np.searchsorted(starts[lo:hi], positions, side="right") - 1 + lo
+            inside = idx >= lo
+            idx[~inside] = lo
+            rank = self._chain_rank[chains[idx]]
+            better = inside & (positions < ends[idx]) & (rank < best_rank)
+            best[better] = idx[better]
+            best_rank[better] = rank[better]
+
+        mapped = best >= 0
+        block = best[mapped]
+        chain = chains[block]
+        target = positions[mapped] + offsets[block]
+        reverse = self._chain_reverse[chain]
+        target[reverse] = self._chain_dst_size[chain[reverse]] - 1 - target[reverse]
+
+        dst_codes[mapped] = self._chain_dst[chain]
+        dst_positions[mapped] = target
+        return dst_codes, dst_positions
+
+
+def _interval_layers(starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+    """
+    Assign start-sorted intervals to layers in which no two intervals overlap.
+
+    Blocks of different chains rarely overlap, so usually everything lands
+    in layer 0 without a Python loop.
+    """
+    layers = np.zeros(len(starts), dtype=np.int64)
+    if len(starts) < 2 or (starts[1:] >= np.maximum.accumulate(ends)[:-1]).all():
+        return layers
+
+    layer_ends = []
+    for i, (start, end) in enumerate(zip(starts.tolist(), ends.tolist())):
+        for layer, layer_end in enumerate(layer_ends):
+            if layer_end <= start:
+                break
+        else:
+            layer = len(layer_ends)
+            layer_ends.append(0)
+        layer_ends[layer] = end
+        layers[i] = layer
+    return layers
+
+
+def _etag_path(chain_path: Path) -> Path:
+    """Location of the sidecar holding the ETag of a downloaded chain file."""
+    return chain_path.with_name(chain_path.name + ".etag")
+
+
+def _liftover_pickle_path(chain_path: Path) -> Path:
+    """Location of the pickled ChainIndex built from a chain file."""
+    return chain_path.with_name(f"{chain_path.name}.v{CHAIN_INDEX_VERSION}.pkl")
+
+
+def _liftover_lock(key: Tuple[str, str]) -> threading.RLock:
+    """Lock serializing downloads and index builds for one conversion."""
+    with _liftover_locks_lock:
+        return _liftover_locks.setdefault(key, threading.RLock())
+
+
+def _temp_path(path: Path, suffix: str) -> Path:
+    """Create a unique, empty file next to path for writing before a rename."""
+    fd, name = tempfile.mkstemp(prefix=f"{path.name}.", suffix=suffix, dir=path.parent)
+    os.close(fd)
+    return Path(name)
+
+
+def get_chain_file(from_build: str, to_build: str, refresh: bool = False) -> Path:
     """
     Get the chain file for coordinate conversion, downloading if needed.
 
+    With refresh=True a cached chain file is revalidated with a conditional
+    GET (If-None-Match / If-Modified-Since) and only re-downloaded if the
+    server copy has changed.
+
     Args:
         from_build: Source build (GRCh37 or GRCh38)
         to_build: Target build (GRCh37 or GRCh38)
+        refresh: Revalidate a cached chain file against the server
 
     Returns:
         Path to the chain file
@@ -77,47 +261,136 @@ def get_chain_file(from_build: str, to_build: str) -> Path:
     # Chain file path
     chain_filename = f"{BUILD_ALIASES.get(from_build, from_build)}To{BUILD_ALIASES.get(to_build, to_build).capitalize()}.over.chain.gz"
     chain_path = CACHE_DIR / chain_filename
+    etag_path = _etag_path(chain_path)
+
+    with _liftover_lock(key):
+        if chain_path.exists() and not refresh:
+            return chain_path
 
-    # Download if not cached
-    if not chain_path.exists():
-        import requests
+        # Ask the server to skip the body if the cached copy is still current
+        headers = {}
+        if chain_path.exists():
+            if etag_path.exists():
+                headers["If-None-Match"] = etag_path.read_text().strip()
+            headers["If-Modified-Since"] = formatdate(chain_path.stat().st_mtime, usegmt=True)
 
         url = CHAIN_FILE_URLS[key]
         print(f"Downloading chain file from {url}...")
 
+        # Download to a unique temporary name so a failed refresh keeps the
+        # cached copy and concurrent downloads never share a file
+        tmp_path = None
         try:
-            response = requests.get(url, stream=True, timeout=60)
+            response = requests.get(url, headers=headers, stream=True, timeout=60)
+            if response.status_code == 304:
+                print(f"Chain file {chain_path} is up to date")
+                return chain_path
             response.raise_for_status()
 
-            with open(chain_path, "wb") as f:
+            tmp_path = _temp_path(chain_path, ".part")
+            with open(tmp_path, "wb") as f:
                 for chunk in response.iter_content(chunk_size=8192):
                     f.write(chunk)
+            os.replace(tmp_path, chain_path)
+            # The index built from the replaced file is stale
+            _liftover_cache.pop(key, None)
+
+            etag = response.headers.get("ETag")
+            if etag:
+                etag_path.write_text(etag)
+            elif etag_path.exists():
+                etag_path.unlink()
 
             print(f"Chain file saved to {chain_path}")
         except Exception as e:
-            # Clean up partial download
-            if chain_path.exists():
-                chain_path.unlink()
             raise RuntimeError(f"Failed to download chain file: {e}")
+        finally:
+            # Clean up partial download
+            if tmp_path is not None:
+                tmp_path.unlink(missing_ok=True)
 
     return chain_path
 
 
-def _get_liftover(from_build: str, to_build: str) -> "LiftOver":
-    """Get or create a LiftOver object for the given conversion."""
-    if LiftOver is None:
-        raise ImportError("pyliftover is required for coordinate conversion. Install with: pip install pyliftover")
+def _read_liftover_pickle(chain_path: Path) -> Optional[ChainIndex]:
+    """Load a pickled ChainIndex if it is current and newer than its chain file."""
+    pickle_path = _liftover_pickle_path(chain_path)
+    try:
+        if pickle_path.stat().st_mtime < chain_path.stat().st_mtime:
+            return None
+        with open(pickle_path, "rb") as f:
+            version, index = pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f"Ignoring unreadable liftover cache {pickle_path}: {e}")
+        return None
+    if version != CHAIN_INDEX_VERSION or not isinstance(index, ChainIndex):
+        return None
+    return index
+
+
+def _write_liftover_pickle(chain_path: Path, index: ChainIndex) -> None:
+    """Pickle a ChainIndex next to its chain file so later processes skip parsing."""
+    pickle_path = _liftover_pickle_path(chain_path)
+    tmp_path = None
+    try:
+        tmp_path = _temp_path(pickle_path, ".tmp")
+        with open(tmp_path, "wb") as f:
+            pickle.dump((CHAIN_INDEX_VERSION, index), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, pickle_path)
+    except (OSError, pickle.PicklingError) as e:
+        print(f"Could not write liftover cache {pickle_path}: {e}")
+        if tmp_path is not None:
+            tmp_path.unlink(missing_ok=True)
+
+
+def _get_liftover(from_build: str, to_build: str) -> ChainIndex:
+    """
+    Get or create a ChainIndex for the given conversion.
 
+    Building the index decompresses and parses the whole chain file, so the
+    result is pickled next to the chain file and reused by later processes.
+    """
     from_build = _normalize_build(from_build)
     to_build = _normalize_build(to_build)
 
     key = (from_build, to_build)
 
-    if key not in _liftover_cache:
-        chain_path = get_chain_file(from_build, to_build)
-        _liftover_cache[key] = LiftOver(str(chain_path))
+    index = _liftover_cache.get(key)
+    if index is None:
+        with _liftover_lock(key):
+            index = _liftover_cache.get(key)
+            if index is None:
+                chain_path = get_chain_file(from_build, to_build)
+                index = _read_liftover_pickle(chain_path)
+                if index is None:
+                    index = ChainIndex(chain_path)
+                    _write_liftover_pickle(chain_path, index)
+                _liftover_cache[key] = index
+
+    return index
+
+
+def _ucsc_chrom(chrom: str) -> str:
+    """Chromosome name as used in UCSC chain files ("1" -> "chr1", "MT" -> "chrM")."""
+    chrom_ucsc = chrom
+    if not chrom_ucsc.startswith("chr"):
+        chrom_ucsc = f"chr{chrom}"
+
+    # Handle mitochondrial chromosome
+    if chrom_ucsc in ("chrMT", "chrM"):
+        chrom_ucsc = "chrM"
+
+    return chrom_ucsc
 
-    return _liftover_cache[key]
+
+def _plain_chrom(chrom_ucsc: str) -> str:
+    """Chromosome name without the UCSC chr prefix ("chrM" -> "MT")."""
+    chrom = chrom_ucsc.replace("chr", "")
+    if chrom == "M":
+        chrom = "MT"
+    return chrom
 
 
 def liftover_position(
@@ -144,40 +417,51 @@ def liftover_position(
     if from_build == to_build:
         return (chrom, pos)
 
-    lo = _get_liftover(from_build, to_build)
-
-    # Normalize chromosome name for UCSC format
-    chrom_ucsc = chrom
-    if not chrom_ucsc.startswith("chr"):
-        chrom_ucsc = f"chr{chrom}"
+    lifted_chrom, lifted_pos, lift_success = _lift_arrays(
+        np.array([chrom], dtype=object), np.array([pos], dtype=np.int64), from_build, to_build
+    )
+    if not lift_success[0]:
+        return None
 
-    # Handle mitochondrial chromosome
-    if chrom_ucsc in ("chrMT", "chrM"):
-        chrom_ucsc = "chrM"
+    return (lifted_chrom[0], lifted_pos[0])
 
-    # pyliftover uses 0-based coordinates
-    pos_0based = pos - 1
 
-    try:
-        result = lo.convert_coordinate(chrom_ucsc, pos_0based)
-    except Exception:
-        return None
+def _lift_arrays(
+    chroms: np.ndarray,
+    positions: np.ndarray,
+    from_build: str,
+    to_build: str
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Convert arrays of chromosomes and 1-based positions between builds.
 
-    if not result:
-        return None
+    Positions are mapped one source chromosome at a time with a single
+    ChainIndex lookup each.
 
-    # Take the first (best) mapping
-    new_chrom, new_pos, strand, score = result[0]
+    Returns:
+        Tuple of (lifted_chrom, lifted_pos, lift_success); the first two are
+        object arrays holding None where a position cannot be mapped
+    """
+    index = _get_liftover(from_build, to_build)
+    target_chroms = np.array([_plain_chrom(name) for name in index.dst_chroms], dtype=object)
 
-    # Convert back to 1-based coordinates
-    new_pos = new_pos + 1
+    lifted_chrom = np.full(len(positions), None, dtype=object)
+    lifted_pos = np.full(len(positions), None, dtype=object)
+    lift_success = np.zeros(len(positions), dtype=bool)
 
-    # Remove chr prefix for consistency
-    new_chrom = new_chrom.replace("chr", "")
-    if new_chrom == "M":
-        new_chrom = "MT"
+    # Chain files use 0-based coordinates
+    positions_0based = np.asarray(positions, dtype=np.int64) - 1
+    codes, labels = pd.factorize(chroms)
+    for code, label in enumerate(labels):
+        rows = np.flatnonzero(codes == code)
+        dst_codes, dst_positions = index.lift(_ucsc_chrom(str(label)), positions_0based[rows])
+        mapped = dst_codes >= 0
+        rows = rows[mapped]
+        lifted_chrom[rows] = target_chroms[dst_codes[mapped]]
+        lifted_pos[rows] = (dst_positions[mapped] + 1).tolist()
+        lift_success[rows] = True
 
-    return (new_chrom, new_pos)
+    return lifted_chrom, lifted_pos, lift_success
 
 
 def liftover_dataframe(
@@ -231,18 +515,19 @@ def liftover_dataframe(
     # Perform liftover
     print(f"Lifting {len(df)} variants from {source_build} to {target_build}...")
 
-    success_count = 0
-    for idx, row in df.iterrows():
-        chrom = str(row[chrom_col])
-        pos = int(row[pos_col])
-
-        result = liftover_position(chrom, pos, source_build, target_build)
+    # Map every position in one pass per source chromosome, then assign
+    # each column in one go
+    lifted_chrom, lifted_pos, lift_success = _lift_arrays(
+        df[chrom_col].astype(str).to_numpy(dtype=object),
+        df[pos_col].astype("int64").to_numpy(),
+        source_build,
+        target_build,
+    )
 
-        if result is not None:
-            df.at[idx, "lifted_chrom"] = result[0]
-            df.at[idx, "lifted_pos"] = result[1]
-            df.at[idx, "lift_success"] = True
-            success_count += 1
+    df["lifted_chrom"] = pd.Series(lifted_chrom, index=df.index, dtype=object)
+    df["lifted_pos"] = pd.Series(lifted_pos, index=df.index, dtype=object)
+    df["lift_success"] = lift_success
+    success_count = int(df["lift_success"].sum())
 
     print(f"Successfully lifted {success_count}/{len(df)} variants ({100*success_count/len(df):.1f}%)")
 
@@ -337,12 +622,18 @@ def batch_liftover(
     if from_build == to_build:
         return list(positions)
 
-    results = []
-    for chrom, pos in positions:
-        result = liftover_position(chrom, pos, from_build, to_build)
-        results.append(result)
+    if not positions:
+        return []
+
+    chroms, pos = zip(*positions)
+    lifted_chrom, lifted_pos, lift_success = _lift_arrays(
+        np.array(chroms, dtype=object), np.array(pos, dtype=np.int64), from_build, to_build
+    )
 
-    return results
+    return [
+        (chrom, new_pos) if success else None
+        for chrom, new_pos, success in zip(lifted_chrom, lifted_pos, lift_success)
+    ]
 
 
 def get_liftover_stats(df_original: pd.DataFrame, df_lifted: pd.DataFrame) -> dict:
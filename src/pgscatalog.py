@@ -8,6 +8,11 @@ GRCh37 and GRCh38 genome builds.
 
 import gzip
 import logging
+import os
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Optional
 
@@ -23,6 +28,45 @@ PGSCATALOG_FTP_BASE = "https://ftp.ebi.ac.uk/pub/databases/spot/pgs/scores"
 # Cache directory for downloaded scoring files
 CACHE_DIR = Path(__file__).parent.parent / "data" / "cache"
 
+# Scoring files downloaded/parsed concurrently by get_all_disease_scores
+MAX_LOAD_WORKERS = 8
+
+# One lock per (pgs_id, build), so concurrent loads of the same scoring
+# file download it once instead of overwriting each other
+_download_locks: dict = {}
+_download_locks_lock = threading.Lock()
+
+# Parsed scoring files kept in memory, keyed by (disease, build). A parsed
+# file takes ~85 bytes per variant, so a genome-wide score (1-7M variants)
+# holds ~100-600 MB; at most MAX_CACHED_SCORE_FILES are kept. Entries are
+# never evicted: every upload scores the catalog in the same order, so an
+# LRU smaller than the catalog would miss on every file. Files beyond the
+# cap are reloaded from their parsed copy on disk.
+MAX_CACHED_SCORE_FILES = 32
+_scores_cache: dict = {}
+_scores_cache_lock = threading.Lock()
+
+# Scoring-file columns used downstream, mapped to their standardized names.
+# Anything else in the file (hm_source, hm_rsID, allele frequencies, ...) is
+# never read, which keeps parsing time and memory proportional to what we use.
+SCORING_COLUMNS = {
+    "rsID": "rsid",
+    "chr_name": "chr_name",
+    "chr_position": "chr_position",
+    "effect_allele": "effect_allele",
+    "other_allele": "other_allele",
+    "reference_allele": "other_allele",
+    "effect_weight": "effect_weight",
+    "hm_chr": "hm_chr",
+    "hm_pos": "hm_pos",
+    "hm_inferOtherAllele": "hm_infer_other_allele",
+}
+
+# Version of parse_scoring_file output, part of the parsed-cache filename.
+# Parsed copies persist across deploys, so bump this whenever parsing changes
+# (columns, dtypes, filtering) and stale pickles are no longer read.
+SCORE_CACHE_VERSION = 1
+
 # Disease catalog: maps disease names to PGS IDs
 # These are high-quality, validated scores from PGSCatalog
 # Expanded to 50 diseases across multiple categories
@@ -423,7 +467,9 @@ def download_scoring_file(
     """
     Download harmonized scoring file from PGSCatalog.
 
-    Files are cached locally to avoid repeated downloads.
+    Files are cached locally to avoid repeated downloads. Concurrent calls
+    for the same file download it once, and the cached file only appears
+    once it is completely written.
 
     Args:
         pgs_id: PGS Catalog score ID (e.g., "PGS000018")
@@ -446,37 +492,54 @@ def download_scoring_file(
     # Local file path (decompressed)
     local_path = CACHE_DIR / f"{pgs_id}_{build}.txt"
 
-    # Return cached file if exists
-    if local_path.exists() and not force:
-        logger.info(f"Using cached file: {local_path}")
-        return local_path
+    with _download_lock(pgs_id, build):
+        # Return cached file if exists
+        if local_path.exists() and not force:
+            logger.info(f"Using cached file: {local_path}")
+            return local_path
 
-    # Download file
-    url = _get_harmonized_file_url(pgs_id, build)
-    logger.info(f"Downloading {pgs_id} ({build}) from {url}")
+        # Download file
+        url = _get_harmonized_file_url(pgs_id, build)
+        logger.info(f"Downloading {pgs_id} ({build}) from {url}")
 
-    response = requests.get(url, timeout=120, stream=True)
-    response.raise_for_status()
-
-    # Decompress and save
-    compressed_path = CACHE_DIR / f"{pgs_id}_{build}.txt.gz"
+        response = requests.get(url, timeout=120, stream=True)
+        response.raise_for_status()
 
-    with open(compressed_path, "wb") as f:
-        for chunk in response.iter_content(chunk_size=8192):
-            f.write(chunk)
+        # Download and decompress under unique temporary names, then move the
+        # result into place, so readers never see a partially written file
+        compressed_path = _temp_path(local_path, ".gz")
+        decompressed_path = _temp_path(local_path, ".tmp")
+        try:
+            with open(compressed_path, "wb") as f:
+                for chunk in response.iter_content(chunk_size=8192):
+                    f.write(chunk)
 
-    # Decompress
-    with gzip.open(compressed_path, "rt") as f_in:
-        with open(local_path, "w") as f_out:
-            f_out.write(f_in.read())
+            with gzip.open(compressed_path, "rb") as f_in:
+                with open(decompressed_path, "wb") as f_out:
+                    shutil.copyfileobj(f_in, f_out, 1 << 20)
 
-    # Remove compressed file
-    compressed_path.unlink()
+            os.replace(decompressed_path, local_path)
+        finally:
+            compressed_path.unlink(missing_ok=True)
+            decompressed_path.unlink(missing_ok=True)
 
     logger.info(f"Downloaded and cached: {local_path}")
     return local_path
 
 
+def _download_lock(pgs_id: str, build: str) -> threading.Lock:
+    """Lock serializing downloads of one scoring file."""
+    with _download_locks_lock:
+        return _download_locks.setdefault((pgs_id, build), threading.Lock())
+
+
+def _temp_path(path: Path, suffix: str) -> Path:
+    """Create a unique, empty file next to path for writing before a rename."""
+    fd, name = tempfile.mkstemp(prefix=f"{path.name}.", suffix=suffix, dir=path.parent)
+    os.close(fd)
+    return Path(name)
+
+
 def parse_scoring_file(filepath: Path) -> pd.DataFrame:
     """
     Parse a PGSCatalog harmonized scoring file.
@@ -517,29 +580,19 @@ def parse_scoring_file(filepath: Path) -> pd.DataFrame:
             key, value = line.lstrip("#").split("=", 1)
             metadata[key.strip()] = value.strip()
 
-    # Read data
+    # Read only the columns we use; chromosome columns mix "1" and "X" so
+    # read them as strings rather than letting pandas guess per chunk
     df = pd.read_csv(
         filepath,
         sep="\t",
         skiprows=data_start,
+        usecols=lambda col: col in SCORING_COLUMNS,
+        dtype={"chr_name": str, "hm_chr": str},
         low_memory=False,
     )
 
     # Standardize column names (handle variations in PGS files)
-    column_mapping = {
-        "rsID": "rsid",
-        "chr_name": "chr_name",
-        "chr_position": "chr_position",
-        "effect_allele": "effect_allele",
-        "other_allele": "other_allele",
-        "reference_allele": "other_allele",
-        "effect_weight": "effect_weight",
-        "hm_chr": "hm_chr",
-        "hm_pos": "hm_pos",
-        "hm_inferOtherAllele": "hm_infer_other_allele",
-    }
-
-    df = df.rename(columns={k: v for k, v in column_mapping.items() if k in df.columns})
+    df = df.rename(columns=SCORING_COLUMNS)
 
     # Use harmonized coordinates if available
     if "hm_chr" in df.columns and "hm_pos" in df.columns:
@@ -549,8 +602,10 @@ def parse_scoring_file(filepath: Path) -> pd.DataFrame:
         if "chr_position" in df.columns:
             df["hm_pos"] = df["hm_pos"].fillna(df["chr_position"])
 
-    # Ensure effect_weight is numeric
-    df["effect_weight"] = pd.to_numeric(df["effect_weight"], errors="coerce")
+    # Ensure effect_weight is numeric; float32 is ample precision for a
+    # weight and halves the memory of large scoring files (the PRS sum
+    # itself is still accumulated in float64)
+    df["effect_weight"] = pd.to_numeric(df["effect_weight"], errors="coerce").astype("float32")
 
     # Drop rows with missing essential data
     essential_cols = ["effect_allele", "effect_weight"]
@@ -576,6 +631,10 @@ def load_scores_for_disease(
     It handles the mapping from disease name to PGS ID, downloading,
     and parsing.
 
+    Up to MAX_CACHED_SCORE_FILES parsed scoring files are cached in memory
+    for the lifetime of the process, so the returned DataFrame may be shared
+    between callers and must be treated as read-only.
+
     Args:
         disease: Disease name (e.g., "breast_cancer", "cad", "t2d")
         build: Genome build ("GRCh37" or "GRCh38")
@@ -600,16 +659,37 @@ def load_scores_for_disease(
             f"Unknown disease: {disease}. Available: {available}"
         )
 
+    key = (disease_lower, build)
+    if force_download:
+        download_scoring_file(DISEASE_CATALOG[disease_lower]["pgs_id"], build=build, force=True)
+        with _scores_cache_lock:
+            _scores_cache.pop(key, None)
+
+    df = _scores_cache.get(key)
+    if df is None:
+        df = _load_parsed_scores(disease_lower, build)
+        with _scores_cache_lock:
+            if key in _scores_cache or len(_scores_cache) < MAX_CACHED_SCORE_FILES:
+                df = _scores_cache.setdefault(key, df)
+
+    return df
+
+
+def _load_parsed_scores(disease_lower: str, build: str) -> pd.DataFrame:
+    """Download (if needed) and parse the scoring file for a catalog disease."""
     disease_info = DISEASE_CATALOG[disease_lower]
     pgs_id = disease_info["pgs_id"]
 
     logger.info(f"Loading scores for {disease_info['name']} ({pgs_id})")
 
     # Download if needed
-    filepath = download_scoring_file(pgs_id, build=build, force=force_download)
+    filepath = download_scoring_file(pgs_id, build=build)
 
-    # Parse file
-    df = parse_scoring_file(filepath)
+    # Parse file, reusing a parsed copy saved by an earlier process
+    df = _read_parsed_cache(filepath)
+    if df is None:
+        df = parse_scoring_file(filepath)
+        _write_parsed_cache(filepath, df)
 
     # Add disease metadata
     df.attrs["disease"] = disease_info["name"]
@@ -620,27 +700,75 @@ def load_scores_for_disease(
     return df
 
 
+def _parsed_cache_path(filepath: Path) -> Path:
+    """Location of the pickled parse of a downloaded scoring file."""
+    return filepath.with_suffix(f".parsed.v{SCORE_CACHE_VERSION}.pkl")
+
+
+def _read_parsed_cache(filepath: Path) -> Optional[pd.DataFrame]:
+    """Load a previously parsed scoring file if it is newer than the source."""
+    cache_path = _parsed_cache_path(filepath)
+    try:
+        if cache_path.stat().st_mtime < filepath.stat().st_mtime:
+            return None
+        return pd.read_pickle(cache_path)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.warning(f"Ignoring unreadable parsed cache {cache_path}: {e}")
+        return None
+
+
+def _write_parsed_cache(filepath: Path, df: pd.DataFrame) -> None:
+    """Save a parsed scoring file next to its source for faster cold starts."""
+    cache_path = _parsed_cache_path(filepath)
+    tmp_path = None
+    try:
+        # Unique name, so concurrent writers never share a temporary file
+        tmp_path = _temp_path(cache_path, ".tmp")
+        df.to_pickle(tmp_path)
+        os.replace(tmp_path, cache_path)
+    except OSError as e:
+        logger.warning(f"Could not write parsed cache {cache_path}: {e}")
+        if tmp_path is not None:
+            tmp_path.unlink(missing_ok=True)
+
+
 def get_all_disease_scores(
     build: str = "GRCh37",
     diseases: Optional[list] = None,
+    max_workers: int = MAX_LOAD_WORKERS,
 ) -> dict[str, pd.DataFrame]:
     """
     Load scoring files for multiple diseases.
 
+    Downloads and parsing run on a thread pool so network and disk IO for
+    different diseases overlap.
+
     Args:
         build: Genome build ("GRCh37" or "GRCh38")
         diseases: List of disease names, or None for all
+        max_workers: Maximum number of scoring files loaded concurrently
 
     Returns:
         Dictionary mapping disease names to scoring DataFrames
     """
     if diseases is None:
         diseases = list(DISEASE_CATALOG.keys())
+    if not diseases:
+        return {}
+
+    workers = max(1, min(max_workers, len(diseases)))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            disease: executor.submit(load_scores_for_disease, disease, build=build)
+            for disease in diseases
+        }
 
     scores = {}
-    for disease in diseases:
+    for disease, future in futures.items():
         try:
-            scores[disease] = load_scores_for_disease(disease, build=build)
+            scores[disease] = future.result()
         except Exception as e:
             logger.error(f"Failed to load scores for {disease}: {e}")
             continue
@@ -14,6 +14,8 @@ Risk categories are based on AHA/NHS clinical guidelines for PRS interpretation.
 
 from typing import Optional
 
+import numpy as np
+
 # Population-specific normalization parameters
 # These values are derived from published GWAS studies and UK Biobank validation
 # EUR is the reference population (mean=0, sd=1 by construction)
@@ -225,6 +227,28 @@ def get_risk_category(percentile: float) -> dict:
     return result
 
 
+# Lower bounds and labels of RISK_THRESHOLDS, for vectorized categorization
+_RISK_LOWER_BOUNDS = np.array(
+    [t["min_percentile"] for t in RISK_THRESHOLDS.values()], dtype=np.float64
+)
+_RISK_LABELS = np.array([t["label"] for t in RISK_THRESHOLDS.values()], dtype=object)
+
+
+def get_risk_labels(percentiles: np.ndarray) -> np.ndarray:
+    """
+    Vectorized get_risk_category(...)["label"] for an array of percentiles.
+
+    Args:
+        percentiles: PRS percentiles (0-100)
+
+    Returns:
+        Array of risk category labels, one per percentile
+    """
+    clamped = np.clip(np.asarray(percentiles, dtype=np.float64), 0, 100)
+    idx = np.searchsorted(_RISK_LOWER_BOUNDS, clamped, side="right") - 1
+    return _RISK_LABELS[idx]
+
+
 def get_risk_category_by_key(key: str) -> dict:
     """
     Get risk category info by key name.
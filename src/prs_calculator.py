@@ -7,17 +7,34 @@ Algorithm:
     PRS_percentile = scipy.stats.norm.cdf(PRS_zscore)
 """
 
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Optional, Sequence
+
 import pandas as pd
 import numpy as np
-from scipy import stats
-from typing import Optional
+from scipy.special import ndtr
 
-from .populations import get_population_params, get_risk_category
+from .populations import get_population_params, get_risk_category, get_risk_labels
 from .pgscatalog import load_scores_for_disease, DISEASE_CATALOG
 
 
 COMPLEMENT = {"A": "T", "T": "A", "C": "G", "G": "C"}
 
+# Upper bound on concurrent per-disease PRS computations
+MAX_DISEASE_WORKERS = 8
+
+# Scoring-file rows matched per step in calculate_prs. Matching allocates
+# several temporaries per row (keys, aligned columns, dosages), so working
+# in slices keeps peak memory flat for multi-million variant scores.
+SCORE_CHUNK_ROWS = 500_000
+
+# Integer codes used to pack (chromosome, position) into one int64 key
+CHROM_CODES = {str(i): i for i in range(1, 23)}
+CHROM_CODES.update({"X": 23, "Y": 24, "MT": 25, "M": 25})
+
+# Chromosome labels validate_genotypes accepts without a warning
+VALID_CHROM_LABELS = frozenset(CHROM_CODES)
+
 
 def get_complement(allele: str) -> str:
     """Get the complement of an allele for strand flip detection."""
@@ -29,6 +46,62 @@ def is_strand_flip(allele1: str, allele2: str) -> bool:
     return allele1.upper() == get_complement(allele2.upper())
 
 
+def variant_keys(chroms: pd.Series, positions: pd.Series) -> np.ndarray:
+    """
+    Pack chromosome and position into int64 keys for variant matching.
+
+    Chromosome labels are normalized once per distinct label ("chr1", 1,
+    "1.0" and "1" all map to the same code), so the per-row work is pure
+    integer arithmetic. Variants on unrecognized chromosomes or without a
+    valid position get the key -1.
+
+    Args:
+        chroms: Chromosome labels
+        positions: Base-pair positions
+
+    Returns:
+        Array of int64 keys, one per variant
+    """
+    categorical = pd.Categorical(chroms)
+    labels = (
+        pd.Index(categorical.categories).astype(str)
+        .str.replace("chr", "", regex=False)
+        .str.removesuffix(".0")
+    )
+    # Trailing -1 is picked up by the -1 code pandas uses for missing labels
+    lookup = np.array([CHROM_CODES.get(label, -1) for label in labels] + [-1], dtype=np.int64)
+    codes = lookup[categorical.codes]
+
+    pos = pd.to_numeric(positions, errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+    valid = (codes >= 0) & np.isfinite(pos)
+
+    keys = np.full(len(codes), -1, dtype=np.int64)
+    keys[valid] = (codes[valid] << 32) + pos[valid].astype(np.int64)
+    return keys
+
+
+def index_genotypes(genotypes_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Index genotypes by chr:pos key for repeated matching against scoring files.
+
+    Building the key and its hash table is the invariant part of variant
+    matching, so batch callers index once and reuse the result for every
+    disease. Duplicate positions keep their first occurrence, and variants
+    on unrecognized chromosomes are dropped since they cannot be scored.
+
+    Args:
+        genotypes_df: DataFrame with columns [rsid, chrom, pos, allele1, allele2, genotype]
+
+    Returns:
+        Copy of genotypes_df indexed by an integer "chr_pos" key (see variant_keys)
+    """
+    geno = genotypes_df.copy()
+    geno["chr_pos"] = variant_keys(geno["chrom"], geno["pos"])
+    geno = geno[geno["chr_pos"] >= 0]
+    geno = geno.drop_duplicates(subset="chr_pos", keep="first")
+    return geno.set_index("chr_pos")
+
+
 def match_variants(genotypes_df: pd.DataFrame, scores_df: pd.DataFrame) -> pd.DataFrame:
     """
     Match genotyped variants to scoring file variants.
@@ -39,47 +112,51 @@ def match_variants(genotypes_df: pd.DataFrame, scores_df: pd.DataFrame) -> pd.Da
     3. Handle strand flips by checking complements
 
     Args:
-        genotypes_df: DataFrame with columns [rsid, chrom, pos, allele1, allele2, genotype]
+        genotypes_df: DataFrame with columns [rsid, chrom, pos, allele1, allele2, genotype],
+                      or the output of index_genotypes
         scores_df: DataFrame with columns [hm_chr, hm_pos, effect_allele,
                                            other_allele, effect_weight]
 
     Returns:
         DataFrame with matched variants including dosage calculations
     """
-    # Normalize column names and types
-    geno = genotypes_df.copy()
-    scores = scores_df.copy()
-
-    # Create chr:pos keys for matching (primary method for harmonized PGS files)
-    geno["chr_pos"] = geno["chrom"].astype(str) + ":" + geno["pos"].astype(str)
+    if genotypes_df.index.name == "chr_pos":
+        geno = genotypes_df
+    else:
+        geno = index_genotypes(genotypes_df)
 
     # Use harmonized coordinates if available, fall back to original
-    if "hm_chr" in scores.columns and "hm_pos" in scores.columns:
-        scores["chr_pos"] = scores["hm_chr"].astype(str) + ":" + scores["hm_pos"].astype(str)
+    if "hm_chr" in scores_df.columns and "hm_pos" in scores_df.columns:
+        score_keys = variant_keys(scores_df["hm_chr"], scores_df["hm_pos"])
     else:
-        scores["chr_pos"] = scores["chr_name"].astype(str) + ":" + scores["chr_position"].astype(str)
+        score_keys = variant_keys(scores_df["chr_name"], scores_df["chr_position"])
 
     # Match by chr:pos (primary - works for harmonized files without rsIDs)
-    matched = pd.merge(
-        geno,
-        scores,
-        on="chr_pos",
-        how="inner",
-        suffixes=("_geno", "_score")
+    positions = geno.index.get_indexer(score_keys)
+    found = positions >= 0
+
+    geno_part = geno.iloc[positions[found]].reset_index()
+    score_part = scores_df[found].reset_index(drop=True)
+
+    overlap = (set(geno_part.columns) & set(score_part.columns)) - {"chr_pos"}
+    matched = pd.concat(
+        [
+            geno_part.rename(columns={c: f"{c}_geno" for c in overlap}),
+            score_part.drop(columns=["chr_pos"], errors="ignore")
+                      .rename(columns={c: f"{c}_score" for c in overlap}),
+        ],
+        axis=1,
     )
 
     if len(matched) == 0:
         return pd.DataFrame()
 
     # Align effect alleles and calculate dosage
-    matched["dosage"] = matched.apply(
-        lambda row: compute_dosage(
-            row["allele1"],
-            row["allele2"],
-            row["effect_allele"],
-            row["other_allele"]
-        ),
-        axis=1
+    matched["dosage"] = compute_dosages(
+        matched["allele1"],
+        matched["allele2"],
+        matched["effect_allele"],
+        matched["other_allele"],
     )
 
     # Filter out variants where allele alignment failed
@@ -144,6 +221,38 @@ def compute_dosage(
     return None
 
 
+def compute_dosages(
+    allele1: pd.Series,
+    allele2: pd.Series,
+    effect_allele: pd.Series,
+    other_allele: pd.Series,
+) -> np.ndarray:
+    """
+    Compute effect allele dosages for many variants at once.
+
+    Genotype/scoring allele combinations repeat heavily (there are only a
+    few dozen distinct ones in a typical file), so compute_dosage runs once
+    per distinct combination and the result is broadcast back to every
+    variant. Semantics are identical to calling compute_dosage per row.
+
+    Args:
+        allele1: First allele of each genotype
+        allele2: Second allele of each genotype
+        effect_allele: Effect allele from the scoring file
+        other_allele: Other/reference allele from the scoring file
+
+    Returns:
+        Array of float dosages, NaN where the alleles don't match
+    """
+    combos = pd.MultiIndex.from_arrays([allele1, allele2, effect_allele, other_allele])
+    codes, uniques = combos.factorize()
+    table = np.array(
+        [compute_dosage(*combo) for combo in uniques],
+        dtype=float,
+    )
+    return table[codes] if len(table) else np.empty(0, dtype=float)
+
+
 def calculate_prs(genotypes_df: pd.DataFrame, scores_df: pd.DataFrame) -> dict:
     """
     Calculate raw Polygenic Risk Score from matched genotypes and weights.
@@ -160,12 +269,30 @@ def calculate_prs(genotypes_df: pd.DataFrame, scores_df: pd.DataFrame) -> dict:
             - raw_prs: Raw PRS sum
             - matched_df: DataFrame of matched variants (for QC)
     """
-    matched = match_variants(genotypes_df, scores_df)
+    if genotypes_df.index.name == "chr_pos":
+        geno = genotypes_df
+    else:
+        geno = index_genotypes(genotypes_df)
+
+    # Match and sum the scoring file a slice at a time
+    raw_prs = 0.0
+    matched_parts = []
+    for start in range(0, len(scores_df), SCORE_CHUNK_ROWS):
+        chunk = match_variants(geno, scores_df.iloc[start:start + SCORE_CHUNK_ROWS])
+        if len(chunk) == 0:
+            continue
+
+        # Calculate PRS: sum of dosage × effect_weight as one dot product
+        # (missing weights contribute nothing, as with a NaN-skipping sum)
+        dosages = chunk["dosage"].to_numpy(dtype=np.float64)
+        weights = chunk["effect_weight"].to_numpy(dtype=np.float64)
+        has_weight = ~np.isnan(weights)
+        raw_prs += float(np.dot(dosages[has_weight], weights[has_weight]))
+        matched_parts.append(chunk)
 
     total_variants = len(scores_df)
-    matched_variants = len(matched)
 
-    if matched_variants == 0:
+    if not matched_parts:
         return {
             "matched_variants": 0,
             "total_variants": total_variants,
@@ -174,9 +301,8 @@ def calculate_prs(genotypes_df: pd.DataFrame, scores_df: pd.DataFrame) -> dict:
             "matched_df": pd.DataFrame()
         }
 
-    # Calculate PRS: sum of dosage × effect_weight
-    matched["weighted_dosage"] = matched["dosage"] * matched["effect_weight"]
-    raw_prs = matched["weighted_dosage"].sum()
+    matched = pd.concat(matched_parts, ignore_index=True)
+    matched_variants = len(matched)
 
     return {
         "matched_variants": matched_variants,
@@ -206,8 +332,9 @@ def normalize_prs(raw_prs: float, population: str = "EUR") -> dict:
     # Z-score normalization
     zscore = (raw_prs - params["mean"]) / params["sd"]
 
-    # Convert to percentile using standard normal CDF
-    percentile = stats.norm.cdf(zscore) * 100
+    # Convert to percentile using the standard normal CDF (ndtr is what
+    # stats.norm.cdf evaluates, without the distribution-object overhead)
+    percentile = ndtr(zscore) * 100
 
     # Get risk category (returns dict, extract label)
     risk_info = get_risk_category(percentile)
@@ -220,51 +347,61 @@ def normalize_prs(raw_prs: float, population: str = "EUR") -> dict:
     }
 
 
-def compute_single_disease(
-    genotypes_df: pd.DataFrame,
-    disease: str,
-    population: str = "EUR"
-) -> dict:
+def normalize_prs_batch(raw_scores: np.ndarray, population: str = "EUR") -> dict:
     """
-    Compute PRS for a single disease.
+    Vectorized normalize_prs for several raw scores in the same population.
 
     Args:
-        genotypes_df: Parsed genotype DataFrame
-        disease: Disease name (must be in DISEASE_CATALOG)
-        population: Ancestry code
+        raw_scores: Raw PRS sums from calculate_prs
+        population: Ancestry code (EUR, AFR, EAS, AMR, SAS)
 
     Returns:
-        Complete PRS results dict
+        dict with arrays zscore, percentile (0-100) and risk_category,
+        aligned with raw_scores
     """
-    # Load scoring file for disease
+    params = get_population_params(population)
+
+    zscores = (np.asarray(raw_scores, dtype=np.float64) - params["mean"]) / params["sd"]
+    percentiles = ndtr(zscores) * 100
+
+    return {
+        "zscore": zscores,
+        "percentile": percentiles,
+        "risk_category": get_risk_labels(percentiles),
+    }
+
+
+def _failed_result(disease: str, error: str) -> dict:
+    """Result dict for a disease whose PRS could not be computed."""
+    return {
+        "disease": disease,
+        "error": error,
+        "matched_variants": 0,
+        "total_variants": 0,
+        "match_rate": 0.0,
+        "raw_prs": 0.0,
+        "zscore": None,
+        "percentile": None,
+        "risk_category": "Unknown"
+    }
+
+
+def _score_disease(genotypes_df: pd.DataFrame, disease: str) -> dict:
+    """
+    Compute the raw (unnormalized) PRS for a single disease.
+
+    Returns the compute_single_disease result shape with zscore/percentile
+    left unset, so callers can normalize one disease or a whole batch.
+    """
+    # Load scoring file for disease (cached, shared: do not mutate)
     scores_df = load_scores_for_disease(disease)
 
     if scores_df is None or len(scores_df) == 0:
-        return {
-            "disease": disease,
-            "error": f"Could not load scoring file for {disease}",
-            "matched_variants": 0,
-            "total_variants": 0,
-            "match_rate": 0.0,
-            "raw_prs": 0.0,
-            "zscore": None,
-            "percentile": None,
-            "risk_category": "Unknown"
-        }
+        return _failed_result(disease, f"Could not load scoring file for {disease}")
 
     # Calculate raw PRS
     prs_result = calculate_prs(genotypes_df, scores_df)
 
-    # Normalize
-    if prs_result["matched_variants"] > 0:
-        norm_result = normalize_prs(prs_result["raw_prs"], population)
-    else:
-        norm_result = {
-            "zscore": None,
-            "percentile": None,
-            "risk_category": "Insufficient Data"
-        }
-
     # Extract PGS ID from catalog (catalog values are dicts)
     disease_info = DISEASE_CATALOG.get(disease.lower(), {})
     pgs_id = disease_info.get("pgs_id") if isinstance(disease_info, dict) else disease_info
@@ -276,37 +413,115 @@ def compute_single_disease(
         "total_variants": prs_result["total_variants"],
         "match_rate": prs_result["match_rate"],
         "raw_prs": prs_result["raw_prs"],
-        "zscore": norm_result["zscore"],
-        "percentile": norm_result["percentile"],
-        "risk_category": norm_result["risk_category"]
+        "zscore": None,
+        "percentile": None,
+        "risk_category": "Insufficient Data"
     }
 
 
-def compute_all_diseases(
+def compute_single_disease(
     genotypes_df: pd.DataFrame,
-    diseases: Optional[list] = None,
+    disease: str,
     population: str = "EUR"
+) -> dict:
+    """
+    Compute PRS for a single disease.
+
+    Args:
+        genotypes_df: Parsed genotype DataFrame, or the output of index_genotypes
+        disease: Disease name (must be in DISEASE_CATALOG)
+        population: Ancestry code
+
+    Returns:
+        Complete PRS results dict
+    """
+    result = _score_disease(genotypes_df, disease)
+
+    # Normalize
+    if "error" not in result and result["matched_variants"] > 0:
+        result.update(normalize_prs(result["raw_prs"], population))
+
+    return result
+
+
+def _score_disease_safe(genotypes_df: pd.DataFrame, disease: str) -> dict:
+    """Compute raw PRS for one disease, returning a failed result instead of raising."""
+    try:
+        return _score_disease(genotypes_df, disease)
+    except Exception as e:
+        return _failed_result(disease, str(e))
+
+
+def compute_all_diseases(
+    genotypes_df: pd.DataFrame,
+    diseases: Optional[Sequence[str]] = None,
+    population: str = "EUR",
+    progress_callback: Optional[Callable[[int, int, str], None]] = None,
+    max_workers: int = MAX_DISEASE_WORKERS,
 ) -> dict:
     """
     Compute PRS for multiple diseases.
 
+    Diseases are computed concurrently in a thread pool; pandas/NumPy release
+    the GIL during matching and summation, and scoring-file loads are IO-bound.
+    A disease that fails is reported with an "error" key rather than aborting
+    the batch.
+
     Args:
         genotypes_df: Parsed genotype DataFrame
-        diseases: List of disease names. If None, computes all available diseases.
+        diseases: Disease names. If None, computes all available diseases.
         population: Ancestry code (EUR, AFR, EAS, AMR, SAS)
+        progress_callback: Optional callable invoked as (completed, total, disease)
+            each time a disease finishes
+        max_workers: Maximum number of diseases computed concurrently
 
     Returns:
         dict with:
             - population: Ancestry used for normalization
-            - results: dict of disease -> PRS results
+            - results: dict of disease -> PRS results (in input order)
             - summary: Quick overview of top risks
     """
     if diseases is None:
         diseases = list(DISEASE_CATALOG.keys())
 
-    results = {}
-    for disease in diseases:
-        results[disease] = compute_single_disease(genotypes_df, disease, population)
+    # Index genotypes once; every disease is matched against the same table
+    geno_index = index_genotypes(genotypes_df)
+
+    total = len(diseases)
+    completed_results = {}
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, total))) as executor:
+        futures = {
+            executor.submit(_score_disease_safe, geno_index, disease): disease
+            for disease in diseases
+        }
+        for completed, future in enumerate(as_completed(futures), start=1):
+            disease = futures[future]
+            completed_results[disease] = future.result()
+            if progress_callback is not None:
+                progress_callback(completed, total, disease)
+
+    # Restore input order
+    results = {disease: completed_results[disease] for disease in diseases}
+
+    # Normalize every scored disease in one vectorized pass
+    scored = [
+        r for r in results.values()
+        if "error" not in r and r["matched_variants"] > 0
+    ]
+    if scored:
+        try:
+            normalized = normalize_prs_batch([r["raw_prs"] for r in scored], population)
+        except Exception as e:
+            for r in scored:
+                results[r["disease"]] = _failed_result(r["disease"], str(e))
+        else:
+            for r, zscore, percentile, category in zip(
+                scored,
+                normalized["zscore"],
+                normalized["percentile"],
+                normalized["risk_category"],
+            ):
+                r.update(zscore=float(zscore), percentile=float(percentile), risk_category=category)
 
     # Generate summary of elevated risks
     elevated_risks = []
@@ -360,9 +575,10 @@ def validate_prs_input(genotypes_df: pd.DataFrame) -> dict:
         warnings.append(f"{missing_count} variants ({missing_count/total_variants*100:.1f}%) have missing genotypes")
 
     # Check for valid chromosomes
-    valid_chroms = set(str(i) for i in range(1, 23)) | {"X", "Y", "MT", "M"}
-    chrom_values = set(genotypes_df["chrom"].astype(str).str.upper())
-    invalid_chroms = chrom_values - valid_chroms
+    # Compare distinct labels only; categorical chrom columns make this a
+    # lookup over a few dozen categories instead of every row
+    chrom_values = set(pd.Index(genotypes_df["chrom"].unique()).astype(str).str.upper())
+    invalid_chroms = chrom_values - VALID_CHROM_LABELS
     if invalid_chroms:
         warnings.append(f"Unusual chromosome values found: {invalid_chroms}")
 
@@ -18,6 +18,8 @@ from typing import Optional
 from scipy import stats
 import math
 
+from .populations import get_risk_category
+
 
 # ============================================================================
 # EVIDENCE CITATIONS FOR RISK MODIFIERS
@@ -742,7 +744,6 @@ def integrate_prs_with_questionnaire(
     combined_percentile = max(0.1, min(99.9, combined_percentile))
 
     # Determine risk category
-    from .populations import get_risk_category
     prs_category = get_risk_category(prs_percentile)
     combined_category = get_risk_category(combined_percentile)
 
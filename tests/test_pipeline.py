@@ -10,7 +10,12 @@ Tests cover:
 Run with: pytest tests/test_pipeline.py -v
 """
 
+import gzip
+import json
+import pickle
 import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 import numpy as np
@@ -21,14 +26,20 @@ import pytest
 PROJECT_ROOT = Path(__file__).parent.parent
 sys.path.insert(0, str(PROJECT_ROOT))
 
+from src import dna_parser
 from src.dna_parser import (
     detect_format,
     detect_build,
+    detect_format_and_build,
     parse_23andme,
     parse_ancestrydna,
     parse_vcf,
     parse_raw_dna,
+    parse_raw_dna_bytes,
     get_genotype_summary,
+    allele_codes,
+    OTHER_ALLELE_CODE,
+    CHROM_DTYPE,
 )
 from src.populations import (
     get_population_params,
@@ -38,17 +49,32 @@ from src.populations import (
 )
 from src.prs_calculator import (
     compute_dosage,
+    compute_dosages,
     match_variants,
     calculate_prs,
     normalize_prs,
+    normalize_prs_batch,
     validate_prs_input,
     get_complement,
     is_strand_flip,
+    compute_all_diseases,
 )
+from src import pgscatalog
 from src.pgscatalog import (
     DISEASE_CATALOG,
     get_disease_info,
     list_available_diseases,
+    load_scores_for_disease,
+    get_all_disease_scores,
+)
+from src import imputation
+from src import liftover
+from src.imputation import (
+    estimate_imputation_benefit,
+    merge_with_genotyped,
+    parse_imputed_vcf,
+    prepare_vcf_for_imputation,
+    wait_for_job,
 )
 
 
@@ -155,6 +181,35 @@ class TestDetectBuild:
         detected = detect_build(unknown_file)
         assert detected == "GRCh37"
 
+    def test_detect_format_and_build_matches_separate_detection(
+        self, sample_23andme_path, sample_vcf_path, sample_ancestrydna_path
+    ):
+        """Test that single-pass detection agrees with the separate detectors."""
+        for path in (sample_23andme_path, sample_vcf_path, sample_ancestrydna_path):
+            if path.exists():
+                assert detect_format_and_build(path) == (
+                    detect_format(path),
+                    detect_build(path),
+                )
+
+    def test_detect_build_cache_tracks_file_changes(self, tmp_path):
+        """Test that a rewritten file is re-scanned rather than served from cache."""
+        data_file = tmp_path / "positions.txt"
+        data_file.write_text(
+            "rs7412\t19\t45412079\tCC\n"
+            "rs429358\t19\t45411941\tTT\n"
+            "rs1801133\t1\t11856378\tGG\n"
+        )
+        assert detect_build(data_file) == "GRCh37"
+
+        data_file.write_text(
+            "rs7412\t19\t44908822\tCC\n"
+            "rs429358\t19\t44908684\tTT\n"
+            "rs1801133\t1\t11796321\tGG\n"
+            "rs12913832\t15\t28120472\tAA\n"
+        )
+        assert detect_build(data_file) == "GRCh38"
+
 
 class TestParse23andMe:
     """Tests for 23andMe file parsing."""
@@ -192,6 +247,44 @@ class TestParse23andMe:
         df = parse_23andme(test_file)
         assert len(df) == 2
 
+    def test_parse_23andme_arrow_matches_pandas_reader(self, tmp_path, monkeypatch):
+        """Test that the pyarrow reader (when installed) matches the pandas reader."""
+        test_file = tmp_path / "test_23andme.txt"
+        test_file.write_text(
+            "# 23andMe comment\n"
+            "# rsid\tchromosome\tposition\tgenotype\n"
+            "rs1\tchr1\t1000\tag\n"
+            "rs2\tX\t2000\tA\n"
+            "rs3\t1\t3000\t--\n"
+            "rs4\t1\tbad\tCC\n"
+            "rs5\tMT\t4000\tDI\n"
+        )
+        fast = parse_23andme(test_file, "GRCh37")
+
+        monkeypatch.setattr(dna_parser, "pa_csv", None)
+        slow = parse_23andme(test_file, "GRCh37")
+
+        pd.testing.assert_frame_equal(fast, slow, check_dtype=False)
+        assert list(fast["rsid"]) == ["rs1", "rs2", "rs5"]
+
+    def test_parse_23andme_keeps_records_with_extra_fields(self, tmp_path, monkeypatch):
+        """Test that a record with a trailing extra field is kept by both readers."""
+        test_file = tmp_path / "test_23andme.txt"
+        test_file.write_text(
+            "# rsid\tchromosome\tposition\tgenotype\n"
+            "rs1\t1\t100\tAG\n"
+            "rs2\t1\t200\tCC\textra\n"
+            "rs3\t1\t300\tTT\n"
+        )
+        fast = parse_23andme(test_file, "GRCh37")
+
+        monkeypatch.setattr(dna_parser, "pa_csv", None)
+        slow = parse_23andme(test_file, "GRCh37")
+
+        pd.testing.assert_frame_equal(fast, slow, check_dtype=False)
+        assert list(fast["rsid"]) == ["rs1", "rs2", "rs3"]
+        assert list(fast["genotype"]) == ["AG", "CC", "TT"]
+
 
 class TestParseVCF:
     """Tests for VCF file parsing."""
@@ -220,6 +313,50 @@ class TestParseVCF:
                 assert row["allele1"] in valid_bases or len(row["allele1"]) > 1
                 assert row["allele2"] in valid_bases or len(row["allele2"]) > 1
 
+    def test_parse_vcf_genotype_edge_cases(self, tmp_path):
+        """Test GT decoding across FORMAT layouts, ploidy and missing calls."""
+        vcf_file = tmp_path / "test.vcf"
+        vcf_file.write_text(
+            "##fileformat=VCFv4.2\n"
+            "#CHROM\tPOS\tID\tREF\tALT\tQUAL\tFILTER\tINFO\tFORMAT\tS1\tS2\n"
+            "chr1\t100\trs1\ta\tg,t\t.\t.\t.\tGT:DP\t0|1:12\t1/1:3\n"
+            "1\t200\t.\tC\tT\t.\t.\t.\tDP:GT\t8:1/1\n"
+            "X\t300\trs3\tG\tA\t.\t.\t.\tGT\t1\n"
+            "1\t400\trs4\tA\tC\t.\t.\t.\tGT\t./.\n"
+            "1\t500\trs5\tA\tC,G\t.\t.\t.\tGT\t0/2\n"
+            "1\t600\trs6\tA\tC\t.\t.\t.\tGT:DP\t\n"
+            "1\tbad\trs7\tA\tC\t.\t.\t.\tGT\t0/1\n"
+        )
+        df = parse_vcf(vcf_file, "GRCh37")
+
+        assert list(df["rsid"]) == ["rs1", "chr1:200", "rs3"]
+        assert list(df["chrom"]) == ["1", "1", "X"]
+        assert list(df["genotype"]) == ["AG", "TT", "AA"]
+
+    def test_parse_vcf_detects_build_from_header(self, tmp_path):
+        """Test that parse_vcf picks up the build while reading the VCF header."""
+        vcf_file = tmp_path / "test.vcf"
+        vcf_file.write_text(
+            "##fileformat=VCFv4.2\n"
+            "##reference=GRCh38\n"
+            "#CHROM\tPOS\tID\tREF\tALT\tQUAL\tFILTER\tINFO\tFORMAT\tS1\n"
+            "1\t100\trs1\tA\tG\t.\t.\t.\tGT\t0/1\n"
+        )
+        df = parse_vcf(vcf_file)
+
+        assert list(df["build"]) == ["GRCh38"]
+        assert detect_build(vcf_file) == "GRCh38"
+
+    def test_parse_vcf_arrow_matches_pandas_reader(self, sample_vcf_path, monkeypatch):
+        """Test that the pyarrow reader (when installed) matches the pandas reader."""
+        if sample_vcf_path.exists():
+            fast = parse_vcf(sample_vcf_path, "GRCh37")
+
+            monkeypatch.setattr(dna_parser, "pa_csv", None)
+            slow = parse_vcf(sample_vcf_path, "GRCh37")
+
+            pd.testing.assert_frame_equal(fast, slow, check_dtype=False)
+
 
 class TestParseAncestryDNA:
     """Tests for AncestryDNA file parsing."""
@@ -238,6 +375,19 @@ class TestParseAncestryDNA:
             expected_cols = {"rsid", "chrom", "pos", "allele1", "allele2", "genotype", "build"}
             assert expected_cols.issubset(set(df.columns))
 
+    def test_parse_ancestrydna_comma_separated(self, tmp_path):
+        """Test that comma-separated exports parse like tab-separated ones."""
+        rows = ["#AncestryDNA raw data", "rsid\tchromosome\tposition\tallele1\tallele2",
+                "rs1\t1\t100\tA\tG", "rs2\t2\t200\t0\t0", "rs3\tX\t300\tC\tC"]
+        tab_file = tmp_path / "tab.txt"
+        tab_file.write_text("\n".join(rows) + "\n")
+        comma_file = tmp_path / "comma.txt"
+        comma_file.write_text("\n".join(row.replace("\t", ",") for row in rows) + "\n")
+
+        expected = parse_ancestrydna(tab_file, "GRCh37")
+        assert list(expected["rsid"]) == ["rs1", "rs3"]
+        pd.testing.assert_frame_equal(parse_ancestrydna(comma_file, "GRCh37"), expected)
+
 
 class TestParseRawDNA:
     """Tests for the unified parse_raw_dna entry point."""
@@ -249,6 +399,82 @@ class TestParseRawDNA:
             assert isinstance(df, pd.DataFrame)
             assert len(df) > 0
 
+    def test_parse_raw_dna_compact_dtypes(self, sample_vcf_path):
+        """Test that chromosomes and alleles are categorical and positions int32."""
+        if sample_vcf_path.exists():
+            df = parse_raw_dna(sample_vcf_path)
+            assert isinstance(df["chrom"].dtype, pd.CategoricalDtype)
+            assert df["pos"].dtype == "int32"
+            assert df["allele1"].dtype == df["allele2"].dtype
+            assert (df["allele1"] == df["allele2"]).dtype == bool
+
+    def test_parse_raw_dna_shared_chrom_dtype(self, sample_23andme_path, sample_vcf_path):
+        """Test that every format shares one chromosome dtype, so concat keeps it."""
+        if sample_23andme_path.exists() and sample_vcf_path.exists():
+            frames = [parse_raw_dna(sample_23andme_path), parse_raw_dna(sample_vcf_path)]
+            assert all(df["chrom"].dtype == CHROM_DTYPE for df in frames)
+            assert pd.concat(frames)["chrom"].dtype == CHROM_DTYPE
+
+    def test_parse_raw_dna_parquet_cache(self, sample_23andme_path, tmp_path):
+        """Test that cached parses round-trip exactly and are keyed by content."""
+        pytest.importorskip("pyarrow")
+        if sample_23andme_path.exists():
+            data_file = tmp_path / "genome.txt"
+            data_file.write_bytes(sample_23andme_path.read_bytes())
+            cache_dir = tmp_path / "cache"
+
+            first = parse_raw_dna(data_file, cache_dir=cache_dir)
+            assert len(list(cache_dir.glob("*.parquet"))) == 1
+            pd.testing.assert_frame_equal(parse_raw_dna(data_file, cache_dir=cache_dir), first)
+
+            data_file.write_text("# 23andMe\nrs1\t1\t100\tAG\n")
+            assert list(parse_raw_dna(data_file, cache_dir=cache_dir)["rsid"]) == ["rs1"]
+
+    def test_parse_raw_dna_concurrent_cache_writes(self, sample_23andme_path, tmp_path):
+        """Test that simultaneous parses of one upload share a single cache entry."""
+        pytest.importorskip("pyarrow")
+        if sample_23andme_path.exists():
+            cache_dir = tmp_path / "cache"
+            expected = parse_raw_dna(sample_23andme_path)
+
+            with ThreadPoolExecutor(max_workers=4) as executor:
+                frames = list(executor.map(
+                    lambda _: parse_raw_dna(sample_23andme_path, cache_dir=cache_dir), range(4)
+                ))
+
+            for df in frames:
+                pd.testing.assert_frame_equal(df, expected)
+            assert [p.suffix for p in cache_dir.iterdir()] == [".parquet"]
+
+    def test_parse_raw_dna_cache_write_failure(self, sample_23andme_path, tmp_path, monkeypatch):
+        """Test that a failed cache write is logged and still returns the parse."""
+        pytest.importorskip("pyarrow")
+        if sample_23andme_path.exists():
+            cache_dir = tmp_path / "cache"
+
+            def fail(self, path, **kwargs):
+                raise OSError("disk full")
+
+            monkeypatch.setattr(pd.DataFrame, "to_parquet", fail)
+            df = parse_raw_dna(sample_23andme_path, cache_dir=cache_dir)
+
+            assert len(df) > 0
+            assert list(cache_dir.iterdir()) == []
+
+    def test_parse_raw_dna_bytes_matches_file_parse(self, sample_23andme_path):
+        """Test that parsing in-memory content (plain or gzipped) matches parsing the file."""
+        import gzip
+
+        if sample_23andme_path.exists():
+            content = sample_23andme_path.read_bytes()
+            expected = parse_raw_dna(sample_23andme_path)
+
+            for data in (content, gzip.compress(content)):
+                df, file_format, build = parse_raw_dna_bytes(data, sample_23andme_path.name)
+                assert file_format == "23andme"
+                assert build in ("GRCh37", "GRCh38")
+                pd.testing.assert_frame_equal(df, expected)
+
     def test_parse_raw_dna_file_not_found(self):
         """Test that FileNotFoundError is raised for missing files."""
         with pytest.raises(FileNotFoundError):
@@ -287,6 +513,35 @@ class TestGenotypeSummary:
             assert "chromosomes" in summary
             assert "variant_types" in summary
 
+    def test_genotype_summary_counts_indels(self):
+        """Test that any multi-base allele classifies the variant as an indel."""
+        df = pd.DataFrame({
+            "chrom": ["1", "1", "2"],
+            "allele1": ["A", "AT", "G"],
+            "allele2": ["G", "A", "GC"],
+            "build": "GRCh37",
+        })
+        summary = get_genotype_summary(df)
+        assert summary["variant_types"] == {"snps": 1, "indels": 2}
+
+    def test_genotype_summary_omits_absent_chromosomes(self):
+        """Test that chromosomes with no variants are left out of the summary."""
+        df = pd.DataFrame({
+            "chrom": pd.Series(["1", "1", "2"], dtype=CHROM_DTYPE),
+            "allele1": ["A", "C", "G"],
+            "allele2": ["G", "T", "G"],
+            "build": "GRCh37",
+        })
+        summary = get_genotype_summary(df)
+        assert summary["chromosomes"] == {"1": 2, "2": 1}
+
+    def test_allele_codes(self):
+        """Test packing of alleles into uint8 nucleotide codes."""
+        alleles = pd.Series(["A", "C", "G", "T", "N", "I", "AT", None]).astype("category")
+        codes = allele_codes(alleles)
+        assert codes.dtype == np.uint8
+        assert list(codes) == [0, 1, 2, 3, 4] + [OTHER_ALLELE_CODE] * 3
+
 
 # =============================================================================
 # PRS Calculator Tests
@@ -327,6 +582,22 @@ class TestComputeDosage:
         dosage = compute_dosage("A", "G", "C", "T")
         assert dosage is None
 
+    def test_vectorized_dosages_match_scalar(self):
+        """Test that compute_dosages agrees with compute_dosage row by row."""
+        a1 = pd.Series(["A", "G", "T", "--", None, "a", "A"])
+        a2 = pd.Series(["A", "A", "T", "A", "G", "g", "G"])
+        eff = pd.Series(["A", "A", "A", "A", "A", "A", "C"])
+        oth = pd.Series(["G", "G", "C", "G", "G", None, "T"])
+
+        dosages = compute_dosages(a1, a2, eff, oth)
+
+        for i, dosage in enumerate(dosages):
+            expected = compute_dosage(a1[i], a2[i], eff[i], oth[i])
+            if expected is None:
+                assert np.isnan(dosage)
+            else:
+                assert dosage == expected
+
 
 class TestStrandFlip:
     """Tests for strand flip detection."""
@@ -375,6 +646,18 @@ class TestMatchVariants:
         matched = match_variants(geno, scores)
         assert len(matched) == 0
 
+    def test_match_variants_normalizes_coordinates(self, sample_genotypes_df):
+        """Test that chr prefixes and float positions in scoring files still match."""
+        scores = pd.DataFrame({
+            "hm_chr": ["chr1", 2.0],
+            "hm_pos": [100.0, 400.0],
+            "effect_allele": ["A", "T"],
+            "other_allele": ["G", "C"],
+            "effect_weight": [0.1, 0.2],
+        })
+        matched = match_variants(sample_genotypes_df, scores)
+        assert list(matched["rsid"]) == ["rs1", "rs4"]
+
 
 class TestCalculatePRS:
     """Tests for PRS calculation."""
@@ -400,6 +683,19 @@ class TestCalculatePRS:
         assert result["matched_variants"] == 0
         assert result["raw_prs"] == 0.0
 
+    def test_calculate_prs_chunking_is_transparent(
+        self, monkeypatch, sample_genotypes_df, sample_scores_df
+    ):
+        """Test that matching in slices gives the same result as one pass."""
+        whole = calculate_prs(sample_genotypes_df, sample_scores_df)
+
+        monkeypatch.setattr("src.prs_calculator.SCORE_CHUNK_ROWS", 1)
+        sliced = calculate_prs(sample_genotypes_df, sample_scores_df)
+
+        assert sliced["matched_variants"] == whole["matched_variants"]
+        assert sliced["raw_prs"] == pytest.approx(whole["raw_prs"])
+        assert len(sliced["matched_df"]) == len(whole["matched_df"])
+
 
 class TestNormalizePRS:
     """Tests for PRS normalization."""
@@ -428,6 +724,17 @@ class TestNormalizePRS:
         result_low = normalize_prs(-10.0, population="EUR")
         assert 0 <= result_low["percentile"] <= 100
 
+    def test_normalize_prs_batch_matches_scalar(self):
+        """Test that batch normalization agrees with normalize_prs element-wise."""
+        raw_scores = [-3.0, -1.0, 0.0, 0.7, 1.3, 2.5, 10.0]
+        for population in ("EUR", "AFR", "EAS"):
+            batch = normalize_prs_batch(raw_scores, population=population)
+            for i, raw in enumerate(raw_scores):
+                expected = normalize_prs(raw, population=population)
+                assert batch["zscore"][i] == pytest.approx(expected["zscore"])
+                assert batch["percentile"][i] == pytest.approx(expected["percentile"])
+                assert batch["risk_category"][i] == expected["risk_category"]
+
     def test_normalize_prs_different_populations(self):
         """Test normalization varies by population."""
         raw_prs = 1.0
@@ -456,6 +763,33 @@ class TestValidatePRSInput:
         assert len(result["errors"]) > 0
 
 
+class TestComputeAllDiseases:
+    """Tests for batch PRS computation across diseases."""
+
+    def test_compute_all_diseases_isolates_failures(
+        self, monkeypatch, sample_genotypes_df, sample_scores_df
+    ):
+        """Test that one failing disease does not abort the batch."""
+        def fake_load(disease):
+            if disease == "t2d":
+                raise RuntimeError("download failed")
+            return sample_scores_df
+
+        monkeypatch.setattr("src.prs_calculator.load_scores_for_disease", fake_load)
+        progress_calls = []
+
+        result = compute_all_diseases(
+            sample_genotypes_df,
+            diseases=["cad", "t2d", "breast_cancer"],
+            progress_callback=lambda done, total, disease: progress_calls.append((done, total)),
+        )
+
+        assert list(result["results"]) == ["cad", "t2d", "breast_cancer"]
+        assert result["results"]["t2d"]["error"] == "download failed"
+        assert result["results"]["cad"]["matched_variants"] > 0
+        assert sorted(progress_calls) == [(1, 3), (2, 3), (3, 3)]
+
+
 # =============================================================================
 # Population Tests
 # =============================================================================
@@ -608,6 +942,141 @@ class TestDiseaseCatalog:
         assert all("key" in d for d in diseases)
         assert all("pgs_id" in d for d in diseases)
 
+    def test_load_scores_for_disease_is_cached(self, monkeypatch, tmp_path, sample_scores_df):
+        """Test that scoring files are parsed once per disease and build."""
+        parse_calls = []
+
+        def fake_parse(filepath):
+            parse_calls.append(filepath)
+            return sample_scores_df.copy()
+
+        monkeypatch.setattr("src.pgscatalog.download_scoring_file",
+                            lambda pgs_id, build="GRCh37", force=False: tmp_path / pgs_id)
+        monkeypatch.setattr("src.pgscatalog.parse_scoring_file", fake_parse)
+        pgscatalog._scores_cache.clear()
+
+        first = load_scores_for_disease("cad")
+        second = load_scores_for_disease("CAD")
+
+        assert first is second
+        assert len(parse_calls) == 1
+        pgscatalog._scores_cache.clear()
+
+    def test_scores_cache_is_bounded(self, monkeypatch, tmp_path, sample_scores_df):
+        """Test that files beyond the cache size are loaded again instead of kept."""
+        parse_calls = []
+
+        def fake_parse(filepath):
+            parse_calls.append(filepath.name)
+            return sample_scores_df.copy()
+
+        monkeypatch.setattr("src.pgscatalog.download_scoring_file",
+                            lambda pgs_id, build="GRCh37", force=False: tmp_path / pgs_id)
+        monkeypatch.setattr("src.pgscatalog.parse_scoring_file", fake_parse)
+        monkeypatch.setattr(pgscatalog, "MAX_CACHED_SCORE_FILES", 1)
+        monkeypatch.setattr(pgscatalog, "_scores_cache", {})
+
+        for _ in range(2):
+            load_scores_for_disease("cad")
+            load_scores_for_disease("t2d")
+
+        assert list(pgscatalog._scores_cache) == [("cad", "GRCh37")]
+        assert parse_calls.count(DISEASE_CATALOG["cad"]["pgs_id"]) == 1
+        assert parse_calls.count(DISEASE_CATALOG["t2d"]["pgs_id"]) == 2
+
+    def test_parsed_scores_persist_across_processes(self, monkeypatch, tmp_path, sample_scores_df):
+        """Test that a parsed scoring file is reloaded from disk instead of re-parsed."""
+        parse_calls = []
+        source = tmp_path / "PGS000018_GRCh37.txt"
+        source.write_text("placeholder")
+
+        def fake_parse(filepath):
+            parse_calls.append(filepath)
+            return sample_scores_df.copy()
+
+        monkeypatch.setattr("src.pgscatalog.download_scoring_file",
+                            lambda pgs_id, build="GRCh37", force=False: source)
+        monkeypatch.setattr("src.pgscatalog.parse_scoring_file", fake_parse)
+
+        pgscatalog._scores_cache.clear()
+        first = load_scores_for_disease("cad")
+        # Simulate a fresh process: in-memory cache gone, disk cache kept
+        pgscatalog._scores_cache.clear()
+        second = load_scores_for_disease("cad")
+        pgscatalog._scores_cache.clear()
+
+        assert len(parse_calls) == 1
+        pd.testing.assert_frame_equal(first, second)
+        assert second.attrs["pgs_id"] == first.attrs["pgs_id"]
+
+    def test_concurrent_parsed_cache_writes(self, tmp_path, sample_scores_df):
+        """Test that simultaneous writers of one parsed cache leave a single valid file."""
+        source = tmp_path / "PGS000018_GRCh37.txt"
+        source.write_text("placeholder")
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            list(executor.map(
+                lambda _: pgscatalog._write_parsed_cache(source, sample_scores_df), range(8)
+            ))
+
+        assert sorted(p.name for p in tmp_path.iterdir()) == [
+            pgscatalog._parsed_cache_path(source).name, "PGS000018_GRCh37.txt"
+        ]
+        pd.testing.assert_frame_equal(pgscatalog._read_parsed_cache(source), sample_scores_df)
+
+    def test_parsed_cache_is_versioned(self, monkeypatch, tmp_path, sample_scores_df):
+        """Test that bumping the parser version stops older parsed copies being read."""
+        source = tmp_path / "PGS000018_GRCh37.txt"
+        source.write_text("placeholder")
+        pgscatalog._write_parsed_cache(source, sample_scores_df)
+        assert pgscatalog._read_parsed_cache(source) is not None
+
+        monkeypatch.setattr(pgscatalog, "SCORE_CACHE_VERSION", pgscatalog.SCORE_CACHE_VERSION + 1)
+        assert pgscatalog._read_parsed_cache(source) is None
+
+    def test_concurrent_downloads_fetch_once(self, monkeypatch, tmp_path):
+        """Test that parallel loads of one scoring file share a single download."""
+        body = gzip.compress(b"rsID\teffect_weight\nrs1\t0.1\n")
+        get_calls = []
+
+        class FakeResponse:
+            def raise_for_status(self):
+                pass
+
+            def iter_content(self, chunk_size):
+                time.sleep(0.05)
+                yield body
+
+        def fake_get(url, **kwargs):
+            get_calls.append(url)
+            return FakeResponse()
+
+        monkeypatch.setattr(pgscatalog, "CACHE_DIR", tmp_path)
+        monkeypatch.setattr(pgscatalog.requests, "get", fake_get)
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            paths = list(executor.map(
+                lambda _: pgscatalog.download_scoring_file("PGS000018"), range(4)
+            ))
+
+        assert len(get_calls) == 1
+        assert set(paths) == {tmp_path / "PGS000018_GRCh37.txt"}
+        assert paths[0].read_bytes() == gzip.decompress(body)
+        assert [p.name for p in tmp_path.iterdir()] == ["PGS000018_GRCh37.txt"]
+
+    def test_get_all_disease_scores_skips_failures(self, monkeypatch, sample_scores_df):
+        """Test that concurrent loading keeps request order and drops failed diseases."""
+        def fake_load(disease, build="GRCh37"):
+            if disease == "t2d":
+                raise RuntimeError("download failed")
+            return sample_scores_df
+
+        monkeypatch.setattr("src.pgscatalog.load_scores_for_disease", fake_load)
+
+        scores = get_all_disease_scores(diseases=["cad", "t2d", "breast_cancer"])
+
+        assert list(scores) == ["cad", "breast_cancer"]
+
     def test_known_diseases_present(self):
         """Test that expected core diseases are in catalog."""
         expected_diseases = ["cad", "breast_cancer", "t2d"]
@@ -615,6 +1084,371 @@ class TestDiseaseCatalog:
             assert disease in DISEASE_CATALOG, f"Expected disease '{disease}' not in catalog"
 
 
+# =============================================================================
+# Imputation Tests
+# =============================================================================
+
+class TestPrepareVCFForImputation:
+    """Tests for writing genotypes as per-chromosome VCFs for imputation."""
+
+    def test_prepare_vcf_records(self, tmp_path):
+        """Test QC filtering, sorting and REF/ALT/GT assignment of written records."""
+        genotypes = pd.DataFrame({
+            "rsid": ["rs3", "rs1", "rs2", "rs4", "rs5", "rs6"],
+            "chrom": ["2", "1", "1", "X", "1", "1"],
+            "pos": [50, 200, 100, 10, 300, 400],
+            "allele1": ["G", "A", "C", "A", "-", "AT"],
+            "allele2": ["G", "G", "C", "G", "-", "A"],
+        })
+        vcf_files = prepare_vcf_for_imputation(genotypes, tmp_path, sample_id="S1")
+
+        assert [path.name for path in vcf_files] == ["chr1.vcf.gz", "chr2.vcf.gz"]
+        with gzip.open(vcf_files[0], "rt") as f:
+            lines = f.read().splitlines()
+        assert lines[4].endswith("\tFORMAT\tS1")
+        assert lines[5:] == [
+            "1\t100\trs2\tC\t.\t.\tPASS\t.\tGT\t0/0",
+            "1\t200\trs1\tA\tG\t.\tPASS\t.\tGT\t0/1",
+        ]
+
+
+class TestParseImputedVCF:
+    """Tests for reading dosages from imputed VCFs."""
+
+    def test_parse_imputed_vcf_dosage_r2_and_flags(self, tmp_path, monkeypatch):
+        """Test DS/GT dosage fallback, R2 lookup and imputed flags with both readers."""
+        vcf_file = tmp_path / "chr1.dose.vcf"
+        vcf_file.write_text(
+            "##fileformat=VCFv4.1\n"
+            "#CHROM\tPOS\tID\tREF\tALT\tQUAL\tFILTER\tINFO\tFORMAT\tS1\n"
+            "1\t10\trs1\tA\tG\t.\tPASS\tAF=0.1;R2=0.9;IMPUTED=TRUE\tGT:DS\t0|1:0.95\n"
+            "1\t11\trs2\tC\tT\t.\tPASS\tR2=0.8;TYPED\tGT\t1|1\n"
+            "1\t12\trs3\tC\tT\t.\tPASS\tINFO=0.5\tGT:DS\t0|1:bad\n"
+            "1\t13\trs4\tC\tT\t.\tPASS\t.\tDP\t7\n"
+            "1\t14\trs5\n"
+        )
+        fast = parse_imputed_vcf(vcf_file)
+        monkeypatch.setattr(imputation, "pa_csv", None)
+        monkeypatch.setattr(imputation, "pc", None)
+        slow = parse_imputed_vcf(vcf_file)
+
+        for df in (fast, slow):
+            assert list(df["rsid"]) == ["rs1", "rs2", "rs3"]
+            assert list(df["dosage"]) == [0.95, 2.0, 1.0]
+            assert list(df["r2"]) == [0.9, 0.8, 0.5]
+            assert list(df["imputed"]) == [True, False, False]
+            assert list(df["pos"]) == [10, 11, 12]
+
+    def test_parse_imputed_vcf_in_chunks(self, tmp_path, monkeypatch):
+        """Test that records split over several chunks give the same result."""
+        vcf_file = tmp_path / "chr2.dose.vcf.gz"
+        records = "".join(
+            f"2\t{pos}\trs{pos}\tA\tG\t.\tPASS\tR2=0.{pos}\tGT:DS\t0|1:{pos / 10}\n"
+            for pos in range(1, 8)
+        )
+        with gzip.open(vcf_file, "wt") as f:
+            f.write("#CHROM\tPOS\tID\tREF\tALT\tQUAL\tFILTER\tINFO\tFORMAT\tS1\n" + records)
+        whole = parse_imputed_vcf(vcf_file)
+
+        monkeypatch.setattr(imputation, "IMPUTED_VCF_CHUNK_ROWS", 2)
+        pd.testing.assert_frame_equal(parse_imputed_vcf(vcf_file), whole)
+        monkeypatch.setattr(imputation, "pa_csv", None)
+        pd.testing.assert_frame_equal(parse_imputed_vcf(vcf_file), whole)
+        assert list(whole["pos"]) == list(range(1, 8))
+        assert list(whole.index) == list(range(7))
+
+
+class TestEstimateImputationBenefit:
+    """Tests for estimating coverage gains from imputation."""
+
+    def test_overlap_ignores_case_and_duplicates(self):
+        """Test that rsids are matched case-insensitively and counted once."""
+        genotypes = pd.DataFrame({"rsid": ["rs1", "RS2", "rs2", "rs9"]})
+        scores = pd.DataFrame({"rsid": ["rs1", "rs2", "rs3", "rs4", "rs1"]})
+
+        result = estimate_imputation_benefit(genotypes, scores)
+
+        assert result["current_genotyped_variants"] == 3
+        assert result["scoring_file_variants"] == 4
+        assert result["current_matched_variants"] == 2
+        assert result["current_coverage_percent"] == 50
+        assert result["imputation_recommended"] is False
+
+
+class TestMergeWithGenotyped:
+    """Tests for combining genotyped and imputed variants."""
+
+    def test_merge_prefers_genotyped_and_filters_r2(self):
+        """Test that overlapping and low-quality imputed variants are dropped."""
+        genotyped = pd.DataFrame({
+            "rsid": ["rs1", "rs2"],
+            "chrom": ["20", "20"],
+            "pos": [100, 200],
+            "allele1": ["A", "C"],
+            "allele2": ["G", "C"],
+        })
+        imputed = pd.DataFrame({
+            "rsid": ["rs1", "rs3", "rs4", "rs5"],
+            "chrom": ["chr20", "chr20", "chr20", "21"],
+            "pos": [100, 300, 400, 200],
+            "ref": ["A", "G", "T", "C"],
+            "alt": ["G", "A", "C", "T"],
+            "dosage": [1.0, 0.5, 1.5, 2.0],
+            "r2": [0.9, 0.8, 0.1, 0.95],
+            "imputed": [True, True, True, True],
+        })
+
+        merged = merge_with_genotyped(imputed, genotyped, r2_threshold=0.3)
+
+        assert list(merged["rsid"]) == ["rs1", "rs2", "rs3", "rs5"]
+        assert list(merged["imputed"]) == [False, False, True, True]
+        assert list(merged.loc[2:, "allele1"]) == ["G", "C"]
+
+
+class TestWaitForJob:
+    """Tests for polling the imputation server until a job finishes."""
+
+    def test_wait_for_job_backs_off_until_progress(self, monkeypatch):
+        """Test that the poll interval grows while idle and resets on progress."""
+        statuses = iter([
+            {"state": "waiting", "progress": 0},
+            {"state": "waiting", "progress": 0},
+            {"state": "waiting", "progress": 0},
+            {"state": "running", "progress": 50},
+            {"state": "running", "progress": 50},
+            {"state": "success", "progress": 100},
+        ])
+        sleeps = []
+        monkeypatch.setattr(imputation, "check_job_status", lambda job_id, api_token: next(statuses))
+        monkeypatch.setattr(imputation.time, "sleep", sleeps.append)
+
+        result = wait_for_job("job-1", api_token="token", poll_interval=4)
+
+        assert result["state"] == "success"
+        assert sleeps == [2.0, 3.0, 4, 2.0, 3.0]
+
+
+class TestDownloadImputedResults:
+    """Tests for fetching result files from a finished imputation job."""
+
+    def test_download_results_with_and_without_ranges(self, tmp_path, monkeypatch):
+        """Test that ranged and plain downloads both write complete files."""
+        bodies = {"chr1.zip": bytes(range(256)) * 40, "chr2.zip": b"no ranges here"}
+
+        class FakeResponse:
+            def __init__(self, body=b"", status_code=200, headers=None):
+                self.body = body
+                self.content = body
+                self.status_code = status_code
+                self.ok = status_code < 400
+                self.headers = headers or {}
+
+            def raise_for_status(self):
+                pass
+
+            def iter_content(self, chunk_size):
+                for start in range(0, len(self.body), chunk_size):
+                    yield self.body[start:start + chunk_size]
+
+        def fake_head(url, headers=None, **kwargs):
+            body = bodies[url.rsplit("/", 1)[1]]
+            accept = "bytes" if url.endswith("chr1.zip") else "none"
+            return FakeResponse(headers={"Content-Length": str(len(body)), "Accept-Ranges": accept})
+
+        def fake_get(url, headers=None, **kwargs):
+            if url.endswith("/jobs/job-1"):
+                return FakeResponse(json.dumps({"outputParams": [
+                    {"type": "local-folder", "id": name, "name": name} for name in bodies
+                ]}).encode())
+            body = bodies[url.rsplit("/", 1)[1]]
+            if "Range" in headers:
+                start, end = map(int, headers["Range"].split("=")[1].split("-"))
+                return FakeResponse(body[start:end + 1], status_code=206)
+            return FakeResponse(body)
+
+        monkeypatch.setattr(imputation._SESSION, "head", fake_head)
+        monkeypatch.setattr(imputation._SESSION, "get", fake_get)
+        monkeypatch.setattr(imputation, "RANGE_DOWNLOAD_MIN_BYTES", 1000)
+        monkeypatch.setattr(imputation, "DOWNLOAD_CHUNK_SIZE", 100)
+
+        paths = imputation.download_imputed_results("job-1", tmp_path, api_token="token")
+
+        assert paths == [tmp_path / "chr1.zip", tmp_path / "chr2.zip"]
+        for path in paths:
+            assert path.read_bytes() == bodies[path.name]
+        assert sorted(p.name for p in tmp_path.iterdir()) == ["chr1.zip", "chr2.zip"]
+
+
+# =============================================================================
+# Liftover Tests
+# =============================================================================
+
+# Two overlapping chr1 chains (the higher score wins) and a reverse-strand
+# chrM chain, in UCSC chain format with 0-based coordinates
+TEST_CHAIN = (
+    "chain 1000 chr1 5000 + 0 300 chr1 6000 + 1000 1300 1\n"
+    "100 50 50\n"
+    "150\n"
+    "\n"
+    "chain 10 chr1 5000 + 50 250 chrX 9000 + 0 200 2\n"
+    "200\n"
+    "\n"
+    "chain 500 chrM 16569 + 0 100 chrM 16569 - 0 100 3\n"
+    "100\n"
+)
+
+
+@pytest.fixture
+def test_chain(tmp_path, monkeypatch):
+    """Serve TEST_CHAIN as the GRCh37 -> GRCh38 chain file."""
+    chain_path = tmp_path / "hg19ToHg38.over.chain.gz"
+    with gzip.open(chain_path, "wt") as f:
+        f.write(TEST_CHAIN)
+    monkeypatch.setattr(liftover, "get_chain_file", lambda from_build, to_build: chain_path)
+    monkeypatch.setattr(liftover, "_liftover_cache", {})
+    return chain_path
+
+
+class TestLiftover:
+    """Tests for converting coordinates between genome builds."""
+
+    def test_liftover_position_with_chain_index(self, test_chain):
+        """Test block offsets, gaps, overlapping chains and reverse strands."""
+        assert liftover.liftover_position("1", 100, "GRCh37", "GRCh38") == ("1", 1100)
+        assert liftover.liftover_position("chr1", 200, "hg19", "hg38") == ("1", 1200)
+        # In the gap of the best chain, so the lower-scoring chain applies
+        assert liftover.liftover_position("1", 120, "GRCh37", "GRCh38") == ("X", 70)
+        assert liftover.liftover_position("MT", 10, "GRCh37", "GRCh38") == ("MT", 16560)
+        assert liftover.liftover_position("1", 400, "GRCh37", "GRCh38") is None
+        assert liftover.liftover_position("Y", 10, "GRCh37", "GRCh38") is None
+
+    def test_liftover_dataframe_assigns_lifted_columns(self, test_chain):
+        """Test lifted coordinates and success flags, keeping the original index."""
+        df = pd.DataFrame(
+            {"chrom": ["1", "Y", "MT", "1"], "pos": [100, 200, 10, 100], "build": "GRCh37"},
+            index=[10, 20, 30, 40],
+        )
+
+        result = liftover.liftover_dataframe(df, "GRCh38")
+
+        assert list(result.index) == [10, 20, 30, 40]
+        assert list(result["lifted_chrom"]) == ["1", None, "MT", "1"]
+        assert list(result["lifted_pos"]) == [1100, None, 16560, 1100]
+        assert list(result["lift_success"]) == [True, False, True, True]
+
+        lifted = liftover.batch_liftover([("1", 5), ("1", 5), ("Y", 5)], "GRCh37", "GRCh38")
+        assert lifted == [("1", 1005), ("1", 1005), None]
+
+    def test_chain_file_refresh_skips_unchanged_download(self, tmp_path, monkeypatch):
+        """Test that refreshing a cached chain file sends its ETag and keeps it on 304."""
+        monkeypatch.setattr(liftover, "CACHE_DIR", tmp_path)
+        requests_seen = []
+
+        class FakeResponse:
+            def __init__(self, status_code, body=b"", headers=None):
+                self.status_code = status_code
+                self.body = body
+                self.headers = headers or {}
+
+            def raise_for_status(self):
+                pass
+
+            def iter_content(self, chunk_size):
+                yield self.body
+
+        responses = [FakeResponse(200, b"chain", {"ETag": '"v1"'}), FakeResponse(304)]
+
+        def fake_get(url, headers=None, **kwargs):
+            requests_seen.append(headers)
+            return responses.pop(0)
+
+        monkeypatch.setattr(liftover.requests, "get", fake_get)
+
+        chain_path = liftover.get_chain_file("GRCh37", "GRCh38")
+        assert chain_path.read_bytes() == b"chain"
+        assert liftover.get_chain_file("GRCh37", "GRCh38") == chain_path
+        assert len(requests_seen) == 1
+
+        assert liftover.get_chain_file("GRCh37", "GRCh38", refresh=True) == chain_path
+        assert requests_seen[1]["If-None-Match"] == '"v1"'
+        assert chain_path.read_bytes() == b"chain"
+
+    def test_concurrent_liftovers_download_and_build_once(self, tmp_path, monkeypatch):
+        """Test that parallel first liftovers share one download and one index build."""
+        monkeypatch.setattr(liftover, "CACHE_DIR", tmp_path)
+        monkeypatch.setattr(liftover, "_liftover_cache", {})
+        body = gzip.compress(TEST_CHAIN.encode())
+        get_calls = []
+        builds = []
+
+        class FakeResponse:
+            status_code = 200
+            headers = {}
+
+            def raise_for_status(self):
+                pass
+
+            def iter_content(self, chunk_size):
+                time.sleep(0.05)
+                yield body
+
+        def fake_get(url, **kwargs):
+            get_calls.append(url)
+            return FakeResponse()
+
+        build_index = liftover.ChainIndex.__init__
+
+        def counting_init(self, chain_path):
+            builds.append(chain_path)
+            build_index(self, chain_path)
+
+        monkeypatch.setattr(liftover.requests, "get", fake_get)
+        monkeypatch.setattr(liftover.ChainIndex, "__init__", counting_init)
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            lifted = list(executor.map(
+                lambda _: liftover.liftover_position("1", 100, "GRCh37", "GRCh38"), range(4)
+            ))
+
+        assert lifted == [("1", 1100)] * 4
+        assert len(get_calls) == 1
+        assert len(builds) == 1
+        assert sorted(p.name for p in tmp_path.iterdir()) == [
+            "hg19ToHg38.over.chain.gz",
+            liftover._liftover_pickle_path(tmp_path / "hg19ToHg38.over.chain.gz").name,
+        ]
+
+        # Replacing the chain file drops the index built from the old one
+        liftover.get_chain_file("GRCh37", "GRCh38", refresh=True)
+        assert ("GRCh37", "GRCh38") not in liftover._liftover_cache
+
+    def test_chain_index_is_pickled_next_to_chain_file(self, test_chain, monkeypatch):
+        """Test that a second process reuses the pickled ChainIndex instead of re-parsing."""
+        liftover._get_liftover("GRCh37", "GRCh38")
+
+        def fail(self, chain_path):
+            raise AssertionError("chain file parsed again")
+
+        monkeypatch.setattr(liftover, "_liftover_cache", {})
+        monkeypatch.setattr(liftover.ChainIndex, "__init__", fail)
+        index = liftover._get_liftover("GRCh37", "GRCh38")
+
+        assert isinstance(index, liftover.ChainIndex)
+        assert liftover.liftover_position("1", 100, "GRCh37", "GRCh38") == ("1", 1100)
+
+    def test_chain_index_pickle_with_other_version_is_rebuilt(self, test_chain, monkeypatch):
+        """Test that a pickle written for another ChainIndex layout is not loaded."""
+        index = liftover.ChainIndex(test_chain)
+        pickle_path = liftover._liftover_pickle_path(test_chain)
+        with open(pickle_path, "wb") as f:
+            pickle.dump((liftover.CHAIN_INDEX_VERSION + 1, index), f)
+
+        assert liftover._read_liftover_pickle(test_chain) is None
+
+        liftover._write_liftover_pickle(test_chain, index)
+        assert isinstance(liftover._read_liftover_pickle(test_chain), liftover.ChainIndex)
+
+
 # =============================================================================
 # Integration Tests
 # =============================================================================